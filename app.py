@@ -1,8 +1,18 @@
 import chainlit as cl
+import os
+import uuid
 
+from src.chatbot.budget import new_budget
 from src.chatbot.input import BASE_INPUTS
-from src.chatbot.workflow import full_graph
-from utils import handle_messages, handle_updates
+from src.chatbot.pregrader import PRE_GRADER, local_pre_grader
+from src.chatbot.speculation import SPECULATIVE_WEBSEARCH, speculative_websearch
+from src.chatbot.workflow import fast_graph, fast_path_agent, full_graph
+from src.services.loop_monitor import LOOP_MONITOR_ENABLED, loop_monitor
+from utils import handle_messages, handle_updates, send_grader_reasons
+
+# "full" (default) grades every answer with a separate LLM call, "fast" generates and self-grades in one call
+CHAT_GRAPH = os.getenv("CHAT_GRAPH", "full")
+GRAPHS = {"full": full_graph, "fast": fast_graph}
 
 @cl.set_starters
 async def set_starters():
@@ -26,23 +36,41 @@ async def set_starters():
     
 @cl.on_chat_start
 async def on_chat_start():
-    cl.user_session.set("graph", full_graph)
+    if LOOP_MONITOR_ENABLED:
+        loop_monitor.start()
+    cl.user_session.set("graph", GRAPHS[CHAT_GRAPH])
 
 @cl.on_message
 async def on_message(message: cl.Message):
     graph = cl.user_session.get("graph")
     inputs = BASE_INPUTS.copy()
     inputs["query"] = str(message.content)
+    inputs["request_id"] = str(uuid.uuid4())
+    inputs["budget"] = new_budget()
     
     first_answer, first_grade, first_refine = [True], [True], [True]
     final_answer = [""]
     answer_message = cl.Message(content="")
     refine_message = cl.Message(content="")
     
-    async for msg_type, update in graph.astream(inputs, stream_mode=["messages", "updates"]):
-        if msg_type == "messages":
-            await handle_messages(update, answer_message, refine_message, first_answer, first_grade, first_refine, final_answer)
-        elif msg_type == "updates":
-            await handle_updates(update, final_answer)
+    # the grader routes on its scores alone; its reasons are posted once they finish streaming
+    config = {"configurable": {"on_grader_reasons": send_grader_reasons}}
+    try:
+        async for msg_type, update in graph.astream(inputs, config=config, stream_mode=["messages", "updates"]):
+            if msg_type == "messages":
+                await handle_messages(update, answer_message, refine_message, first_answer, first_grade, first_refine, final_answer)
+            elif msg_type == "updates":
+                await handle_updates(update, final_answer)
+    finally:
+        # nothing is left to pick up a speculative web search once the run is over
+        speculative_websearch.discard(inputs["request_id"])
+        if SPECULATIVE_WEBSEARCH:
+            print(f"Speculative websearch: {speculative_websearch.stats()}")
+        if PRE_GRADER:
+            print(f"Pre-grader: {local_pre_grader.stats()}")
+        if CHAT_GRAPH == "fast":
+            print(f"Fast path: {fast_path_agent.stats()}")
+        if LOOP_MONITOR_ENABLED:
+            print(f"Event loop: {loop_monitor.stats()}")
     
     await cl.Message(content=f"Final Chosen Answer: \n\n{final_answer[0]}").send()
\ No newline at end of file
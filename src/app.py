@@ -2,12 +2,13 @@ from concurrent.futures import ThreadPoolExecutor, as_completed
 from fastapi import APIRouter, HTTPException, status
 from graph.build_graph import build_graph
 from schema.data import CreateIndexRequest, DeleteIndexRequest
-from services.services import collection, llama_llm, graph_store
+from services.services import (
+    collection, llama_llm, graph_store, llama_openai_embed_model, neighborhood_store,
+    GRAPH_BACKEND, GRAPH_SNAPSHOT_PATH, KG_MATERIALIZE_NEIGHBORHOODS
+)
 from utils.utils import parse_and_process_docs
 from vector.create_index import batch_ingestion, drop_indexes, create_all_indexes
 
-llama_openai_embed_model = None
-
 delete_vector_router = APIRouter()
 upload_vector_router = APIRouter()
 upload_graph_router = APIRouter()
@@ -37,8 +38,18 @@ def ingest_vector_db(final_docs):
 # Function to handle ingestion to KG DB
 def ingest_kg_db(final_docs):
     print("Starting Ingestion Process for KG DB...")
+    # the materialised neighbourhoods would be stale as soon as the graph changes
+    neighborhood_store.invalidate()
     build_graph(documents=final_docs, llm=llama_llm, embed_model=llama_openai_embed_model, graph_store=graph_store)
     print("KG DB Ingestion Process Completed!")
+    print(f"Embedding Cache: {llama_openai_embed_model.cache.stats()}")
+    if GRAPH_BACKEND == "memory":
+        graph_store.save_snapshot(GRAPH_SNAPSHOT_PATH)
+        print(f"Graph Snapshot Saved to {GRAPH_SNAPSHOT_PATH}!")
+    if KG_MATERIALIZE_NEIGHBORHOODS and graph_store.supports_structured_queries:
+        print("Materialising KG Entity Neighbourhoods...")
+        num_entities = neighborhood_store.rebuild(graph_store)
+        print(f"Materialised Neighbourhoods for {num_entities} Entities!")
 
 @upload_vector_router.post("/upload-vector")
 def upload_vector(request: CreateIndexRequest):
@@ -0,0 +1,131 @@
+"""
+A/B comparison of the single-call fast path (generate + self-grade, standalone grader only when borderline)
+against the two-call baseline (generate, then grade), on a fixed query set.
+
+Both arms answer from the same retrieved and assembled context, so only the generation and grading calls are timed.
+Tokens are estimated from the rendered prompts and outputs (~4 characters per token), as in the per-request budget.
+To measure agreement, every fast-path answer is also graded by the standalone grader outside the timings:
+- decision_agreement: the fraction of queries where the fast path routed as the grader would on its answer
+  (escalated queries agree by construction)
+- self_grade_agreement: the same, over the self-grades alone, i.e. if nothing were escalated
+- mean_abs_score_diff: the mean absolute difference between self-scores and grader scores
+
+Usage (from the repo root):
+    python -m src.benchmarks.bench_fast_path --repeats 1
+"""
+import argparse
+import asyncio
+import json
+import time
+
+from typing import Dict, List
+
+from src.benchmarks.utils import latency_summary, print_table
+from src.chatbot.context import estimate_tokens
+from src.chatbot.input import BASE_INPUTS
+from src.chatbot.tools import (
+    FAST_PATH_MIN_CONFIDENCE, GRADE_THRESHOLD,
+    AnswerGenerationTool, GenerateAndGradeTool, GradeAnswerTool, scores_near_threshold
+)
+from src.chatbot.workflow import assemble_context_agent, retrieve_db_agent, retrieve_kg_agent
+
+DEFAULT_QUERIES = [
+    "What are some Medicines for Diabetes?",
+    "Please suggest some appropriate exercises for diabetics with heart conditions.",
+    "How should insulin be stored?",
+    "What are the symptoms of a diabetic foot ulcer?",
+    "What are the side effects of metformin?",
+    "How often should blood glucose be monitored?",
+    "Can people with pre-diabetes reverse it through diet alone?",
+    "what are the potential long-term neurological and cardiovascular effects of chronic sleep deprivation in shift workers, particularly those in healthcare professions.",
+]
+
+def is_good(scores: Dict[str, int]) -> bool:
+    return all(score > GRADE_THRESHOLD for score in scores.values())
+
+def is_borderline(scores: Dict[str, int], confidence: int) -> bool:
+    # same rule as GenerateAndGradeAgent
+    return confidence < FAST_PATH_MIN_CONFIDENCE or bool(scores_near_threshold(scores))
+
+def call_tokens(tool, inputs: dict, output) -> int:
+    rendered = tool.prompt_template.format(**inputs)
+    return estimate_tokens(rendered) + estimate_tokens(output if isinstance(output, str) else json.dumps(output))
+
+async def build_context(query: str) -> str:
+    state = {**BASE_INPUTS, "query": query, "query_list": [query]}
+    state.update(await retrieve_db_agent(state))
+    state.update(await retrieve_kg_agent(state))
+    state.update(await assemble_context_agent(state))
+    return state["context"]
+
+async def run_baseline(generator: AnswerGenerationTool, grader: GradeAnswerTool, query: str, context: str) -> dict:
+    start = time.perf_counter()
+    answer = await generator.generate_answer_async(query, context)
+    grade = await grader.grade_answer_async(query, answer)
+    latency = time.perf_counter() - start
+    tokens = call_tokens(generator, {"query": query, "context": context}, answer) + call_tokens(grader, {"query": query, "answer": answer}, grade)
+    return {"latency": latency, "tokens": tokens, "calls": 2, "good": is_good(grade["evaluation"])}
+
+async def run_fast_path(fast: GenerateAndGradeTool, grader: GradeAnswerTool, query: str, context: str) -> dict:
+    start = time.perf_counter()
+    result = await fast.generate_and_grade_async(query, context)
+    escalated = is_borderline(result["evaluation"], result["confidence"])
+    tokens = call_tokens(fast, {"query": query, "context": context}, result)
+    grade = None
+    if escalated:
+        grade = await grader.grade_answer_async(query, result["answer"])
+        tokens += call_tokens(grader, {"query": query, "answer": result["answer"]}, grade)
+    latency = time.perf_counter() - start
+
+    # reference grade of the fast answer, outside the timings
+    reference = grade or await grader.grade_answer_async(query, result["answer"])
+    self_good, reference_good = is_good(result["evaluation"]), is_good(reference["evaluation"])
+    diffs = [abs(result["evaluation"][metric] - reference["evaluation"].get(metric, 0)) for metric in result["evaluation"]]
+    return {
+        "latency": latency,
+        "tokens": tokens,
+        "calls": 2 if escalated else 1,
+        "escalated": escalated,
+        "good": reference_good if escalated else self_good,
+        "decision_agrees": escalated or self_good == reference_good,
+        "self_grade_agrees": self_good == reference_good,
+        "abs_score_diff": sum(diffs) / len(diffs),
+    }
+
+def summarise(name: str, runs: List[dict]) -> dict:
+    row = {
+        "arm": name,
+        **latency_summary([run["latency"] for run in runs]),
+        "mean_tokens": sum(run["tokens"] for run in runs) / len(runs),
+        "mean_llm_calls": sum(run["calls"] for run in runs) / len(runs),
+        "good_rate": sum(run["good"] for run in runs) / len(runs),
+    }
+    if "escalated" in runs[0]:
+        row["escalation_rate"] = sum(run["escalated"] for run in runs) / len(runs)
+        row["decision_agreement"] = sum(run["decision_agrees"] for run in runs) / len(runs)
+        row["self_grade_agreement"] = sum(run["self_grade_agrees"] for run in runs) / len(runs)
+        row["mean_abs_score_diff"] = sum(run["abs_score_diff"] for run in runs) / len(runs)
+    return row
+
+async def main(args: argparse.Namespace) -> None:
+    generator, grader, fast = AnswerGenerationTool(), GradeAnswerTool(), GenerateAndGradeTool()
+    contexts = {query: await build_context(query) for query in DEFAULT_QUERIES}
+
+    baseline_runs, fast_runs = [], []
+    for _ in range(args.repeats):
+        for query, context in contexts.items():
+            # alternate the arm that goes first, so provider-side warm-up and drift hit both equally
+            arms = [("baseline", run_baseline(generator, grader, query, context)), ("fast", run_fast_path(fast, grader, query, context))]
+            if len(baseline_runs) % 2:
+                arms.reverse()
+            for name, arm in arms:
+                (baseline_runs if name == "baseline" else fast_runs).append(await arm)
+
+    rows = [summarise("generate + grade", baseline_runs), summarise("fast path", fast_runs)]
+    columns = list(rows[1].keys())
+    print_table([{column: row.get(column, "-") for column in columns} for row in rows])
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Single-call fast path vs generate + grade")
+    parser.add_argument("--repeats", type=int, default=1, help="Passes over the query set")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,142 @@
+"""
+Throughput and output equality of the web page cleaning pipeline vs the original `WebSearchTool.clean_content`.
+
+Runs on a saved corpus of crawled pages (JSON lines of {"url", "markdown"}), so runs are repeatable offline.
+`data/crawled_pages.jsonl` is a small fixed corpus in the shape of crawl4ai output (plain markdown, markdown with
+leftover markup, and full HTML pages), also used by tests/test_cleaning.py to check that the output is identical.
+For a larger, real corpus, `--save-urls` crawls a newline-separated URL list with the shared crawler pool.
+
+For each parser the benchmark reports:
+- mismatches: pages whose cleaned output differs from the original implementation (listed with --show-mismatches)
+- pages/s and MB/s, inline and across a process pool of `--workers` processes
+
+Usage (from the repo root):
+    python -m src.benchmarks.bench_html_cleaning --repeats 5 --workers 4
+    python -m src.benchmarks.bench_html_cleaning --save-urls urls.txt --corpus crawled.jsonl
+    python -m src.benchmarks.bench_html_cleaning --corpus crawled.jsonl
+"""
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import re
+import time
+
+from bs4 import BeautifulSoup
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, List
+
+import src.chatbot.cleaning as cleaning
+from src.benchmarks.utils import print_table
+
+DEFAULT_CORPUS = os.path.join(os.path.dirname(__file__), "data", "crawled_pages.jsonl")
+
+def legacy_clean_content(content: str) -> str:
+    """
+    The original WebSearchTool.clean_content, kept verbatim as the baseline
+    """
+    soup = BeautifulSoup(content, 'html.parser')
+    for element in soup(["script", "style", "nav", "footer", "header"]):
+        element.decompose()
+    text = soup.get_text(separator=' ', strip=True)
+    text = re.sub(r'https?://\S+|www\.\S+', '', text)
+    text = re.sub(r'\s+', ' ', text).strip()
+    boilerplate_patterns = [
+        r'copyright ©.*',
+        r'all rights reserved',
+        r'terms (of use|and conditions)',
+        r'privacy policy',
+        r'cookie policy',
+        r'(log|sign) (in|out|up)',
+        r'subscribe to our newsletter',
+        r'follow us on social media',
+    ]
+    for pattern in boilerplate_patterns:
+        text = re.sub(pattern, '', text, flags=re.IGNORECASE)
+    text = re.sub(r'\S+@\S+\.\S+', '', text)
+    text = re.sub(r'page \d+ of \d+', '', text)
+    text = re.sub(r'last updated:?\s*\d{1,2}[-/]\d{1,2}[-/]\d{2,4}', '', text)
+    text = '\n'.join(line for line in text.split('\n') if len(line.split()) > 3)
+    text = re.sub(r'\s+', ' ', text).strip()
+    return text
+
+def set_parser(parser: str) -> None:
+    cleaning.CLEANING_PARSER = parser
+
+async def save_corpus(urls_file: str, corpus: str) -> None:
+    from src.services.crawler_pool import crawler_pool
+
+    with open(urls_file) as f:
+        urls = [line.strip() for line in f if line.strip()]
+    results = await asyncio.gather(*(crawler_pool.arun(url=url) for url in urls), return_exceptions=True)
+    await crawler_pool.close()
+
+    os.makedirs(os.path.dirname(os.path.abspath(corpus)), exist_ok=True)
+    saved = 0
+    with open(corpus, "w") as f:
+        for url, result in zip(urls, results):
+            if isinstance(result, Exception) or not result.markdown:
+                print(f"Skipping {url}: {result if isinstance(result, Exception) else 'no content'}")
+                continue
+            f.write(json.dumps({"url": url, "markdown": result.markdown}) + "\n")
+            saved += 1
+    print(f"Saved {saved} pages to {corpus}")
+
+def load_corpus(corpus: str) -> List[str]:
+    with open(corpus) as f:
+        return [json.loads(line)["markdown"] for line in f if line.strip()]
+
+def throughput(clean: Callable[[str], str], pages: List[str], repeats: int) -> float:
+    start = time.perf_counter()
+    for _ in range(repeats):
+        for page in pages:
+            clean(page)
+    return (time.perf_counter() - start) / repeats
+
+def pooled_throughput(clean: Callable[[str], str], pages: List[str], repeats: int, workers: int, parser: str) -> float:
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"),
+                             initializer=set_parser, initargs=(parser,)) as executor:
+        list(executor.map(clean, pages[:workers]))  # start the workers before timing
+        start = time.perf_counter()
+        for _ in range(repeats):
+            list(executor.map(clean, pages, chunksize=1))
+        return (time.perf_counter() - start) / repeats
+
+def row(name: str, pages: List[str], elapsed: float, mismatches: int) -> dict:
+    megabytes = sum(len(page.encode("utf-8")) for page in pages) / 1e6
+    return {"pipeline": name, "mismatches": mismatches, "pages_per_s": len(pages) / elapsed, "mb_per_s": megabytes / elapsed}
+
+def main(args: argparse.Namespace) -> None:
+    if args.save_urls:
+        asyncio.run(save_corpus(args.save_urls, args.corpus))
+        return
+
+    pages = load_corpus(args.corpus)
+    print(f"Loaded {len(pages)} pages ({sum(map(len, pages)) / 1e6:.1f}M characters) from {args.corpus}")
+    expected = [legacy_clean_content(page) for page in pages]
+
+    rows = [
+        row("legacy", pages, throughput(legacy_clean_content, pages, args.repeats), 0),
+        row(f"legacy x{args.workers} processes", pages,
+            pooled_throughput(legacy_clean_content, pages, args.repeats, args.workers, "html.parser"), 0),
+    ]
+    for parser in ["html.parser", "lxml"]:
+        set_parser(parser)
+        mismatched = [i for i, page in enumerate(pages) if cleaning.clean_content(page) != expected[i]]
+        if args.show_mismatches:
+            for i in mismatched:
+                print(f"[{parser}] page {i} differs:\n  legacy: {expected[i][:200]!r}\n  new:    {cleaning.clean_content(pages[i])[:200]!r}")
+        rows.append(row(f"new ({parser})", pages, throughput(cleaning.clean_content, pages, args.repeats), len(mismatched)))
+        rows.append(row(f"new ({parser}) x{args.workers} processes", pages,
+                        pooled_throughput(cleaning.clean_content, pages, args.repeats, args.workers, parser), len(mismatched)))
+    print_table(rows)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Web page cleaning throughput and output equality")
+    parser.add_argument("--corpus", default=DEFAULT_CORPUS, help="JSON lines of crawled pages")
+    parser.add_argument("--save-urls", help="Crawl the URLs in this file and save them as the corpus, then exit")
+    parser.add_argument("--repeats", type=int, default=3, help="Timed passes over the corpus")
+    parser.add_argument("--workers", type=int, default=4, help="Processes for the pooled runs")
+    parser.add_argument("--show-mismatches", action="store_true", help="Print every page whose output differs")
+    main(parser.parse_args())
@@ -0,0 +1,195 @@
+"""
+Recall@k vs latency sweep for the hybrid search parameters.
+
+Ground truth is exact brute-force search over the ingested corpus (`LocalHybridIndex` on the ingestion pickles):
+- dense: exact cosine top-k
+- sparse: exact inner-product top-k with no terms dropped
+- fused: full-depth RRF over the exact dense and sparse rankings, with the same RRF `k`
+
+The target backend is then swept over HNSW `ef`, the per-request `limit`, the sparse `drop_ratio_search`
+and the RRF `k`, one parameter at a time around the base profile. Dense and sparse also get a full ef/drop x limit grid.
+Hits are matched to the ground truth by chunk text, since Milvus doc_ids are generated at ingestion.
+
+The fastest fused configuration (by p95) that reaches `--min-recall` can be saved as a named search profile,
+which `DBRetrievalTool` loads via the SEARCH_PROFILE env variable.
+
+Usage (from the repo root):
+    python -m src.benchmarks.bench_hybrid_search --backend milvus --min-recall 0.95 --profile-name tuned
+"""
+import argparse
+import json
+import os
+import time
+
+from dataclasses import replace
+from pymilvus import Collection, RRFRanker, connections
+from typing import Callable, List, Set
+
+from src.benchmarks.utils import latency_summary, print_table
+from src.services.embedding_models import embed_queries
+from src.vector.local_index import LocalHybridIndex
+from src.vector.search_profile import SearchProfile, load_search_profile, save_search_profile
+
+DEFAULT_QUERIES = [
+    "What are some Medicines for Diabetes?",
+    "Please suggest some appropriate exercises for diabetics with heart conditions.",
+    "How should insulin be stored?",
+    "What are the different types of insulin and how quickly do they act?",
+    "What are the symptoms of a diabetic foot ulcer?",
+    "How is a diabetic foot ulcer treated?",
+    "What is pre-diabetes and how can it be managed?",
+    "What are the side effects of metformin?",
+    "Can diabetes medications cause hypoglycaemia?",
+    "How often should blood glucose be monitored?",
+]
+
+EFS = [16, 32, 64, 128, 256]
+LIMITS = [3, 5, 10, 20]
+DROP_RATIOS = [0.0, 0.1, 0.2, 0.4]
+RRF_KS = [10, 60, 100]
+
+def get_target(backend: str, local_index: LocalHybridIndex):
+    if backend == "local":
+        return local_index
+    connections.connect(uri=os.getenv("ZILLIS_ENDPOINT"), token=os.getenv("ZILLIS_TOKEN"))
+    collection = Collection(name=os.getenv("COLLECTION_NAME", "vector_index"))
+    collection.load()
+    return collection
+
+def recall(retrieved: List[int], ground_truth: List[int]) -> float:
+    if not ground_truth:
+        return 1.0
+    return len(set(retrieved) & set(ground_truth)) / len(ground_truth)
+
+def timed(search: Callable[[], list], repeats: int, latencies: List[float]) -> list:
+    hits = None
+    for _ in range(repeats):
+        start = time.perf_counter()
+        hits = search()
+        latencies.append(time.perf_counter() - start)
+    return hits
+
+class HybridSearchBenchmark:
+    def __init__(self, target, local_index: LocalHybridIndex, queries: List[str], repeats: int):
+        self.target = target
+        self.local_index = local_index
+        self.repeats = repeats
+        self.embeddings = embed_queries(queries)
+        self.text_to_row = {text: row for row, text in enumerate(local_index.fields["text"])}
+
+    def _rows(self, hits) -> List[int]:
+        return [self.text_to_row.get(hit.text, -1) for hit in hits]
+
+    def _summarise(self, mode: str, profile: SearchProfile, recalls: List[float], latencies: List[float]) -> dict:
+        summary = latency_summary(latencies)
+        return {
+            "mode": mode,
+            "ef": profile.dense_ef,
+            "dense_limit": profile.dense_limit,
+            "drop_ratio": profile.sparse_drop_ratio,
+            "sparse_limit": profile.sparse_limit,
+            "rrf_k": profile.rrf_k,
+            "limit": profile.limit,
+            "recall": sum(recalls) / len(recalls),
+            "p50_ms": summary["p50_ms"],
+            "p95_ms": summary["p95_ms"],
+        }
+
+    def dense(self, profile: SearchProfile) -> dict:
+        recalls, latencies = [], []
+        for dense, _ in self.embeddings:
+            ground_truth = [int(row) for row in self.local_index.dense_search([dense], profile.dense_limit)[0][0]]
+            request = profile.dense_request([dense])
+            hits = timed(lambda: self.target.search(data=request.data, anns_field=request.anns_field, param=request.param,
+                                                    limit=request.limit, output_fields=["text"])[0], self.repeats, latencies)
+            recalls.append(recall(self._rows(hits), ground_truth))
+        return self._summarise("dense", profile, recalls, latencies)
+
+    def sparse(self, profile: SearchProfile) -> dict:
+        recalls, latencies = [], []
+        for _, sparse in self.embeddings:
+            ground_truth = [int(row) for row in self.local_index.sparse_search([sparse], profile.sparse_limit)[0][0]]
+            request = profile.sparse_request([sparse])
+            hits = timed(lambda: self.target.search(data=request.data, anns_field=request.anns_field, param=request.param,
+                                                    limit=request.limit, output_fields=["text"])[0], self.repeats, latencies)
+            recalls.append(recall(self._rows(hits), ground_truth))
+        return self._summarise("sparse", profile, recalls, latencies)
+
+    def fused(self, profile: SearchProfile) -> dict:
+        exact = replace(profile, dense_limit=self.local_index.num_entities, sparse_limit=self.local_index.num_entities,
+                        sparse_drop_ratio=0.0)
+        recalls, latencies = [], []
+        for dense, sparse in self.embeddings:
+            ground_truth = [hit.id for hit in self.local_index.hybrid_search(
+                reqs=exact.requests([dense], [sparse]), rerank=RRFRanker(k=profile.rrf_k), limit=profile.limit)[0]]
+            hits = timed(lambda: self.target.hybrid_search(reqs=profile.requests([dense], [sparse]), rerank=profile.ranker(),
+                                                           limit=profile.limit, output_fields=["text"])[0], self.repeats, latencies)
+            recalls.append(recall(self._rows(hits), ground_truth))
+        return self._summarise("fused", profile, recalls, latencies)
+
+def sweep(benchmark: HybridSearchBenchmark, base: SearchProfile) -> List[dict]:
+    rows = []
+    for limit in LIMITS:
+        for ef in EFS:
+            rows.append(benchmark.dense(replace(base, dense_ef=max(ef, limit), dense_limit=limit)))
+        for drop_ratio in DROP_RATIOS:
+            rows.append(benchmark.sparse(replace(base, sparse_drop_ratio=drop_ratio, sparse_limit=limit)))
+
+    fused_profiles: List[SearchProfile] = [base]
+    fused_profiles += [replace(base, dense_ef=max(ef, base.dense_limit)) for ef in EFS]
+    fused_profiles += [replace(base, dense_ef=max(base.dense_ef, limit), dense_limit=limit, sparse_limit=limit) for limit in LIMITS]
+    fused_profiles += [replace(base, sparse_drop_ratio=drop_ratio) for drop_ratio in DROP_RATIOS]
+    fused_profiles += [replace(base, rrf_k=rrf_k) for rrf_k in RRF_KS]
+
+    seen: Set[tuple] = set()
+    for profile in fused_profiles:
+        key = (profile.dense_ef, profile.dense_limit, profile.sparse_drop_ratio, profile.sparse_limit, profile.rrf_k)
+        if key not in seen:
+            seen.add(key)
+            rows.append(benchmark.fused(profile))
+    return rows
+
+def select_profile(rows: List[dict], min_recall: float, name: str):
+    candidates = [row for row in rows if row["mode"] == "fused" and row["recall"] >= min_recall]
+    if not candidates:
+        return None
+    best = min(candidates, key=lambda row: row["p95_ms"])
+    return SearchProfile(name=name, dense_ef=best["ef"], dense_limit=best["dense_limit"],
+                         sparse_drop_ratio=best["drop_ratio"], sparse_limit=best["sparse_limit"],
+                         rrf_k=best["rrf_k"], limit=best["limit"])
+
+def main(args: argparse.Namespace) -> None:
+    local_index = LocalHybridIndex.from_data_folder(args.data_folder)
+    queries = DEFAULT_QUERIES
+    if args.queries_file:
+        with open(args.queries_file) as f:
+            queries = [line.strip() for line in f if line.strip()]
+
+    benchmark = HybridSearchBenchmark(get_target(args.backend, local_index), local_index, queries, args.repeats)
+    rows = sweep(benchmark, load_search_profile(args.base_profile))
+    print_table(rows)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(rows, f, indent=4)
+
+    profile = select_profile(rows, args.min_recall, args.profile_name or "tuned")
+    if profile is None:
+        print(f"No fused configuration reached recall >= {args.min_recall}")
+        return
+    print(f"Selected profile: {profile}")
+    if args.profile_name:
+        save_search_profile(profile)
+        print(f"Saved search profile '{profile.name}'. Use it with SEARCH_PROFILE={profile.name}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Recall/latency sweep for hybrid_search parameters")
+    parser.add_argument("--backend", choices=["milvus", "local"], default="milvus")
+    parser.add_argument("--data-folder", default="notebooks/data", help="Folder holding the ingestion pickles")
+    parser.add_argument("--queries-file", help="Newline-separated queries (defaults to a built-in set)")
+    parser.add_argument("--repeats", type=int, default=5, help="Timed repetitions per query and configuration")
+    parser.add_argument("--base-profile", default="default", help="Profile the one-at-a-time sweeps vary around")
+    parser.add_argument("--min-recall", type=float, default=0.95, help="Fused recall required for profile selection")
+    parser.add_argument("--profile-name", help="Save the selected configuration under this profile name")
+    parser.add_argument("--output", help="Write all rows to this JSON file")
+    main(parser.parse_args())
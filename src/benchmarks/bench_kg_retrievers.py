@@ -0,0 +1,76 @@
+"""
+Latency of the direct Cypher KG retriever (and the materialised neighbourhoods, when built)
+vs the llama-index property graph retriever.
+
+Both retrievers share the cached OpenAI embedding model, so after the warm-up pass the timings
+compare graph access only. For every query the Cypher output is also checked against the llama-index output:
+`node_overlap` is the fraction of llama-index node texts reproduced exactly, `triplet_overlap` the fraction of triplet lines.
+
+Usage (from the repo root):
+    python -m src.benchmarks.bench_kg_retrievers --repeats 5 --path-depth 1 --limit 30
+"""
+import argparse
+import time
+
+from typing import List, Set
+
+from src.benchmarks.utils import latency_summary, print_table
+from src.graph.query_graph import KG_PREAMBLE, CypherKGRetriever
+from src.services.services import (
+    NEO4J_DATABASE, KG_VECTOR_INDEX, llama_kg_retriever, llama_openai_embed_model, materialized_kg_retriever,
+    neighborhood_store, neo4j_driver
+)
+
+DEFAULT_QUERIES = [
+    "What are some Medicines for Diabetes?",
+    "Please suggest some appropriate exercises for diabetics with heart conditions.",
+    "How should insulin be stored?",
+    "What are the symptoms of a diabetic foot ulcer?",
+    "What are the side effects of metformin?",
+    "How often should blood glucose be monitored?",
+]
+
+def triplet_lines(texts: List[str]) -> Set[str]:
+    return {line for text in texts for line in text.splitlines() if " -> " in line and line != KG_PREAMBLE.strip()}
+
+def overlap(reference: Set[str], candidate: Set[str]) -> float:
+    return len(reference & candidate) / len(reference) if reference else 1.0
+
+def run(name: str, retriever, queries: List[str], repeats: int, reference: List[List[str]] = None) -> tuple:
+    latencies, outputs = [], []
+    for query in queries:
+        texts = None
+        for _ in range(repeats):
+            start = time.perf_counter()
+            texts = [node.text for node in retriever.retrieve(query)]
+            latencies.append(time.perf_counter() - start)
+        outputs.append(texts)
+
+    row = {"retriever": name, **latency_summary(latencies), "mean_nodes": sum(map(len, outputs)) / len(outputs)}
+    if reference is not None:
+        row["node_overlap"] = sum(overlap(set(ref), set(out)) for ref, out in zip(reference, outputs)) / len(outputs)
+        row["triplet_overlap"] = sum(overlap(triplet_lines(ref), triplet_lines(out)) for ref, out in zip(reference, outputs)) / len(outputs)
+    return row, outputs
+
+def main(args: argparse.Namespace) -> None:
+    cypher_retriever = CypherKGRetriever(neo4j_driver, embed_model=llama_openai_embed_model, database=NEO4J_DATABASE,
+                                         path_depth=args.path_depth, limit=args.limit, vector_index=KG_VECTOR_INDEX)
+
+    # warm the embedding cache so both retrievers are timed on graph access only
+    for query in DEFAULT_QUERIES:
+        llama_openai_embed_model.get_query_embedding(query)
+
+    llama_row, reference = run("llama_index", llama_kg_retriever, DEFAULT_QUERIES, args.repeats)
+    cypher_row, _ = run(f"cypher (depth={args.path_depth}, limit={args.limit})", cypher_retriever,
+                        DEFAULT_QUERIES, args.repeats, reference)
+    rows = [{**llama_row, "node_overlap": 1.0, "triplet_overlap": 1.0}, cypher_row]
+    if neighborhood_store.available:
+        rows.append(run("materialized", materialized_kg_retriever, DEFAULT_QUERIES, args.repeats, reference)[0])
+    print_table(rows)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Cypher vs llama-index KG retriever latency")
+    parser.add_argument("--repeats", type=int, default=5, help="Timed repetitions per query")
+    parser.add_argument("--path-depth", type=int, default=1, choices=[1, 2], help="Hops expanded from each seed entity")
+    parser.add_argument("--limit", type=int, default=30, help="Hard cap on returned triplets")
+    main(parser.parse_args())
@@ -0,0 +1,77 @@
+"""
+Throughput vs p99 latency of the query embedding micro-batcher.
+
+Simulates `--concurrency` chat sessions, each embedding `--requests` distinct queries back to back,
+for every (window_ms, max_batch_size) pair. `max_batch_size=1` is the unbatched baseline.
+The cache is bypassed so every request pays for encoding.
+The event-loop monitor runs throughout (`--no-loop-monitor` to skip it), so encoding that blocks the loop shows up as stalls.
+
+Usage (from the repo root):
+    python -m src.benchmarks.bench_query_batcher --concurrency 1 8 32 --windows 0 2 5 10 --batch-sizes 1 8 16 32
+"""
+import argparse
+import asyncio
+import time
+
+from src.benchmarks.utils import latency_summary, print_table
+from src.services.embedding_models import QueryEmbeddingBatcher, encode_queries
+from src.services.loop_monitor import loop_monitor
+
+BASE_QUERIES = [
+    "what are some medicines for diabetes",
+    "please suggest some appropriate exercises for diabetics with heart conditions",
+    "how is insulin stored and administered",
+    "what are the symptoms of a diabetic foot ulcer",
+    "how can pre-diabetes be managed with diet",
+    "what are the side effects of metformin",
+]
+
+async def run_session(batcher: QueryEmbeddingBatcher, session_id: int, requests: int, latencies: list) -> None:
+    for i in range(requests):
+        query = f"{BASE_QUERIES[(session_id + i) % len(BASE_QUERIES)]} (session {session_id}, request {i})"
+        start = time.perf_counter()
+        await batcher.embed(query)
+        latencies.append(time.perf_counter() - start)
+
+async def run_config(concurrency: int, requests: int, window_ms: float, max_batch_size: int) -> dict:
+    batcher = QueryEmbeddingBatcher(max_batch_size=max_batch_size, window_ms=window_ms)
+    latencies = []
+    start = time.perf_counter()
+    await asyncio.gather(*(run_session(batcher, session_id, requests, latencies) for session_id in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    summary = latency_summary(latencies)
+    return {
+        "concurrency": concurrency,
+        "window_ms": window_ms,
+        "max_batch": max_batch_size,
+        "mean_batch": batcher.stats()["mean_batch_size"],
+        "qps": len(latencies) / elapsed,
+        "p50_ms": summary["p50_ms"],
+        "p99_ms": summary["p99_ms"],
+    }
+
+async def main(args: argparse.Namespace) -> None:
+    # warm up both models so the first config does not pay for lazy initialisation
+    encode_queries(BASE_QUERIES)
+    if args.loop_monitor:
+        loop_monitor.start()
+
+    rows = []
+    for concurrency in args.concurrency:
+        for max_batch_size in args.batch_sizes:
+            windows = [0.0] if max_batch_size == 1 else args.windows
+            for window_ms in windows:
+                rows.append(await run_config(concurrency, args.requests, window_ms, max_batch_size))
+    print_table(rows)
+    if args.loop_monitor:
+        print(f"Event loop: {loop_monitor.stats()}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the query embedding micro-batcher")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 32])
+    parser.add_argument("--requests", type=int, default=10, help="Requests per simulated session")
+    parser.add_argument("--windows", type=float, nargs="+", default=[2.0, 5.0, 10.0], help="Batching windows in ms")
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 8, 16, 32])
+    parser.add_argument("--loop-monitor", action=argparse.BooleanOptionalAction, default=True,
+                        help="Report event-loop stalls during the run")
+    asyncio.run(main(parser.parse_args()))
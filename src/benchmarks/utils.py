@@ -0,0 +1,44 @@
+import math
+
+from typing import List, Sequence
+
+def percentile(values: Sequence[float], q: float) -> float:
+    """
+    Nearest-rank percentile
+
+    Args:
+        values (Sequence[float]): The samples
+        q (float): The percentile, between 0 and 100
+
+    Returns:
+        float: The q-th percentile of the samples (0.0 if there are none)
+    """
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(1, math.ceil(q / 100 * len(ordered)))
+    return ordered[rank - 1]
+
+def latency_summary(latencies_s: Sequence[float]) -> dict:
+    """
+    Summarises latencies (in seconds) as milliseconds
+    """
+    return {
+        "count": len(latencies_s),
+        "p50_ms": percentile(latencies_s, 50) * 1000,
+        "p95_ms": percentile(latencies_s, 95) * 1000,
+        "p99_ms": percentile(latencies_s, 99) * 1000,
+    }
+
+def print_table(rows: List[dict]) -> None:
+    """
+    Prints a list of dicts as an aligned table
+    """
+    if not rows:
+        return
+    columns = list(rows[0].keys())
+    cells = [[f"{row[col]:.3f}" if isinstance(row[col], float) else str(row[col]) for col in columns] for row in rows]
+    widths = [max(len(col), *(len(cell[i]) for cell in cells)) for i, col in enumerate(columns)]
+    print("  ".join(col.ljust(width) for col, width in zip(columns, widths)))
+    for cell in cells:
+        print("  ".join(value.ljust(width) for value, width in zip(cell, widths)))
@@ -1,8 +1,14 @@
 from abc import abstractmethod
+from langchain_core.runnables import RunnableConfig
 from langchain_core.tools import StructuredTool
 from typing_extensions import override
 
-from src.chatbot.tools import DBRetrievalTool, KGRetrievalTool, WebSearchTool, AnswerGenerationTool, GradeAnswerTool, RefineAnswerTool
+from src.chatbot.budget import charge_llm_call, exhausted_reason, format_budget
+from src.chatbot.context import CONTEXT_TOKEN_BUDGET, assemble_context, estimate_tokens
+from src.chatbot.pregrader import local_pre_grader
+from src.chatbot.speculation import speculative_websearch
+from src.chatbot.tools import DBRetrievalTool, KGRetrievalTool, WebSearchTool, AnswerGenerationTool, GenerateAndGradeTool, GradeAnswerTool, RefineAnswerTool, QueryExpansionTool
+from src.chatbot.tools import FAST_PATH_MIN_CONFIDENCE, GRADE_THRESHOLD, scores_near_threshold
 from src.chatbot.state import GraphState
 
 class BaseAgent:
@@ -45,8 +51,10 @@ class VectorDBRetrievalAgent(BaseRetrievalAgent):
             GraphState: The updated state of the graph
         """
         print("------- Retrieving Context Via Vector DB -------")
-        context = self.tool.invoke({"query": state["query"]})
-        return {"db_context": context}
+        query = state["query"]
+        queries = state.get("query_list") or [query]
+        result = await self.tool.ainvoke({"query": query, "queries": queries})
+        return {"db_context": result["context"], "db_passages": result["passages"]}
     
 class KGDBRetrievalAgent(BaseRetrievalAgent):
     def __init__(self):
@@ -66,7 +74,7 @@ class KGDBRetrievalAgent(BaseRetrievalAgent):
         """
         print("------- Retrieving Context Via KG DB -------")
         query = state["query"]
-        context = self.tool.invoke({"query": query})
+        context = await self.tool.ainvoke({"query": query})
         return {"kg_context": context}
     
 class WebSearchAgent(BaseRetrievalAgent):
@@ -87,8 +95,61 @@ class WebSearchAgent(BaseRetrievalAgent):
         """
         print("------- Retrieving Context Via Web Search -------")
         query = state["query"]
-        context = await self.tool.invoke({"query": query})
+        context = await speculative_websearch.take(state.get("request_id"))
+        if context is None:
+            context = await self.tool.ainvoke({"query": query})
         return {"websearch_context": context}
+
+    def speculate(self, state: GraphState) -> None:
+        """
+        Starts the web search for the query in the background, for `retrieve` to pick up if the answer is graded down
+
+        Args:
+            state (GraphState): The state of the graph
+        """
+        speculative_websearch.launch(state.get("request_id"), self.tool.ainvoke({"query": state["query"]}))
+    
+class QueryExpansionAgent(BaseGenerationAgent):
+    def __init__(self):
+        super().__init__(name="Query Expansion Agent",
+                         tool=QueryExpansionTool().get_tool())
+    
+    @override
+    async def generate(self, state: GraphState) -> GraphState:
+        """
+        Agent that expands the user query into alternative search queries for the Vector DB
+
+        Args:
+            state (GraphState): The state of the graph
+
+        Returns:
+            state (GraphState): The updated state of the graph
+        """
+        print("------- Expanding Query -------")
+        query = state["query"]
+        query_list = await self.tool.ainvoke({"query": query})
+        print(f"Expanded Queries: {query_list}")
+        return {"query_list": query_list, "budget": charge_llm_call(query, query_list)}
+    
+class ContextAssemblyAgent(BaseAgent):
+    def __init__(self, token_budget: int = CONTEXT_TOKEN_BUDGET):
+        super().__init__(name="Context Assembly Agent")
+        self.token_budget = token_budget
+    
+    async def assemble(self, state: GraphState) -> GraphState:
+        """
+        Deduplicates the Vector DB and KG context, selects passages with MMR and enforces the token budget
+
+        Args:
+            state (GraphState): The state of the graph
+
+        Returns:
+            state (GraphState): The updated state of the graph
+        """
+        print("------- Assembling Context -------")
+        context = assemble_context(state.get("db_passages", []), state.get("kg_context", ""), token_budget=self.token_budget)
+        print(f"Assembled Context: ~{estimate_tokens(context)} tokens (budget {self.token_budget})")
+        return {"context": context}
     
 class AnswerGenerationAgent(BaseGenerationAgent):
     def __init__(self):
@@ -107,14 +168,104 @@ class AnswerGenerationAgent(BaseGenerationAgent):
             state (GraphState): The updated state of the graph
         """
         query = state["query"]
-        db_context = state["db_context"]
-        kg_context = state["kg_context"]
-        context = db_context + kg_context
+        context = state.get("context") or "\n\n".join(filter(None, [state["db_context"], state["kg_context"]]))
         
         print("------- Generating Answer -------")
         response = await self.tool.ainvoke({"query": query, "context": context})
         print(f"Generated Answer: {response}")
-        return {"answer": response}
+        return {"answer": response, "budget": charge_llm_call(query, context, response)}
+
+class GenerateAndGradeAgent(BaseGenerationAgent):
+    def __init__(self):
+        super().__init__(name="Generate and Grade Agent",
+                         tool=GenerateAndGradeTool().get_tool())
+        self.counts = {"settled": 0, "escalated": 0}
+    
+    @override
+    async def generate(self, state: GraphState) -> GraphState:
+        """
+        Agent that generates an answer from the Retrieved Context and grades it in the same LLM call.
+        The self-grade is borderline when its confidence is below FAST_PATH_MIN_CONFIDENCE, or a score is within
+        FAST_PATH_SCORE_MARGIN of the grading threshold; `fast_path` records whether it settles the answer or escalates it.
+
+        Args:
+            state (GraphState): The state of the graph
+
+        Returns:
+            state (GraphState): The updated state of the graph
+        """
+        query = state["query"]
+        context = state.get("context") or "\n\n".join(filter(None, [state["db_context"], state["kg_context"]]))
+        
+        print("------- Generating and Self-Grading Answer -------")
+        result = await self.tool.ainvoke({"query": query, "context": context})
+        print(f"Generated Answer: {result['answer']}")
+        print(f"Self-Graded Metric Scores: {result['evaluation']} (confidence {result['confidence']})")
+
+        near_threshold = scores_near_threshold(result["evaluation"])
+        fast_path = "escalated" if result["confidence"] < FAST_PATH_MIN_CONFIDENCE or near_threshold else "settled"
+        self.counts[fast_path] += 1
+        total = sum(self.counts.values())
+        print(f"Fast path: confidence {result['confidence']}, near threshold: {near_threshold or 'none'}, "
+              f"{'escalating to the grader' if fast_path == 'escalated' else 'settled'} "
+              f"({self.counts['escalated']}/{total} escalated)")
+        
+        update = {
+            "answer": result["answer"],
+            "metrics": dict(result["evaluation"]),
+            "reasons": {},
+            "confidence": result["confidence"],
+            "grade_source": "self",
+            "fast_path": fast_path,
+            "budget": charge_llm_call(query, context, result)
+        }
+        score = min(result["evaluation"].values(), default=-1)
+        if score > state.get("best_score", -1):
+            update["best_answer"], update["best_score"] = result["answer"], score
+        return update
+
+    def stats(self) -> dict:
+        total = sum(self.counts.values())
+        return {**self.counts, "escalation_rate": self.counts["escalated"] / total if total else 0.0}
+
+class PreGradingAgent(BaseAgent):
+    def __init__(self, pre_grader=local_pre_grader):
+        super().__init__(name="Pre-Grading Agent")
+        self.pre_grader = pre_grader
+        # samples settled answers for the agreement metric
+        self.shadow_grader = GradeAnswerTool()
+    
+    async def grade(self, state: GraphState) -> GraphState:
+        """
+        Agent that pre-grades the answer on CPU, settling clearly good or clearly insufficient answers
+        without an LLM call. Uncertain answers are left to the Answer Grading Agent.
+
+        Args:
+            state (GraphState): The state of the graph
+
+        Returns:
+            state (GraphState): The updated state of the graph
+        """
+        print("------- Pre-Grading Answer -------")
+        query, answer = state["query"], state["answer"]
+        # refined answers are grounded in the web search rather than the retrieved passages
+        if state.get("websearch_context"):
+            context, passages = state["websearch_context"], None
+        else:
+            context = state.get("context") or "\n\n".join(filter(None, [state["db_context"], state["kg_context"]]))
+            passages = state.get("db_passages")
+        pre_grade = await self.pre_grader.grade(query, answer, context, passages, shadow_grader=self.shadow_grader.grade_answer_async)
+
+        verdict = pre_grade["verdict"]
+        if verdict == "uncertain":
+            return {"pre_grade": pre_grade, "grade_source": "llm"}
+        
+        # settled answers score just past the threshold when good, and lowest when insufficient
+        pre_grade["score"] = GRADE_THRESHOLD + 1 if verdict == "good" else 0
+        update = {"pre_grade": pre_grade, "grade_source": "pre_grader", "metrics": {}, "reasons": {}}
+        if pre_grade["score"] > state.get("best_score", -1):
+            update["best_answer"], update["best_score"] = answer, pre_grade["score"]
+        return update
 
 class AnswerGradingAgent(BaseGenerationAgent):
     def __init__(self):
@@ -122,12 +273,15 @@ class AnswerGradingAgent(BaseGenerationAgent):
                          tool=GradeAnswerTool().get_tool())
     
     @override
-    async def generate(self, state: GraphState) -> GraphState:
+    async def generate(self, state: GraphState, config: RunnableConfig = None) -> GraphState:
         """
-        Agent that grades the answer generated by the Answer Generation Agent
+        Agent that grades the answer generated by the Answer Generation Agent.
+        The grader returns as soon as its scores decide the routing, so the reasons may still be empty here;
+        they are handed to the `on_grader_reasons` callback in the run's configurable once they have streamed.
 
         Args:
             state (GraphState): The state of the graph
+            config (RunnableConfig, optional): The run config, which may carry `on_grader_reasons`
 
         Returns:
             state (GraphState): The updated state of the graph
@@ -135,20 +289,22 @@ class AnswerGradingAgent(BaseGenerationAgent):
         print("------- Grading Answer -------")
         query = state["query"]
         answer = state["answer"]
-        result = await self.tool.ainvoke({"query": query, "answer": answer})
-        evaluation, reasoning = result['evaluation'], result['reasoning']
-        
-        relevance, completeness, coherence, correctness = evaluation["relevance"], evaluation["completeness"], evaluation["coherence"], evaluation["correctness"]
-        reason_relevance, reason_completeness, reason_coherence, reason_correctness = reasoning["relevance"], reasoning["completeness"], reasoning["coherence"], reasoning["correctness"]
+        # the tool reads `on_grader_reasons` from the run config
+        result = await self.tool.ainvoke({"query": query, "answer": answer}, config=config)
+        evaluation, reasoning = result['evaluation'], result.get('reasoning') or {}
         
-        metrics, reasons = state["metrics"], state["reasons"]
-        metrics["relevance"], metrics["completeness"], metrics["coherence"], metrics["correctness"] = relevance, completeness, coherence, correctness
-        reasons["relevance"], reasons["completeness"], reasons["coherence"], reasons["correctness"] = reason_relevance, reason_completeness, reason_coherence, reason_correctness
-        
-        return {
-            "metrics": metrics,
-            "reasons": reasons
+        # fresh dicts: the base inputs are shared across runs
+        update = {
+            "metrics": dict(evaluation),
+            "reasons": dict(reasoning),
+            "grade_source": "llm",
+            "budget": charge_llm_call(query, answer, result)
         }
+        # an answer is as good as its weakest metric
+        score = min(evaluation.values(), default=-1)
+        if score > state.get("best_score", -1):
+            update["best_answer"], update["best_score"] = answer, score
+        return update
         
 class AnswerRefineAgent(BaseGenerationAgent):
     def __init__(self):
@@ -172,12 +328,24 @@ class AnswerRefineAgent(BaseGenerationAgent):
         query = state["query"]
         answer = state["answer"]
         websearch_context = state["websearch_context"]
-        refined_answer = await self.tool.invoke({"query": query, "answer": answer, "websearch_context": websearch_context})
-        return {"answer": refined_answer}
+        refined_answer = await self.tool.ainvoke({"query": query, "answer": answer, "websearch_context": websearch_context})
+        return {
+            "answer": refined_answer,
+            "budget": {**charge_llm_call(query, answer, websearch_context, refined_answer), "iterations": 1}
+        }
     
+def answer_score(state: GraphState) -> int:
+    """
+    The grade of the current answer: its lowest metric score, or the pre-grader's score when the pre-grader settled it
+    """
+    if state.get("grade_source") == "pre_grader":
+        return state["pre_grade"]["score"]
+    return min(state["metrics"].values(), default=-1)
+
 def decide_metrics_agent(state: GraphState) -> GraphState:
     """
-    Checks the metrics of the answer generated and decides if they are good enough
+    Checks the grade of the answer generated and decides if it is good enough.
+    The grade comes from the LLM grader (or the fast path's self-grade) as metric scores, or from the pre-grader as a verdict.
 
     Args:
         state (GraphState): The state of the graph
@@ -187,9 +355,72 @@ def decide_metrics_agent(state: GraphState) -> GraphState:
     """
     
     print("------- Deciding If Requires Extra Context from KG -------")
-    metrics_scores = state["metrics"]
-    print(f"Metric Scores: {metrics_scores}")
-    for metric, score in metrics_scores.items():
-        if score <= 7:
-            return "not good enough"
-    return "good"
\ No newline at end of file
+    if state.get("grade_source") == "pre_grader":
+        print(f"Pre-Grade: {state['pre_grade']['verdict']}")
+        good = state["pre_grade"]["verdict"] == "good"
+    else:
+        metrics_scores = state["metrics"]
+        print(f"Metric Scores: {metrics_scores}")
+        good = all(score > GRADE_THRESHOLD for score in metrics_scores.values())
+    
+    if not good:
+        reason = exhausted_reason(state.get("budget") or {})
+        if reason:
+            print(f"Budget exhausted ({reason}), stopping the refine loop")
+            return "exhausted"
+        return "not good enough"
+    # the answer stands, so a web search started speculatively is not needed
+    speculative_websearch.discard(state.get("request_id"))
+    return "good"
+
+def decide_pre_grade_agent(state: GraphState) -> str:
+    """
+    Routes on the pre-grade when it settled the answer, and to the LLM grader otherwise
+
+    Args:
+        state (GraphState): The state of the graph
+
+    Returns:
+        str: "uncertain", or the decision of `decide_metrics_agent`
+    """
+    if state.get("grade_source") != "pre_grader":
+        print(f"Pre-grader uncertain, escalating to the LLM grader (pre-grader: {local_pre_grader.stats()})")
+        return "uncertain"
+    return decide_metrics_agent(state)
+
+def decide_fast_path_agent(state: GraphState) -> str:
+    """
+    Routes on the fast path's self-grade, unless the Generate and Grade Agent found it borderline,
+    in which case the answer goes to the standalone grader
+
+    Args:
+        state (GraphState): The state of the graph
+
+    Returns:
+        str: "borderline", or the decision of `decide_metrics_agent`
+    """
+    print("------- Deciding If the Self-Grade Settles the Answer -------")
+    if state.get("fast_path") == "escalated":
+        return "borderline"
+    return decide_metrics_agent(state)
+
+def finalize_answer_agent(state: GraphState) -> GraphState:
+    """
+    Ends the run with the best-graded answer seen, which is the current one unless the budget ran out first,
+    and reports the consumed budget
+
+    Args:
+        state (GraphState): The state of the graph
+
+    Returns:
+        GraphState: The updated state of the graph
+    """
+    print("------- Finalizing Answer -------")
+    answer = state["answer"]
+    score = answer_score(state)
+    if state.get("best_answer") and state.get("best_score", -1) > score:
+        print(f"Returning an earlier answer, graded {state['best_score']} against {score} for the last one")
+        answer = state["best_answer"]
+    budget_report = format_budget(state.get("budget") or {})
+    print(f"Budget consumed: {budget_report}")
+    return {"answer": answer, "budget_report": budget_report}
\ No newline at end of file
@@ -0,0 +1,66 @@
+import os
+import time
+
+from typing import Dict, Optional
+
+from src.chatbot.context import estimate_tokens
+
+# Per-request limits on the generate -> grade -> websearch -> refine loop
+BUDGET_SECONDS = float(os.getenv("BUDGET_SECONDS", "90"))
+BUDGET_LLM_CALLS = int(os.getenv("BUDGET_LLM_CALLS", "8"))
+BUDGET_TOKENS = int(os.getenv("BUDGET_TOKENS", "40000"))
+MAX_REFINE_ITERATIONS = int(os.getenv("MAX_REFINE_ITERATIONS", "2"))
+# LLM calls one more refinement needs: refine + grade
+REFINE_LLM_CALLS = 2
+
+COUNTERS = ("llm_calls", "tokens", "iterations")
+
+def new_budget() -> Dict:
+    """
+    The consumed budget of a request that has not started yet
+    """
+    return {"started_at": time.time(), "llm_calls": 0, "tokens": 0, "iterations": 0}
+
+def merge_budget(current: Dict, update: Dict) -> Dict:
+    """
+    Reducer for `GraphState.budget`: nodes write what they consumed, and the counters add up.
+    The start time is taken from the first write, normally the graph input.
+    """
+    merged = {key: (current or {}).get(key, 0) + (update or {}).get(key, 0) for key in COUNTERS}
+    merged["started_at"] = (current or {}).get("started_at") or (update or {}).get("started_at") or time.time()
+    return merged
+
+def charge_llm_call(*texts: str) -> Dict:
+    """
+    The budget consumed by one LLM call, with tokens estimated from its inputs and output
+    """
+    return {"llm_calls": 1, "tokens": sum(estimate_tokens(str(text)) for text in texts)}
+
+def elapsed_seconds(budget: Dict) -> float:
+    return time.time() - budget.get("started_at", time.time())
+
+def exhausted_reason(budget: Dict) -> Optional[str]:
+    """
+    Why another refinement would overrun the budget, or None if it fits
+
+    Args:
+        budget (Dict): The consumed budget of the request
+
+    Returns:
+        Optional[str]: The limit that was reached
+    """
+    if budget.get("iterations", 0) >= MAX_REFINE_ITERATIONS:
+        return f"{MAX_REFINE_ITERATIONS} refine iterations"
+    if elapsed_seconds(budget) >= BUDGET_SECONDS:
+        return f"{BUDGET_SECONDS:.0f}s time budget"
+    if budget.get("llm_calls", 0) + REFINE_LLM_CALLS > BUDGET_LLM_CALLS:
+        return f"{BUDGET_LLM_CALLS} LLM calls"
+    if budget.get("tokens", 0) >= BUDGET_TOKENS:
+        return f"{BUDGET_TOKENS} tokens"
+    return None
+
+def format_budget(budget: Dict) -> str:
+    return (f"{elapsed_seconds(budget):.1f}s / {BUDGET_SECONDS:.0f}s, "
+            f"{budget.get('llm_calls', 0)} / {BUDGET_LLM_CALLS} LLM calls, "
+            f"~{budget.get('tokens', 0)} / {BUDGET_TOKENS} tokens, "
+            f"{budget.get('iterations', 0)} / {MAX_REFINE_ITERATIONS} refine iterations")
@@ -0,0 +1,93 @@
+import os
+import re
+
+from bs4 import BeautifulSoup
+from lxml import etree, html as lxml_html
+
+# "lxml" (default) walks an lxml tree directly, "html.parser" goes through BeautifulSoup.
+# Either parser only runs on pages that contain markup at all
+CLEANING_PARSER = os.getenv("CLEANING_PARSER", "lxml")
+# Safety cap on the words kept per page; the query-aware passage selection decides what reaches the prompt
+WEBSEARCH_MAX_WORDS = int(os.getenv("WEBSEARCH_MAX_WORDS", "5000"))
+
+URL_PATTERN = re.compile(r'https?://\S+|www\.\S+')
+# Common boilerplate phrases (case-insensitive), in one alternation instead of one pass each.
+# The lookahead on the phrases' first letters lets the engine skip most positions without trying every alternative
+BOILERPLATE_PATTERN = re.compile(
+    r'(?=[acflpst])(?:copyright ©.*'
+    r'|all rights reserved'
+    r'|terms (of use|and conditions)'
+    r'|privacy policy'
+    r'|cookie policy'
+    r'|(log|sign) (in|out|up)'
+    r'|subscribe to our newsletter'
+    r'|follow us on social media)',
+    flags=re.IGNORECASE,
+)
+EMAIL_PATTERN = re.compile(r'\S+@\S+\.\S+')
+PAGE_NUMBER_PATTERN = re.compile(r'page \d+ of \d+')
+LAST_UPDATED_PATTERN = re.compile(r'last updated:?\s*\d{1,2}[-/]\d{1,2}[-/]\d{2,4}')
+REMOVED_ELEMENTS = ["script", "style", "nav", "footer", "header"]
+
+def extract_text_soup(content: str) -> str:
+    soup = BeautifulSoup(content, 'html.parser')
+    for element in soup(REMOVED_ELEMENTS):
+        element.decompose()
+    return soup.get_text(separator=' ', strip=True)
+
+def extract_text_lxml(content: str) -> str:
+    """
+    Same text as `extract_text_soup` once whitespace is collapsed: BeautifulSoup separates every string with a space,
+    so the tail of each removed element keeps a leading space when the element is stripped.
+    One known difference: libxml2 drops unmatched end tags, so "a</div>b" reads "ab" rather than "a b".
+    """
+    try:
+        root = lxml_html.document_fromstring(content)
+    except (etree.ParserError, ValueError):
+        return extract_text_soup(content)
+    for element in root.iter(*REMOVED_ELEMENTS):
+        if element.tail:
+            element.tail = ' ' + element.tail
+    etree.strip_elements(root, *REMOVED_ELEMENTS, with_tail=False)
+    return ' '.join(root.itertext())
+
+def extract_text(content: str) -> str:
+    # crawl4ai returns markdown, which usually has no markup left: skip parsing entirely then
+    if "<" not in content and "&" not in content:
+        return content
+    if CLEANING_PARSER == "lxml":
+        return extract_text_lxml(content)
+    return extract_text_soup(content)
+
+def clean_content(content: str) -> str:
+    """
+    Clean the content by removing boilerplate text, headers, and irrelevant information.
+
+    Module-level so it can run in a process pool. Whitespace is collapsed with str.split, and the final collapse
+    doubles as the short-line filter: after the first collapse the text is a single line, so it is dropped
+    when it has 3 words or fewer.
+    """
+    # each pass is skipped when the literal it needs is absent
+    text = extract_text(content)
+    if 'http' in text or 'www.' in text:
+        text = URL_PATTERN.sub('', text)
+    text = ' '.join(text.split())
+    text = BOILERPLATE_PATTERN.sub('', text)
+    if '@' in text:
+        text = EMAIL_PATTERN.sub('', text)
+    if 'page ' in text:
+        text = PAGE_NUMBER_PATTERN.sub('', text)
+    if 'last updated' in text:
+        text = LAST_UPDATED_PATTERN.sub('', text)
+
+    words = text.split()
+    return ' '.join(words) if len(words) > 3 else ''
+
+def clean_page(content: str, max_words: int = WEBSEARCH_MAX_WORDS) -> str:
+    """
+    Cleans a crawled page and truncates it to ~`max_words` words
+    """
+    words = clean_content(content).split()
+    if len(words) > max_words:
+        return ' '.join(words[:max_words]) + '...'
+    return ' '.join(words)
@@ -0,0 +1,239 @@
+import math
+import os
+import re
+
+import numpy as np
+
+from collections import Counter
+from typing import Dict, List, Optional, Set, Tuple
+
+CONTEXT_TOKEN_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET", "3000"))
+MMR_LAMBDA = float(os.getenv("MMR_LAMBDA", "0.7"))
+DEDUP_THRESHOLD = float(os.getenv("CONTEXT_DEDUP_THRESHOLD", "0.8"))
+WEB_CONTEXT_TOKEN_BUDGET = int(os.getenv("WEB_CONTEXT_TOKEN_BUDGET", "1500"))
+WEB_PASSAGE_WORDS = int(os.getenv("WEB_PASSAGE_WORDS", "80"))
+BM25_K1 = 1.5
+BM25_B = 0.75
+
+# Preamble llama-index prepends to every KG node's triplets
+KG_PREAMBLE = "Here are some facts extracted from the provided text:"
+WORD_PATTERN = re.compile(r"\w+")
+SENTENCE_PATTERN = re.compile(r"(?<=[.!?])\s+")
+
+def estimate_tokens(text: str) -> int:
+    """
+    Rough token count (~4 characters per token), good enough for budgeting prompts
+    """
+    return max(1, len(text) // 4)
+
+def shingles(text: str, n: int = 3) -> Set[tuple]:
+    """
+    Word n-grams of the lowercased text, used for near-duplicate detection
+    """
+    words = WORD_PATTERN.findall(text.lower())
+    if len(words) < n:
+        return {tuple(words)} if words else set()
+    return {tuple(words[i:i + n]) for i in range(len(words) - n + 1)}
+
+def containment(candidate: Set[tuple], other: Set[tuple]) -> float:
+    """
+    Fraction of the candidate's shingles that also appear in the other passage
+    """
+    if not candidate:
+        return 1.0
+    return len(candidate & other) / len(candidate)
+
+def cosine(a, b) -> float:
+    a, b = np.asarray(a, dtype=np.float32), np.asarray(b, dtype=np.float32)
+    denominator = np.linalg.norm(a) * np.linalg.norm(b)
+    return float(a @ b / denominator) if denominator else 0.0
+
+def make_passage(text: str, origin: str, source: Optional[str] = None,
+                 relevance: Optional[float] = None, embedding: Optional[list] = None) -> Dict:
+    """
+    A retrieved passage, as stored in the graph state
+
+    Args:
+        text (str): The passage text
+        origin (str): Where it came from, e.g. "vector" or "kg"
+        source (str, optional): The source document
+        relevance (float, optional): Similarity to the user query, if known
+        embedding (list, optional): The dense embedding of the passage, if already computed
+    """
+    return {"text": text, "origin": origin, "source": source, "relevance": relevance, "embedding": embedding}
+
+def format_passage(passage: Dict) -> str:
+    if passage.get("source"):
+        return f"Source: {passage['source']}\nContext: {passage['text']}"
+    return passage["text"]
+
+def passages_from_kg_context(kg_context: str) -> List[Dict]:
+    """
+    Splits the KG context into passages: each block of triplets and each source chunk becomes its own passage,
+    and triplet lines already seen in an earlier node are dropped.
+    """
+    passages, seen_lines = [], set()
+    for block in re.split(r"\n\s*\n", kg_context or ""):
+        lines = [line.strip() for line in block.splitlines() if line.strip() and line.strip() != KG_PREAMBLE]
+        lines = [line for line in lines if line not in seen_lines]
+        seen_lines.update(lines)
+        if lines:
+            passages.append(make_passage("\n".join(lines), origin="kg"))
+    return passages
+
+def deduplicate(passages: List[Dict], threshold: float = DEDUP_THRESHOLD) -> List[Dict]:
+    """
+    Drops passages that are (near-)contained in a passage kept earlier. Earlier passages win, so pass the richer source first.
+    """
+    kept, kept_shingles = [], []
+    for passage in passages:
+        passage_shingles = shingles(passage["text"])
+        if any(containment(passage_shingles, other) >= threshold for other in kept_shingles):
+            continue
+        kept.append(passage)
+        kept_shingles.append(passage_shingles)
+    return kept
+
+def normalised_relevance(passages: List[Dict]) -> List[float]:
+    """
+    Min-max normalises relevance within each origin, so vector (cosine) and KG (rank order) passages are comparable.
+    Passages without a relevance score are ranked by their retrieval order.
+    """
+    relevance = [0.0] * len(passages)
+    for origin in {passage["origin"] for passage in passages}:
+        indices = [i for i, passage in enumerate(passages) if passage["origin"] == origin]
+        raw = [passages[i]["relevance"] if passages[i]["relevance"] is not None else -rank for rank, i in enumerate(indices)]
+        low, high = min(raw), max(raw)
+        for i, value in zip(indices, raw):
+            relevance[i] = (value - low) / (high - low) if high > low else 1.0
+    return relevance
+
+def similarity(a: Dict, b: Dict, shingles_a: Set[tuple], shingles_b: Set[tuple]) -> float:
+    if a.get("embedding") is not None and b.get("embedding") is not None:
+        return cosine(a["embedding"], b["embedding"])
+    union = shingles_a | shingles_b
+    return len(shingles_a & shingles_b) / len(union) if union else 0.0
+
+def mmr_select(passages: List[Dict], token_budget: int = CONTEXT_TOKEN_BUDGET, mmr_lambda: float = MMR_LAMBDA) -> List[Dict]:
+    """
+    Greedy Maximal Marginal Relevance selection under a token budget
+
+    Args:
+        passages (List[Dict]): The candidate passages
+        token_budget (int): Maximum estimated tokens of the selected passages
+        mmr_lambda (float): Trade-off between relevance (1.0) and diversity (0.0)
+
+    Returns:
+        List[Dict]: The selected passages, in selection order
+    """
+    relevance = normalised_relevance(passages)
+    passage_shingles = [shingles(passage["text"]) for passage in passages]
+    tokens = [estimate_tokens(format_passage(passage)) for passage in passages]
+
+    selected, remaining, used = [], list(range(len(passages))), 0
+    while remaining:
+        best, best_score = None, None
+        for i in remaining:
+            if used + tokens[i] > token_budget:
+                continue
+            redundancy = max((similarity(passages[i], passages[j], passage_shingles[i], passage_shingles[j]) for j in selected), default=0.0)
+            score = mmr_lambda * relevance[i] - (1 - mmr_lambda) * redundancy
+            if best_score is None or score > best_score:
+                best, best_score = i, score
+        if best is None:
+            break
+        selected.append(best)
+        remaining.remove(best)
+        used += tokens[best]
+
+    return [passages[i] for i in selected]
+
+def assemble_context(db_passages: List[Dict], kg_context: str, token_budget: int = CONTEXT_TOKEN_BUDGET) -> str:
+    """
+    Builds the generation context: deduplicates vector chunks and KG passages, selects with MMR and enforces the token budget
+
+    Args:
+        db_passages (List[Dict]): The passages retrieved from the Vector DB
+        kg_context (str): The context retrieved from the knowledge graph
+        token_budget (int): Maximum estimated tokens of the context
+
+    Returns:
+        str: The assembled context
+    """
+    passages = deduplicate(list(db_passages or []) + passages_from_kg_context(kg_context))
+    selected = mmr_select(passages, token_budget=token_budget)
+    return "\n\n".join(format_passage(passage) for passage in selected)
+
+def split_passages(text: str, max_words: int = WEB_PASSAGE_WORDS) -> List[str]:
+    """
+    Splits a cleaned page into passages of whole sentences, about `max_words` words each.
+    Sentences longer than `max_words` are split on word boundaries.
+    """
+    passages, current, length = [], [], 0
+    for sentence in SENTENCE_PATTERN.split(text):
+        words = sentence.split()
+        for start in range(0, len(words), max_words):
+            piece = words[start:start + max_words]
+            if current and length + len(piece) > max_words:
+                passages.append(" ".join(current))
+                current, length = [], 0
+            current.extend(piece)
+            length += len(piece)
+    if current:
+        passages.append(" ".join(current))
+    return passages
+
+def bm25_scores(query: str, passages: List[str], k1: float = BM25_K1, b: float = BM25_B) -> List[float]:
+    """
+    Okapi BM25 score of each passage for the query, with the passages themselves as the corpus
+    """
+    documents = [Counter(WORD_PATTERN.findall(passage.lower())) for passage in passages]
+    if not documents:
+        return []
+    lengths = [sum(document.values()) for document in documents]
+    average_length = sum(lengths) / len(lengths) or 1.0
+    scores = [0.0] * len(documents)
+    for term in set(WORD_PATTERN.findall(query.lower())):
+        frequency = sum(1 for document in documents if term in document)
+        if not frequency:
+            continue
+        idf = math.log(1 + (len(documents) - frequency + 0.5) / (frequency + 0.5))
+        for i, document in enumerate(documents):
+            tf = document.get(term, 0)
+            if tf:
+                scores[i] += idf * tf * (k1 + 1) / (tf + k1 * (1 - b + b * lengths[i] / average_length))
+    return scores
+
+def select_web_passages(query: str, pages: Dict[str, str], token_budget: int = WEB_CONTEXT_TOKEN_BUDGET) -> List[Tuple[str, List[str]]]:
+    """
+    Keeps the web passages most relevant to the query (BM25) that fit in the token budget
+
+    Args:
+        query (str): The user query
+        pages (Dict[str, str]): url -> cleaned page content, in search rank order
+        token_budget (int): Maximum estimated tokens of the selected passages
+
+    Returns:
+        List[Tuple[str, List[str]]]: (url, selected passages in page order) for every page with a selected passage
+    """
+    candidates = [(url, position, passage) for url, content in pages.items() for position, passage in enumerate(split_passages(content))]
+    scores = bm25_scores(query, [passage for _, _, passage in candidates])
+    # without any term overlap, fall back to the leading passages of each page in rank order
+    order = sorted(range(len(candidates)), key=lambda i: (-scores[i], candidates[i][1])) if any(scores) \
+        else sorted(range(len(candidates)), key=lambda i: candidates[i][1])
+
+    selected, used = set(), 0
+    for i in order:
+        tokens = estimate_tokens(candidates[i][2])
+        if used + tokens <= token_budget:
+            selected.add(i)
+            used += tokens
+
+    print(f"Web Context: kept {len(selected)}/{len(candidates)} passages, ~{used} of "
+          f"~{sum(estimate_tokens(passage) for _, _, passage in candidates)} tokens")
+    selection = []
+    for url in pages:
+        passages = [candidates[i][2] for i in sorted(selected) if candidates[i][0] == url]
+        if passages:
+            selection.append((url, passages))
+    return selection
@@ -0,0 +1,23 @@
+import re
+
+from typing import Dict
+
+# Scores at or below the threshold send the answer to websearch
+GRADE_THRESHOLD = 7
+GRADER_METRICS = ("relevance", "completeness", "coherence", "correctness")
+GRADER_SCORE_PATTERN = re.compile(r'"(relevance|completeness|coherence|correctness)"\s*:\s*(\d+)\s*[,}]')
+
+def parse_scores(text: str) -> Dict[str, int]:
+    """
+    Extracts the integer scores from (possibly partial) grader JSON. Reasoning keys never match, since their values are strings.
+    """
+    scores = {}
+    for metric, score in GRADER_SCORE_PATTERN.findall(text):
+        scores.setdefault(metric, int(score))
+    return scores
+
+def is_decided(scores: Dict[str, int]) -> bool:
+    """
+    Whether the scores known so far decide the routing: any metric at or below the threshold, or all of them known
+    """
+    return any(score <= GRADE_THRESHOLD for score in scores.values()) or len(scores) == len(GRADER_METRICS)
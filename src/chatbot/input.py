@@ -1,12 +1,24 @@
 from collections import defaultdict
 
 BASE_INPUTS = {
+    "request_id": "",
     "query": "",
+    "query_list": [],
     "agent": "",
     "kg_context": "",
     "db_context": "",
+    "db_passages": [],
+    "context": "",
     "websearch_context": "",
     "metrics": defaultdict(str),
     "reasons": defaultdict(str),
+    "confidence": 0,
+    "grade_source": "",
+    "fast_path": "",
+    "pre_grade": {},
     "answer": "",
+    "best_answer": "",
+    "best_score": -1,
+    "budget": {},
+    "budget_report": "",
 }
\ No newline at end of file
@@ -0,0 +1,185 @@
+import asyncio
+import os
+import random
+import re
+
+from typing import Awaitable, Callable, Dict, List, Optional
+
+from src.chatbot.context import WORD_PATTERN, cosine
+from src.chatbot.grading import GRADE_THRESHOLD
+from src.services.executors import embedding_executor, run_in_executor
+
+# Route on the local pre-grade when it is clear-cut, and only call the LLM grader otherwise.
+# Off by default until the shadow agreement with the LLM grader has been measured
+PRE_GRADER = os.getenv("PRE_GRADER", "false").lower() == "true"
+# An answer is clearly good when it is long enough, covers the query terms and is close to both the query and the context
+PREGRADE_GOOD_QUERY_SIMILARITY = float(os.getenv("PREGRADE_GOOD_QUERY_SIMILARITY", "0.75"))
+PREGRADE_GOOD_CONTEXT_SIMILARITY = float(os.getenv("PREGRADE_GOOD_CONTEXT_SIMILARITY", "0.8"))
+PREGRADE_GOOD_COVERAGE = float(os.getenv("PREGRADE_GOOD_COVERAGE", "0.8"))
+PREGRADE_MIN_WORDS = int(os.getenv("PREGRADE_MIN_WORDS", "25"))
+# ... and clearly insufficient when it barely relates to the query at all
+PREGRADE_POOR_QUERY_SIMILARITY = float(os.getenv("PREGRADE_POOR_QUERY_SIMILARITY", "0.5"))
+PREGRADE_POOR_COVERAGE = float(os.getenv("PREGRADE_POOR_COVERAGE", "0.3"))
+# Fraction of settled answers also sent to the LLM grader in the background, to measure agreement
+PREGRADE_SHADOW_RATE = float(os.getenv("PREGRADE_SHADOW_RATE", "0.1"))
+
+# Only refusals tied to the context: "the provided context does not ...", "I cannot answer ..."
+REFUSAL_PATTERN = re.compile(
+    r"\bthe (?:provided |given |retrieved )?context (?:does not|doesn't|did not) (?:provide|contain|mention|include|specify|address)\b"
+    r"|\bI (?:cannot|can't|am unable to|am not able to) (?:answer|find|determine)\b",
+    flags=re.IGNORECASE,
+)
+STOPWORDS = {
+    "the", "and", "for", "are", "what", "which", "who", "how", "why", "when", "where", "with", "that", "this",
+    "those", "these", "from", "into", "about", "some", "any", "can", "could", "should", "would", "does", "did",
+    "please", "suggest", "tell", "give", "list", "explain", "describe", "there", "their", "them", "they", "its",
+    "was", "were", "been", "being", "have", "has", "had", "you", "your", "our", "particularly", "potential",
+}
+
+def content_terms(text: str) -> List[str]:
+    return list(dict.fromkeys(word for word in WORD_PATTERN.findall(text.lower()) if len(word) > 2 and word not in STOPWORDS))
+
+def term_coverage(query: str, answer: str) -> float:
+    """
+    Fraction of the query's content terms that the answer mentions, matching on a 5-character prefix as a cheap stemmer
+    """
+    terms = content_terms(query)
+    if not terms:
+        return 1.0
+    answer_stems = {word[:5] for word in WORD_PATTERN.findall(answer.lower())}
+    return sum(term[:5] in answer_stems for term in terms) / len(terms)
+
+def embed_texts(texts: List[str]) -> List[list]:
+    # the embedding models load on import, so they are only imported once an answer is actually pre-graded
+    from src.services.embedding_models import bge_embed_model
+
+    # passage-side bge embeddings (no query instruction), as for the indexed chunks
+    return [embedding.tolist() for embedding in bge_embed_model.embed(texts)]
+
+class LocalPreGrader:
+    """
+    CPU-only pre-grading of an answer, to spare the LLM grader the clear-cut cases:
+    - "good": no deflection, at least `min_words` words, covers the query terms and is semantically close
+      to both the query and the retrieved context
+    - "insufficient": barely relates to the query
+    - "uncertain": anything else, escalated to the LLM grader. This includes answers that deflect
+      ("the context does not provide..."), since a partial answer may still be good enough
+
+    The features are the bge similarity of the answer to the query and to the best-matching context passage,
+    the query term coverage, the answer length and the refusal patterns. A `shadow_rate` fraction of the settled
+    answers is also graded by the LLM grader in the background, and the agreement is logged with the escalation rate.
+    """
+    def __init__(self,
+                 good_query_similarity: float = PREGRADE_GOOD_QUERY_SIMILARITY,
+                 good_context_similarity: float = PREGRADE_GOOD_CONTEXT_SIMILARITY,
+                 good_coverage: float = PREGRADE_GOOD_COVERAGE,
+                 min_words: int = PREGRADE_MIN_WORDS,
+                 poor_query_similarity: float = PREGRADE_POOR_QUERY_SIMILARITY,
+                 poor_coverage: float = PREGRADE_POOR_COVERAGE,
+                 shadow_rate: float = PREGRADE_SHADOW_RATE):
+        self.good_query_similarity = good_query_similarity
+        self.good_context_similarity = good_context_similarity
+        self.good_coverage = good_coverage
+        self.min_words = min_words
+        self.poor_query_similarity = poor_query_similarity
+        self.poor_coverage = poor_coverage
+        self.shadow_rate = shadow_rate
+        self.counts = {"good": 0, "insufficient": 0, "uncertain": 0}
+        self.shadow_total = 0
+        self.shadow_agreed = 0
+        self.background_tasks = set()
+
+    async def features(self, query: str, answer: str, context: str, passages: Optional[List[Dict]] = None) -> Dict:
+        """
+        Computes the pre-grading features of an answer
+
+        Args:
+            query (str): The user query
+            answer (str): The answer to grade
+            context (str): The context the answer was generated from
+            passages (List[Dict], optional): The retrieved passages; their stored dense embeddings are reused when present
+
+        Returns:
+            Dict: query_similarity, context_similarity, coverage, words and refusal
+        """
+        from src.services.embedding_models import embed_query_async
+
+        passage_embeddings = [passage["embedding"] for passage in passages or [] if passage.get("embedding") is not None]
+        texts = [answer] if passage_embeddings or not context else [answer, context]
+        (query_embedding, _), embeddings = await asyncio.gather(embed_query_async(query),
+                                                                run_in_executor(embedding_executor, embed_texts, texts))
+        answer_embedding = embeddings[0]
+        passage_embeddings = passage_embeddings or embeddings[1:]
+        return {
+            "query_similarity": cosine(query_embedding, answer_embedding),
+            "context_similarity": max((cosine(answer_embedding, embedding) for embedding in passage_embeddings), default=0.0),
+            "coverage": term_coverage(query, answer),
+            "words": len(answer.split()),
+            "refusal": bool(REFUSAL_PATTERN.search(answer)),
+        }
+
+    def decide(self, features: Dict) -> str:
+        """
+        Maps the features to "good", "insufficient" or "uncertain"
+        """
+        if features["refusal"]:
+            return "uncertain"
+        if features["query_similarity"] < self.poor_query_similarity and features["coverage"] < self.poor_coverage:
+            return "insufficient"
+        if (features["words"] >= self.min_words
+                and features["coverage"] >= self.good_coverage
+                and features["query_similarity"] >= self.good_query_similarity
+                and features["context_similarity"] >= self.good_context_similarity):
+            return "good"
+        return "uncertain"
+
+    async def grade(self, query: str, answer: str, context: str, passages: Optional[List[Dict]] = None,
+                    shadow_grader: Optional[Callable[[str, str], Awaitable[dict]]] = None) -> Dict:
+        """
+        Pre-grades an answer
+
+        Args:
+            query (str): The user query
+            answer (str): The answer to grade
+            context (str): The context the answer was generated from
+            passages (List[Dict], optional): The retrieved passages
+            shadow_grader (Callable, optional): The LLM grader, sampled on settled answers to measure agreement
+
+        Returns:
+            Dict: The features, and the verdict ("good", "insufficient" or "uncertain")
+        """
+        features = await self.features(query, answer, context, passages)
+        verdict = self.decide(features)
+        self.counts[verdict] += 1
+        total = sum(self.counts.values())
+        print(f"Pre-grade: {verdict} ({', '.join(f'{key}={value:.2f}' if isinstance(value, float) else f'{key}={value}' for key, value in features.items())}), "
+              f"escalation rate {self.counts['uncertain'] / total:.0%} of {total}")
+
+        if verdict != "uncertain" and shadow_grader is not None and random.random() < self.shadow_rate:
+            task = asyncio.create_task(self.shadow(verdict, shadow_grader(query, answer)))
+            self.background_tasks.add(task)
+            task.add_done_callback(self.background_tasks.discard)
+        return {**features, "verdict": verdict}
+
+    async def shadow(self, verdict: str, grading: Awaitable[dict]) -> None:
+        try:
+            result = await grading
+        except Exception as e:
+            print(f"Pre-grade shadow grading failed: {e}")
+            return
+        llm_good = all(score > GRADE_THRESHOLD for score in result["evaluation"].values())
+        self.shadow_total += 1
+        self.shadow_agreed += (verdict == "good") == llm_good
+        print(f"Pre-grade shadow: pre-grader said {verdict}, LLM grader scored {result['evaluation']} "
+              f"(agreement {self.shadow_agreed}/{self.shadow_total})")
+
+    def stats(self) -> dict:
+        total = sum(self.counts.values())
+        return {
+            **self.counts,
+            "escalation_rate": self.counts["uncertain"] / total if total else 0.0,
+            "shadow_graded": self.shadow_total,
+            "shadow_agreement": self.shadow_agreed / self.shadow_total if self.shadow_total else 0.0,
+        }
+
+local_pre_grader = LocalPreGrader()
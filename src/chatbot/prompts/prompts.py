@@ -102,4 +102,65 @@ REFINE_ANSWER_PROMPT = """<system>
     <refined_answer>
     [Your refined answer here]
     </refined_answer>
+    """
+
+EXPAND_QUERY_PROMPT = """<system>
+    You are an expert search assistant for a medical knowledge base. Your task is to rewrite the user's query into alternative search queries that retrieve complementary information from a hybrid (dense + keyword) vector database.
+    </system>
+
+    <instructions>
+    - Generate exactly {num_queries} alternative queries for the user query below.
+    - Each alternative should target a different aspect of the query, or use different but equivalent terminology (e.g. synonyms, medical terms, drug classes).
+    - Keep each query short, specific and self-contained. Do not answer the query.
+    - Do not repeat the original query.
+    - Return the queries strictly in the JSON format below, with no additional commentary.
+    </instructions>
+
+    <query>
+    {query}
+    </query>
+
+    <output_format>
+    {{
+        "queries": ["alternative query 1", "alternative query 2"]
+    }}
+    </output_format>
+    """
+
+GENERATE_AND_GRADE_PROMPT = """<system>
+    You are an AI assistant that answers queries from the provided context, and then critically grades your own answer. Your goal is a concise, informative answer and an honest assessment of it.
+    </system>
+
+    <instruction>
+    1. Answer: Using only the provided context, write a clear, concise and complete answer that directly addresses the query, in a neutral, professional tone. Do not include introductory remarks or sentences such as "Based on the context".
+    2. Grade: Score your answer from 1 to 10 (whole numbers only) on four metrics:
+        - relevance: how directly the answer addresses the query. Answers that deflect or point out a lack of context score low.
+        - completeness: whether every aspect of the query is covered. Answers that avoid critical aspects score low.
+        - coherence: the logical flow, structure and readability of the answer.
+        - correctness: whether every statement is supported by the context, with no inaccuracies.
+    3. Confidence: Score from 1 to 10 how confident you are that an independent expert grader would give the same scores. Score low when the context is thin, conflicting or only partially relevant.
+    4. Be critical: do not inflate your scores. An answer that needs information missing from the context should not score above 7 on completeness.
+    5. Return strictly the JSON format below, with no additional commentary.
+    </instruction>
+
+    <query>
+    {query}
+    </query>
+
+    <context>
+    {context}
+    </context>
+
+    <output_format>
+    {{
+        "answer": "Your answer here",
+        "evaluation": {{
+            "relevance": 9,
+            "completeness": 8,
+            "coherence": 9,
+            "correctness": 9
+        }},
+        "confidence": 8
+    }}
+    </output_format>
     """
\ No newline at end of file
@@ -0,0 +1,122 @@
+import asyncio
+import os
+import time
+
+from typing import Any, Awaitable, Dict, Optional
+
+# Start the web search alongside answer generation instead of after a failed grade
+SPECULATIVE_WEBSEARCH = os.getenv("SPECULATIVE_WEBSEARCH", "false").lower() == "true"
+
+class Speculation:
+    """
+    One piece of speculative work in flight, and when it started and finished
+    """
+    def __init__(self, task: asyncio.Task):
+        self.task = task
+        self.launched_at = time.perf_counter()
+        self.finished_at: Optional[float] = None
+        task.add_done_callback(self._on_done)
+
+    def _on_done(self, task: asyncio.Task) -> None:
+        self.finished_at = time.perf_counter()
+
+class SpeculationRegistry:
+    """
+    Speculative work keyed by request id, so a later node of the same run can pick up what an earlier one started.
+
+    - `launch` starts the work in the background, at most once per request
+    - `take` hands the result to the node that needs it (awaiting it if still running), or None if there is none or it failed
+    - `discard` cancels work that turned out not to be needed
+
+    It tracks how often speculation pays off, and the latency it saved: the part of the work's duration
+    that had already elapsed when it was taken.
+    """
+    def __init__(self, name: str):
+        self.name = name
+        self.speculations: Dict[str, Speculation] = {}
+        self.launched = 0
+        self.used = 0
+        self.discarded = 0
+        self.failed = 0
+        self.saved_seconds = 0.0
+
+    def launch(self, request_id: str, work: Awaitable[Any]) -> bool:
+        """
+        Starts `work` in the background for a request
+
+        Args:
+            request_id (str): The id of the graph run
+            work (Awaitable): The coroutine to run speculatively
+
+        Returns:
+            bool: Whether it was launched; False if the request has no id or already has speculative work
+        """
+        if not request_id or request_id in self.speculations:
+            work.close()
+            return False
+        self.speculations[request_id] = Speculation(asyncio.ensure_future(work))
+        self.launched += 1
+        print(f"Speculative {self.name} launched for request {request_id}")
+        return True
+
+    async def take(self, request_id: str) -> Optional[Any]:
+        """
+        Returns the result of the speculative work for a request, waiting for it if it is still running
+
+        Args:
+            request_id (str): The id of the graph run
+
+        Returns:
+            Optional[Any]: The result, or None if nothing was launched or it failed
+        """
+        speculation = self.speculations.pop(request_id, None)
+        if speculation is None:
+            return None
+
+        start = time.perf_counter()
+        try:
+            result = await speculation.task
+        except asyncio.CancelledError:
+            if speculation.task.cancelled():
+                self.failed += 1
+                return None
+            raise
+        except Exception as e:
+            self.failed += 1
+            print(f"Speculative {self.name} failed, running it again: {e}")
+            return None
+
+        waited = time.perf_counter() - start
+        finished_at = speculation.finished_at or time.perf_counter()
+        saved = max(0.0, finished_at - speculation.launched_at - waited)
+        self.used += 1
+        self.saved_seconds += saved
+        print(f"Speculative {self.name} used for request {request_id}: waited {waited:.2f}s, saved {saved:.2f}s")
+        return result
+
+    def discard(self, request_id: str) -> None:
+        """
+        Cancels the speculative work for a request, if any is left
+        """
+        speculation = self.speculations.pop(request_id, None)
+        if speculation is None:
+            return
+        if speculation.task.done() and not speculation.task.cancelled():
+            speculation.task.exception()  # retrieve it, so a failure nobody needed is not logged as unhandled
+        speculation.task.cancel()
+        self.discarded += 1
+        print(f"Speculative {self.name} discarded for request {request_id}")
+
+    def stats(self) -> dict:
+        return {
+            "launched": self.launched,
+            "used": self.used,
+            "discarded": self.discarded,
+            "failed": self.failed,
+            "in_flight": len(self.speculations),
+            "hit_rate": self.used / self.launched if self.launched else 0.0,
+            "saved_seconds": self.saved_seconds,
+            "avg_saved_seconds": self.saved_seconds / self.used if self.used else 0.0,
+        }
+
+speculative_websearch = SpeculationRegistry("websearch")
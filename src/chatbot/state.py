@@ -1,28 +1,52 @@
-from typing import List, DefaultDict, TypedDict
+from typing import Annotated, Dict, List, DefaultDict, TypedDict
+
+from src.chatbot.budget import merge_budget
 
 class GraphState(TypedDict):
     """
     Represents the state of a graph.
 
     Attributes:
+        request_id (str): The id of the graph run, which keys the work started speculatively for it
         query (str): The user query
         query_list (List[str]): The expanded list of queries based on the user query
         agent (str): The agent responsible for decision making/answer generating
         --- DEPRECATED --- contexts (DefaultDict[str, str]): The contexts retrieved. Keys are "kg" or "db" indicating the source of the context, and values are the contexts themselves.
         kg_context (str): The context retrieved from the knowledge graph
         db_context (str): The context retrieved from the vector database
+        db_passages (List[Dict]): The passages retrieved from the vector database, with their relevance and dense embeddings
+        context (str): The deduplicated, budgeted context passed on to answer generation
         websearch_context (str): The context retrieved from the web search
         metrics (DefaultDict[str, str]): The numerical evaluations of metrics, such as "correctness", "relevance", "clarity", etc.
         reasons (DefaultDict[str, str]): The reasons for the the metrics. Keys are the metric names, and values are the reasons.
+        confidence (int): The fast path's self-reported confidence (1-10) in its own metrics
+        grade_source (str): Where the current grade comes from: "llm" (the grader), "self" (the fast path) or "pre_grader"
+        fast_path (str): Whether the fast path's self-grade "settled" the answer or "escalated" it to the grader as borderline
+        pre_grade (Dict): The local pre-grader's features and verdict ("good", "insufficient" or "uncertain") for the current answer
         answer (str): The answer generated by the agent
+        best_answer (str): The best-graded answer so far, returned if the budget runs out before an answer is good enough
+        best_score (int): The lowest metric score of the best answer
+        budget (Dict): The budget consumed so far (start time, LLM calls, estimated tokens, refine iterations). Nodes write increments
+        budget_report (str): Summary of the consumed budget, written when the run finishes
     """
+    request_id: str
     query: str
     query_list: List[str]
     agent: str
     # contexts: Annotated[DefaultDict[str, str], reduce_defaultdicts]
     kg_context: str
     db_context: str
+    db_passages: List[Dict]
+    context: str
     websearch_context: str
     metrics: DefaultDict[str, str]
     reasons: DefaultDict[str, str]
-    answer: str
\ No newline at end of file
+    confidence: int
+    grade_source: str
+    fast_path: str
+    pre_grade: Dict
+    answer: str
+    best_answer: str
+    best_score: int
+    budget: Annotated[Dict, merge_budget]
+    budget_report: str
\ No newline at end of file
@@ -1,25 +1,57 @@
 import asyncio
+import httpx
+import json
 import os
-import re
 import time
 
 from abc import ABC, abstractmethod
-from bs4 import BeautifulSoup
-from crawl4ai import AsyncWebCrawler
 from langchain_anthropic import ChatAnthropic
 from langchain_core.output_parsers import JsonOutputParser, StrOutputParser
-from langchain_core.tools import StructuredTool
+from langchain_core.runnables import RunnableConfig
+from langchain_core.tools import StructuredTool, ToolException
+from langchain_core.utils.json import parse_json_markdown
 from langchain.prompts import PromptTemplate
-from pymilvus import (
-   AnnSearchRequest, RRFRanker,
-)
-from serpapi import GoogleSearch
-from tenacity import retry, stop_after_attempt, wait_exponential
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
 from typing_extensions import override
 
-from src.chatbot.prompts.prompts import GENERATE_ANSWER_PROMPT, GRADE_ANSWER_PROMPT, REFINE_ANSWER_PROMPT
-from src.services.services import collection, kg_retriever, llm
-from src.services.embedding_models import bge_embed_model, splade_embed_model
+from src.chatbot.cleaning import clean_content, clean_page
+from src.chatbot.context import cosine, make_passage, select_web_passages
+from src.chatbot.grading import GRADE_THRESHOLD, GRADER_METRICS, is_decided, parse_scores
+from src.chatbot.prompts.prompts import EXPAND_QUERY_PROMPT, GENERATE_AND_GRADE_PROMPT, GENERATE_ANSWER_PROMPT, GRADE_ANSWER_PROMPT, REFINE_ANSWER_PROMPT
+from src.services.services import VECTOR_BACKEND, collection, kg_retriever, llm
+from src.services.web_cache import web_cache
+from src.services.crawler_pool import crawler_pool
+from src.services.embedding_models import embed_queries, embed_query_async, query_embedding_batcher, query_embedding_cache
+from src.services.llm_client import llm_client
+from src.services.executors import cleaning_executor, kg_io_executor, vector_io_executor, retrieval_semaphore, run_in_executor
+from src.vector.doc_store import DocStore
+from src.vector.local_index import LocalHit
+from src.vector.search_profile import load_search_profile
+
+QUERY_EXPANSION_COUNT = int(os.getenv("QUERY_EXPANSION_COUNT", "3"))
+MULTI_QUERY_MAX_HITS = int(os.getenv("MULTI_QUERY_MAX_HITS", "6"))
+# "inline" (default) fetches chunk text with the search; "two_phase" fetches doc_ids only and resolves text locally
+VECTOR_FETCH_MODE = os.getenv("VECTOR_FETCH_MODE", "inline")
+# Inline mode only: also fetch the stored dense vectors (1024 floats per hit), so MMR and relevance use cosine similarity.
+# Off by default to keep the search payload small; context assembly then falls back to retrieval order and shingle overlap
+VECTOR_FETCH_EMBEDDINGS = os.getenv("VECTOR_FETCH_EMBEDDINGS", "false").lower() == "true"
+KG_RETRIEVAL_TIMEOUT = float(os.getenv("KG_RETRIEVAL_TIMEOUT", "10"))
+SERPAPI_URL = "https://serpapi.com/search.json"
+SERPAPI_TIMEOUT = float(os.getenv("SERPAPI_TIMEOUT", "10"))
+# Extra candidate URLs crawled alongside the top results, and the deadline for the whole crawl
+WEBSEARCH_OVERFETCH = int(os.getenv("WEBSEARCH_OVERFETCH", "2"))
+WEBSEARCH_DEADLINE = float(os.getenv("WEBSEARCH_DEADLINE", "15"))
+# The fast path escalates to the standalone grader when its self-reported confidence is below the minimum,
+# or when a self-score lands within the margin of the threshold
+FAST_PATH_MIN_CONFIDENCE = int(os.getenv("FAST_PATH_MIN_CONFIDENCE", "8"))
+FAST_PATH_SCORE_MARGIN = int(os.getenv("FAST_PATH_SCORE_MARGIN", "1"))
+# Return the grade as soon as the scores decide the routing, streaming the reasoning in the background
+STREAMING_GRADER = os.getenv("STREAMING_GRADER", "true").lower() == "true"
+
+# the local index holds the chunk text in memory and has no `query` to fall back on, so two-phase retrieval needs Milvus
+if VECTOR_FETCH_MODE == "two_phase" and VECTOR_BACKEND == "local":
+    raise ValueError("VECTOR_FETCH_MODE=two_phase requires VECTOR_BACKEND=milvus")
+doc_store = DocStore() if VECTOR_FETCH_MODE == "two_phase" else None
 
 class BaseTool(ABC):
     def __init__(self, name: str, description: str):
@@ -59,44 +91,136 @@ class BaseGenerationTool(BaseTool):
 class DBRetrievalTool(BaseRetrievalTool):
     def __init__(self):
         super().__init__(name="Retrieve from Vector DB", 
-                         description="Retrieves context from a conventional Vector DB, given a query.")
+                         description="Retrieves context from a conventional Vector DB, given a query and optionally its expanded queries.")
+        self.search_profile = load_search_profile()
+        self.two_phase = VECTOR_FETCH_MODE == "two_phase"
+        self.fetch_embeddings = VECTOR_FETCH_EMBEDDINGS and not self.two_phase
 
-    def retrieve_db(self, query: str) -> str:
+    def get_query_list(self, query: str, queries: Optional[List[str]] = None) -> List[str]:
         """
-        Retrieves context from a conventional Vector DB, given a query.
+        Returns the deduplicated queries to search with, always starting with the user query
+        """
+        return list(dict.fromkeys([query] + list(queries or [])))
+
+    def embed_queries(self, queries: List[str]) -> Tuple[List[List[float]], List[object]]:
+        """
+        Encodes the queries into their dense (bge) and sparse (SPLADE) embeddings in one batch, via the shared query embedding cache
 
         Args:
-            query (str): The user query
+            queries (List[str]): The queries
 
         Returns:
-            str: The formatted context retrieved from Vector DB
+            Tuple[List[List[float]], List[object]]: The dense embeddings and the sparse embeddings
         """
-        
-        dense_embedding = list(bge_embed_model.query_embed(query))[0]
-        sparse_embedding = list(splade_embed_model.encode_queries([query]))
-        
+        embeddings = embed_queries(queries)
+        print(f"Query Embedding Cache: {query_embedding_cache.stats()}")
+        return [dense for dense, _ in embeddings], [sparse for _, sparse in embeddings]
+
+    def search(self, dense_embeddings: List[List[float]], sparse_embeddings: List[object]) -> List[list]:
+        """
+        Runs a single hybrid search against the Vector DB for all queries (nq = number of queries)
+
+        Args:
+            dense_embeddings (List[List[float]]): The dense query embeddings
+            sparse_embeddings (List[object]): The sparse query embeddings
+
+        Returns:
+            List[list]: The hits for each query
+        """
+        # in two-phase mode only doc_ids cross the network; the text is resolved from the local doc store
+        if self.two_phase:
+            output_fields = ['doc_id']
+        else:
+            output_fields = ['doc_id', 'text', 'doc_source'] + (['dense_embeddings'] if self.fetch_embeddings else [])
         search_results = collection.hybrid_search(
-                reqs=[
-                    AnnSearchRequest(
-                        data=[dense_embedding],  # content vector embedding
-                        anns_field='dense_embeddings',  # content vector field
-                        param={"metric_type": "COSINE", "params": {"M": 64, "efConstruction": 512}}, # Search parameters
-                        limit=3
-                    ),
-                    AnnSearchRequest(
-                        data=list(sparse_embedding),  # keyword vector embedding
-                        anns_field='sparse_embeddings',  # keyword vector field
-                        param={"metric_type": "IP", "params": {"drop_ratio_build": 0.2}}, # Search parameters
-                        limit=3
-                    )
-                ],
-                output_fields=['doc_id', 'text', 'doc_source'],
-                rerank=RRFRanker(),
-                limit=3
+                reqs=self.search_profile.requests(dense_embeddings, sparse_embeddings),
+                output_fields=output_fields,
+                rerank=self.search_profile.ranker(),
+                limit=self.search_profile.limit
                 )
         
-        hits = search_results[0]
-        
+        results = list(search_results)
+        return self.resolve_hits(results) if self.two_phase else results
+
+    def resolve_hits(self, results: List[list]) -> List[list]:
+        """
+        Second phase of two-phase retrieval: attaches text and source to doc_id-only hits from the local doc store,
+        falling back to a Vector DB query for doc_ids missing from the store
+
+        Args:
+            results (List[list]): The doc_id-only hits for each query
+
+        Returns:
+            List[list]: The hits for each query, with `text` and `doc_source`
+        """
+        doc_ids = list(dict.fromkeys(res.doc_id for hits in results for res in hits))
+        documents = doc_store.get_many(doc_ids)
+
+        missing = [doc_id for doc_id in doc_ids if doc_id not in documents]
+        if missing:
+            print(f"{len(missing)} doc_ids missing from the local doc store, fetching from the Vector DB")
+            for row in collection.query(expr=f"doc_id in {json.dumps(missing)}", output_fields=['doc_id', 'text', 'doc_source']):
+                documents[row['doc_id']] = (row['text'], row['doc_source'])
+
+        return [
+            [
+                LocalHit(id=res.id, distance=res.distance,
+                         fields={"doc_id": res.doc_id, "text": documents.get(res.doc_id, ("", "NA"))[0],
+                                 "doc_source": documents.get(res.doc_id, ("", "NA"))[1], "dense_embeddings": None})
+                for res in hits
+            ]
+            for hits in results
+        ]
+
+    def merge_hits(self, results: List[list]) -> list:
+        """
+        Merges the hits of all queries rank by rank (every query's best hit first), deduplicating by doc_id
+
+        Args:
+            results (List[list]): The hits for each query
+
+        Returns:
+            list: At most MULTI_QUERY_MAX_HITS unique hits
+        """
+        results = [list(hits) for hits in results]
+        merged, seen = [], set()
+        for rank in range(max((len(hits) for hits in results), default=0)):
+            for hits in results:
+                if rank < len(hits) and hits[rank].doc_id not in seen:
+                    seen.add(hits[rank].doc_id)
+                    merged.append(hits[rank])
+        return merged[:MULTI_QUERY_MAX_HITS]
+
+    def to_passages(self, hits: list, query_embedding: List[float]) -> List[dict]:
+        """
+        Converts the hits into passages for context assembly, scoring each against the user query with the stored dense embeddings
+        when they were fetched (VECTOR_FETCH_EMBEDDINGS); otherwise context assembly falls back to retrieval order for them
+
+        Args:
+            hits (list): The hits returned by the Vector DB
+            query_embedding (List[float]): The dense embedding of the user query
+
+        Returns:
+            List[dict]: The passages
+        """
+        passages = []
+        for res in hits:
+            embedding = res.get('dense_embeddings')
+            passages.append(make_passage(text=res.text, origin="vector", source=res.doc_source,
+                                         relevance=cosine(query_embedding, embedding) if embedding is not None else None,
+                                         embedding=embedding))
+        return passages
+
+    def format_hits(self, hits: list) -> str:
+        """
+        Formats the hits into the context displayed to the user
+
+        Args:
+            hits (list): The hits returned by the Vector DB
+
+        Returns:
+            str: The formatted context
+        """
         context = []
         for res in hits:
             text = res.text
@@ -105,67 +229,63 @@ class DBRetrievalTool(BaseRetrievalTool):
         
         return "\n\n".join(context)
 
-    async def retrieve_db_async(self, query: str) -> str:
+    def retrieve_db(self, query: str, queries: Optional[List[str]] = None) -> dict:
         """
-        Retrieves context from a conventional Vector DB, given a list of queries.
+        Retrieves context from a conventional Vector DB, given a query and optionally its expanded queries.
 
         Args:
             query (str): The user query
+            queries (List[str], optional): The expanded queries, searched together with the user query
 
         Returns:
-            str: The formatted context retrieved from Vector DB
+            dict: The formatted context ("context") and the retrieved passages ("passages")
         """
+        dense_embeddings, sparse_embeddings = self.embed_queries(self.get_query_list(query, queries))
+        hits = self.merge_hits(self.search(dense_embeddings, sparse_embeddings))
+        return {"context": self.format_hits(hits), "passages": self.to_passages(hits, dense_embeddings[0])}
+
+    async def retrieve_db_async(self, query: str, queries: Optional[List[str]] = None) -> dict:
+        """
+        Retrieves context from a conventional Vector DB, given a query and optionally its expanded queries.
+        Encoding is micro-batched (with the other queries and other sessions) on the bounded embedding pool
+        and the single Milvus call runs on the vector I/O pool, so the event loop stays free for other sessions.
+
+        Args:
+            query (str): The user query
+            queries (List[str], optional): The expanded queries, searched together with the user query
+
+        Returns:
+            dict: The formatted context ("context") and the retrieved passages ("passages")
+        """
+        query_list = self.get_query_list(query, queries)
+        async with retrieval_semaphore:
+            embeddings = await asyncio.gather(*(embed_query_async(q) for q in query_list))
+            print(f"Query Embedding Cache: {query_embedding_cache.stats()}, Batcher: {query_embedding_batcher.stats()}")
+            results = await run_in_executor(vector_io_executor, self.search,
+                                            [dense for dense, _ in embeddings], [sparse for _, sparse in embeddings])
         
-        dense_embedding = list(bge_embed_model.query_embed(query))[0]
-        sparse_embedding = list(splade_embed_model.encode_queries([query]))
-        
-        search_results = collection.hybrid_search(
-                reqs=[
-                    AnnSearchRequest(
-                        data=[dense_embedding],  # content vector embedding
-                        anns_field='dense_embeddings',  # content vector field
-                        param={"metric_type": "COSINE", "params": {"M": 64, "efConstruction": 512}}, # Search parameters
-                        limit=3
-                    ),
-                    AnnSearchRequest(
-                        data=list(sparse_embedding),  # keyword vector embedding
-                        anns_field='sparse_embeddings',  # keyword vector field
-                        param={"metric_type": "IP", "params": {"drop_ratio_build": 0.2}}, # Search parameters
-                        limit=3
-                    )
-                ],
-                output_fields=['doc_id', 'text', 'doc_source'],
-                rerank=RRFRanker(),
-                limit=3
-                )
-        
-        hits = search_results[0]
-        
-        context = []
-        for res in hits:
-            text = res.text
-            source = res.doc_source
-            context.append(f"Source: {source}\nContext: {text}")
-        
-        return "\n\n".join(context)
+        hits = self.merge_hits(results)
+        return {"context": self.format_hits(hits), "passages": self.to_passages(hits, embeddings[0][0])}
     
     @override
-    def func(self, query: str) -> str:
-        return self.retrieve_db(query)
+    def func(self, query: str, queries: Optional[List[str]] = None) -> dict:
+        return self.retrieve_db(query, queries)
 
     @override
-    async def coroutine(self, query: str) -> str:
-        return await self.retrieve_db_async(query)
+    async def coroutine(self, query: str, queries: Optional[List[str]] = None) -> dict:
+        return await self.retrieve_db_async(query, queries)
         
 class KGRetrievalTool(BaseRetrievalTool):
-    def __init__(self):
+    def __init__(self, timeout: float = KG_RETRIEVAL_TIMEOUT):
         super().__init__(name="Retrieve from Knowledge Graph", 
                          description="Retrieves context from a Knowledge Graph, given a query.")
+        self.timeout = timeout
+        self.calls = 0
+        self.timeouts = 0
         
     def retrieve_kg(self, query: str) -> str:
         """
-        Retrieves context from the ingested knowledge graph, given a list of queries.
-        Processes queries in parallel using ThreadPoolExecutor.
+        Retrieves context from the ingested knowledge graph, given a query.
 
         Args:
             query (str): The user query
@@ -180,19 +300,24 @@ class KGRetrievalTool(BaseRetrievalTool):
 
     async def retrieve_kg_async(self, query: str) -> str:
         """
-        Retrieves context from the ingested knowledge graph, given a list of queries.
-        Processes queries in parallel using ThreadPoolExecutor.
+        Retrieves context from the ingested knowledge graph, given a query.
+        The retrieval (OpenAI query embedding + Neo4j lookup and traversal) runs on the KG I/O pool under a deadline,
+        so a slow Neo4j cannot hold up the rest of the graph.
 
         Args:
             query (str): The user query
 
         Returns:
-            str: The formatted context retrieved from the knowledge graph
+            str: The formatted context retrieved from the knowledge graph, or an empty context on timeout
         """
-        
-        nodes = kg_retriever.retrieve(query)
-        context = '\n\n'.join([node.text for node in nodes])
-        return context
+        self.calls += 1
+        try:
+            return await asyncio.wait_for(run_in_executor(kg_io_executor, self.retrieve_kg, query), timeout=self.timeout)
+        except asyncio.TimeoutError:
+            # the worker thread finishes in the background; its result is discarded
+            self.timeouts += 1
+            print(f"KG retrieval timed out after {self.timeout}s ({self.timeouts}/{self.calls} calls timed out), continuing without KG context")
+            return ""
     
     @override
     def func(self, query: str) -> str:
@@ -206,108 +331,121 @@ class WebSearchTool(BaseRetrievalTool):
     def __init__(self):
         super().__init__(name="Retrieve from Web Search", 
                          description="Retrieves context from a Web Search, given a query.")
+        self.client: Optional[httpx.AsyncClient] = None
+        # the event loop the async searches run on, which sync callers hand their searches to
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
 
     def clean_content(self, content: str) -> str:
         """
         Clean the content by removing boilerplate text, headers, and irrelevant information.
         """
-        # Remove HTML tags
-        soup = BeautifulSoup(content, 'html.parser')
-        
-        # Remove script, style, and nav elements
-        for element in soup(["script", "style", "nav", "footer", "header"]):
-            element.decompose()
-        
-        # Extract text from remaining HTML
-        text = soup.get_text(separator=' ', strip=True)
-
-        # Remove URLs
-        text = re.sub(r'https?://\S+|www\.\S+', '', text)
-
-        # Remove extra whitespace and newlines
-        text = re.sub(r'\s+', ' ', text).strip()
-
-        # Remove common boilerplate phrases (case-insensitive)
-        boilerplate_patterns = [
-            r'copyright ©.*',
-            r'all rights reserved',
-            r'terms (of use|and conditions)',
-            r'privacy policy',
-            r'cookie policy',
-            r'(log|sign) (in|out|up)',
-            r'subscribe to our newsletter',
-            r'follow us on social media',
-        ]
-        for pattern in boilerplate_patterns:
-            text = re.sub(pattern, '', text, flags=re.IGNORECASE)
-
-        # Remove common email patterns
-        text = re.sub(r'\S+@\S+\.\S+', '', text)
-
-        # Remove patterns like "page X of Y"
-        text = re.sub(r'page \d+ of \d+', '', text)
-
-        # Remove patterns like "last updated: date"
-        text = re.sub(r'last updated:?\s*\d{1,2}[-/]\d{1,2}[-/]\d{2,4}', '', text)
-
-        # Remove very short lines (likely to be menu items, etc.)
-        text = '\n'.join(line for line in text.split('\n') if len(line.split()) > 3)
+        return clean_content(content)
 
-        # Final cleanup: remove any leading/trailing whitespace and multiple consecutive spaces
-        text = re.sub(r'\s+', ' ', text).strip()
-
-        return text
+    async def search_urls(self, query: str, num_results: int) -> List[str]:
+        """
+        Returns the top result URLs for a query from SerpAPI, going through the search results cache first
+        """
+        urls = await web_cache.get_search_async(query, num_results)
+        if urls is not None:
+            return urls
+
+        if self.client is None:
+            self.client = httpx.AsyncClient(timeout=SERPAPI_TIMEOUT)
+        params = {
+            "engine": "google",
+            "q": query,
+            "num": num_results,
+            "api_key": os.getenv("SERPAPI_API_KEY")
+        }
+        response = await self.client.get(SERPAPI_URL, params=params)
+        response.raise_for_status()
+        results = response.json()
+        urls = [result['link'] for result in results.get('organic_results', [])[:num_results]]
+        await web_cache.put_search_async(query, num_results, urls)
+        return urls
+
+    async def crawl_page(self, url: str) -> str:
+        """
+        Crawls a page, cleans and truncates it in the cleaning process pool, and stores the result in the web cache
+        """
+        result = await crawler_pool.arun(url=url)
+        content = await run_in_executor(cleaning_executor, clean_page, result.markdown or "")
+        if getattr(result, "success", True) and content:
+            await web_cache.put_page_async(url, content, getattr(result, "response_headers", None))
+        return content
+
+    async def get_page(self, url: str) -> str:
+        content = await web_cache.lookup_page(url)
+        if content is not None:
+            return content
+        return await self.crawl_page(url)
 
-        
     async def websearch(self, query: str, num_results: int = 3) -> str:
        """
-       Retrieves context from the web using SerpAPI for search and AsyncWebCrawler for content
+       Retrieves context from the web using SerpAPI for search and AsyncWebCrawler for content.
+       Search results and cleaned pages are served from the web cache when possible; only cache misses are crawled.
+       `WEBSEARCH_OVERFETCH` extra candidates are crawled alongside the top results, and slow sites are cancelled
+       once `num_results` pages are in or `WEBSEARCH_DEADLINE` passes, so latency is bounded by the deadline.
+       The pages are then cut down to their passages most relevant to the query, within `WEB_CONTEXT_TOKEN_BUDGET`.
 
        Args:
            query (str): The user query
-           num_results (int): Number of top results to crawl (default: 3)
+           num_results (int): Number of pages to return (default: 3)
            
        Returns:
            str: The formatted context retrieved from the websearch
        """
        print("------- Retrieving Context Via Web Search -------")
-       # Use SerpAPI to get search results
-       params = {
-           "q": query,
-           "num": num_results,
-           "api_key": os.getenv("SERPAPI_API_KEY")
-       }
-       search = GoogleSearch(params)
-       results = search.get_dict()
-       
-       # Extract URLs from search results
-       urls = [result['link'] for result in results.get('organic_results', [])[:num_results]]
-       
-       # Crawl each URL using AsyncWebCrawler
-       contents = []
-       async with AsyncWebCrawler(verbose=True) as crawler:
-           tasks = [crawler.arun(url=url) for url in urls]
-           results = await asyncio.gather(*tasks)
-       
-       for url, result in zip(urls, results):
-           # Extract relevant information from the crawled content
-           content = self.clean_content(result.markdown)
-           
-           # Truncate content to ~1000 words
-           words = content.split()
-           if len(words) > 1000:
-               content = ' '.join(words[:1000]) + '...'
-           
-           contents.append(f"URL: {url}\nContent:\n{content}\n\n")
-
-       return "".join(contents)
+       start = time.perf_counter()
+       urls = await self.search_urls(query, num_results + WEBSEARCH_OVERFETCH)
+
+       # Crawl every candidate concurrently and keep the first `num_results` pages to finish within the deadline
+       tasks = {asyncio.ensure_future(self.get_page(url)): url for url in urls}
+       pages, pending = {}, set(tasks)
+       loop = asyncio.get_running_loop()
+       deadline = loop.time() + WEBSEARCH_DEADLINE
+       try:
+           while pending and len(pages) < num_results:
+               timeout = deadline - loop.time()
+               if timeout <= 0:
+                   break
+               done, pending = await asyncio.wait(pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+               for task in done:
+                   if task.exception() is not None:
+                       print(f"Error crawling {tasks[task]}: {task.exception()}")
+                   elif task.result():
+                       pages[tasks[task]] = task.result()
+       finally:
+           for task in pending:
+               task.cancel()
+
+       # pages that finished together are kept in search rank order
+       urls = [url for url in urls if url in pages][:num_results]
+       print(f"Web Search: {len(urls)}/{len(tasks)} pages in {time.perf_counter() - start:.2f}s, {len(pending)} cancelled")
+       print(f"Web Cache: {await web_cache.stats_async()}")
+
+       # only the passages most relevant to the query go to the refine prompt
+       selection = select_web_passages(query, {url: pages[url] for url in urls})
+       return "".join(f"URL: {url}\nContent:\n{' ... '.join(passages)}\n\n" for url, passages in selection)
    
     @override
     def func(self, query: str) -> str:
-        return self.websearch(query)
+        # the crawler pool, HTTP client and web cache are bound to the app's event loop, so a blocking call runs
+        # the search on that loop and waits for it from the calling thread
+        loop = self.loop
+        if loop is None or loop.is_closed() or not loop.is_running():
+            raise ToolException("Web search runs on the app's event loop, which is not running it: use `ainvoke`")
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is loop:
+            raise ToolException("Blocking on web search from its own event loop would deadlock it: use `ainvoke`")
+        return asyncio.run_coroutine_threadsafe(self.websearch(query), loop).result()
     
     @override
     async def coroutine(self, query: str) -> str:
+        self.loop = asyncio.get_running_loop()
         return await self.websearch(query)
         
 class AnswerGenerationTool(BaseGenerationTool):
@@ -321,7 +459,6 @@ class AnswerGenerationTool(BaseGenerationTool):
         )
         self.chain = self.prompt_template | self.llm | StrOutputParser()
     
-    @retry(stop=stop_after_attempt(3), wait=wait_exponential(multiplier=1, min=4, max=10))
     def generate_answer(self, query: str, context: str) -> str:
         """
         Generates an answer to the user query from the Vector DB context
@@ -333,19 +470,9 @@ class AnswerGenerationTool(BaseGenerationTool):
         Returns:
             str: The answer generated by the agent
         """
-        try:
-            response = self.chain.invoke({"query": query, "context": context})
-            return response
-        except Exception as e:
-            if "overloaded_error" in str(e):
-                print("Anthropic API is overloaded. Retrying...")
-                time.sleep(2)  # Add a small delay before retry
-                raise # Re-raise the exception to trigger a retry
-            
-            else:
-                raise
+        response = llm_client.call_sync(self.chain, {"query": query, "context": context})
+        return response
     
-    @retry(stop=stop_after_attempt(3), wait=wait_exponential(multiplier=1, min=4, max=10))
     async def generate_answer_async(self, query: str, context: str) -> str:
         """
         Generates an answer to the user query from the Vector DB context
@@ -357,17 +484,8 @@ class AnswerGenerationTool(BaseGenerationTool):
         Returns:
             str: The answer generated by the agent
         """
-        try:
-            response = await self.chain.ainvoke({"query": query, "context": context})
-            return response
-        except Exception as e:
-            if "overloaded_error" in str(e):
-                print("Anthropic API is overloaded. Retrying...")
-                time.sleep(2)  # Add a small delay before retry
-                raise # Re-raise the exception to trigger a retry
-            
-            else:
-                raise
+        response = await llm_client.call(self.chain, {"query": query, "context": context})
+        return response
     
     @override
     def func(self, query: str, context: str) -> str:
@@ -387,8 +505,8 @@ class GradeAnswerTool(BaseGenerationTool):
             template=self.prompt
         )
         self.chain = self.prompt_template | self.llm | JsonOutputParser()
+        self.stream_chain = self.prompt_template | self.llm | StrOutputParser()
     
-    @retry(stop=stop_after_attempt(3), wait=wait_exponential(multiplier=1, min=4, max=10))
     def grade_answer(self, query: str, answer: str) -> dict:
         """
         Grades the answer based on relevancy, completeness, coherence, and correctness
@@ -400,19 +518,9 @@ class GradeAnswerTool(BaseGenerationTool):
         Returns:
             dict: The evaluation metrics and reasoning for the graded answer
         """
-        try:
-            response = self.chain.invoke({"query": query, "answer": answer})
-            return response
-        except Exception as e:
-            if "overloaded_error" in str(e):
-                print("Anthropic API is overloaded. Retrying...")
-                time.sleep(2)  # Add a small delay before retry
-                raise # Re-raise the exception to trigger a retry
-            
-            else:
-                raise
+        response = llm_client.call_sync(self.chain, {"query": query, "answer": answer})
+        return response
     
-    @retry(stop=stop_after_attempt(3), wait=wait_exponential(multiplier=1, min=4, max=10))
     async def grade_answer_async(self, query: str, answer: str) -> dict:
         """
         Grades the answer based on relevancy, completeness, coherence, and correctness
@@ -424,26 +532,46 @@ class GradeAnswerTool(BaseGenerationTool):
         Returns:
             dict: The evaluation metrics and reasoning for the graded answer
         """
-        try:
-            response = await self.chain.ainvoke({"query": query, "answer": answer})
-            return response
-        
-        except Exception as e:
-            if "overloaded_error" in str(e):
-                print("Anthropic API is overloaded. Retrying...")
-                time.sleep(2)  # Add a small delay before retry
-                raise # Re-raise the exception to trigger a retry
-            
-            else:
-                raise
+        response = await llm_client.call(self.chain, {"query": query, "answer": answer})
+        return response
     
+    async def grade_answer_streaming(self, query: str, answer: str,
+                                     on_complete: Optional[Callable[[dict], Awaitable[None]]] = None) -> dict:
+        """
+        Grades the answer, returning as soon as the scores decide the routing: when any metric is at or below
+        GRADE_THRESHOLD, or all four are known. The reasoning keeps streaming in the background.
+
+        Args:
+            query (str): The user query
+            answer (str): The answer generated by the agent
+            on_complete (Callable, optional): Awaited with the full evaluation and reasoning, if the decision came early
+
+        Returns:
+            dict: The evaluation metrics known at decision time, and the reasoning if it was already complete
+        """
+        start = time.perf_counter()
+
+        def decide(text: str) -> Optional[dict]:
+            scores = parse_scores(text)
+            if not is_decided(scores):
+                return None
+            print(f"Grader decided after {time.perf_counter() - start:.2f}s with scores {scores}")
+            return {"evaluation": scores, "reasoning": {}}
+
+        return await llm_client.call_streaming(self.stream_chain, {"query": query, "answer": answer},
+                                               decide=decide, finish=parse_json_markdown, on_complete=on_complete)
+
     @override
     def func(self, query: str, answer: str) -> dict:
         return self.grade_answer(query, answer)
     
     @override
-    async def coroutine(self, query: str, answer: str) -> dict:
-        return await self.grade_answer_async(query, answer)
+    async def coroutine(self, query: str, answer: str, config: RunnableConfig) -> dict:
+        # injected by the tool and kept out of its args schema; `on_grader_reasons` receives the reasoning that streams after the decision
+        if not STREAMING_GRADER:
+            return await self.grade_answer_async(query, answer)
+        on_complete = (config.get("configurable") or {}).get("on_grader_reasons")
+        return await self.grade_answer_streaming(query, answer, on_complete)
 
 class RefineAnswerTool(BaseGenerationTool):
     def __init__(self):
@@ -456,7 +584,6 @@ class RefineAnswerTool(BaseGenerationTool):
         )
         self.chain = self.prompt_template | self.llm | StrOutputParser()
         
-    @retry(stop=stop_after_attempt(3), wait=wait_exponential(multiplier=1, min=4, max=10))
     def refine_answer(self, query: str, answer: str, websearch_context: str) -> str:
         """
         Refines the answer based on user feedback
@@ -469,20 +596,9 @@ class RefineAnswerTool(BaseGenerationTool):
         Returns:
             str: The refined answer based on the user feedback
         """
-        try:
-            response = self.chain.invoke({"query": query, "answer": answer, "websearch_context": websearch_context})
-            return response
-        
-        except Exception as e:
-            if "overloaded_error" in str(e):
-                print("Anthropic API is overloaded. Retrying...")
-                time.sleep(2)  # Add a small delay before retry
-                raise # Re-raise the exception to trigger a retry
-            
-            else:
-                raise
+        response = llm_client.call_sync(self.chain, {"query": query, "answer": answer, "websearch_context": websearch_context})
+        return response
     
-    @retry(stop=stop_after_attempt(3), wait=wait_exponential(multiplier=1, min=4, max=10))
     async def refine_answer_async(self, query: str, answer: str, websearch_context: str) -> str:
         """
         Refines the answer based on user feedback
@@ -496,18 +612,8 @@ class RefineAnswerTool(BaseGenerationTool):
             str: The refined answer based on the user feedback
         """
         
-        try:
-            response = await self.chain.ainvoke({"query": query, "answer": answer, "websearch_context": websearch_context})
-            return response
-    
-        except Exception as e:
-            if "overloaded_error" in str(e):
-                print("Anthropic API is overloaded. Retrying...")
-                time.sleep(2)  # Add a small delay before retry
-                raise # Re-raise the exception to trigger a retry
-            
-            else:
-                raise
+        response = await llm_client.call(self.chain, {"query": query, "answer": answer, "websearch_context": websearch_context})
+        return response
     
     @override
     def func(self, query: str, answer: str, websearch_context: str) -> str:
@@ -515,4 +621,123 @@ class RefineAnswerTool(BaseGenerationTool):
     
     @override
     async def coroutine(self, query: str, answer: str, websearch_context: str) -> str:
-        return await self.refine_answer(query, answer, websearch_context)
\ No newline at end of file
+        return await self.refine_answer_async(query, answer, websearch_context)
+
+class QueryExpansionTool(BaseGenerationTool):
+    def __init__(self, num_queries: int = QUERY_EXPANSION_COUNT):
+        super().__init__(prompt=EXPAND_QUERY_PROMPT, 
+                         name="Query Expander", 
+                         description="Expands the user query into alternative search queries for retrieval")
+        self.num_queries = num_queries
+        self.prompt_template = PromptTemplate(
+            input_variables=["query", "num_queries"],
+            template=self.prompt
+        )
+        self.chain = self.prompt_template | self.llm | JsonOutputParser()
+
+    def to_query_list(self, query: str, response: dict) -> List[str]:
+        """
+        Builds the query list from the LLM response: the user query first, then up to `num_queries` unique alternatives
+        """
+        alternatives = [q.strip() for q in response.get("queries", []) if isinstance(q, str) and q.strip()]
+        return list(dict.fromkeys([query] + alternatives))[:self.num_queries + 1]
+    
+    def expand_query(self, query: str) -> List[str]:
+        """
+        Expands the user query into alternative search queries
+
+        Args:
+            query (str): The user query
+
+        Returns:
+            List[str]: The user query followed by its alternative queries
+        """
+        response = llm_client.call_sync(self.chain, {"query": query, "num_queries": self.num_queries})
+        return self.to_query_list(query, response)
+    
+    async def expand_query_async(self, query: str) -> List[str]:
+        """
+        Expands the user query into alternative search queries
+
+        Args:
+            query (str): The user query
+
+        Returns:
+            List[str]: The user query followed by its alternative queries
+        """
+        response = await llm_client.call(self.chain, {"query": query, "num_queries": self.num_queries})
+        return self.to_query_list(query, response)
+    
+    @override
+    def func(self, query: str) -> List[str]:
+        return self.expand_query(query)
+    
+    @override
+    async def coroutine(self, query: str) -> List[str]:
+        return await self.expand_query_async(query)
+
+def scores_near_threshold(scores: Dict[str, int]) -> List[str]:
+    """
+    The metrics whose score is within FAST_PATH_SCORE_MARGIN of the grading threshold, where a self-grade is least reliable
+    """
+    return [metric for metric, score in scores.items()
+            if GRADE_THRESHOLD - FAST_PATH_SCORE_MARGIN < score <= GRADE_THRESHOLD + FAST_PATH_SCORE_MARGIN]
+
+class GenerateAndGradeTool(BaseGenerationTool):
+    def __init__(self):
+        super().__init__(prompt=GENERATE_AND_GRADE_PROMPT, 
+                         name="Answer Generator and Self-Grader", 
+                         description="Generates an answer from the Vector DB + KG Context and grades it, in a single call")
+        self.prompt_template = PromptTemplate(
+            input_variables=["query", "context"],
+            template=self.prompt
+        )
+        self.chain = self.prompt_template | self.llm | JsonOutputParser()
+
+    @staticmethod
+    def to_result(response: dict) -> dict:
+        """
+        Normalises the LLM response: missing scores count as 0 and a missing confidence as 0, so they read as borderline
+        """
+        evaluation = response.get("evaluation") or {}
+        return {
+            "answer": str(response.get("answer", "")),
+            "evaluation": {metric: int(evaluation.get(metric, 0)) for metric in GRADER_METRICS},
+            "confidence": int(response.get("confidence", 0)),
+        }
+    
+    def generate_and_grade(self, query: str, context: str) -> dict:
+        """
+        Generates an answer to the user query and grades it in one call
+
+        Args:
+            query (str): The user query
+            context (str): The context retrieved from the Vector DB and KG
+
+        Returns:
+            dict: The answer, its self-assessed evaluation metrics and the confidence in them
+        """
+        response = llm_client.call_sync(self.chain, {"query": query, "context": context})
+        return self.to_result(response)
+    
+    async def generate_and_grade_async(self, query: str, context: str) -> dict:
+        """
+        Generates an answer to the user query and grades it in one call
+
+        Args:
+            query (str): The user query
+            context (str): The context retrieved from the Vector DB and KG
+
+        Returns:
+            dict: The answer, its self-assessed evaluation metrics and the confidence in them
+        """
+        response = await llm_client.call(self.chain, {"query": query, "context": context})
+        return self.to_result(response)
+    
+    @override
+    def func(self, query: str, context: str) -> dict:
+        return self.generate_and_grade(query, context)
+    
+    @override
+    async def coroutine(self, query: str, context: str) -> dict:
+        return await self.generate_and_grade_async(query, context)
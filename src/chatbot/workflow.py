@@ -1,17 +1,67 @@
 from langgraph.graph import START, END, StateGraph
 
-from src.chatbot.agents import VectorDBRetrievalAgent, KGDBRetrievalAgent, WebSearchAgent, AnswerGenerationAgent, AnswerGradingAgent, AnswerRefineAgent, decide_metrics_agent
+from src.chatbot.agents import VectorDBRetrievalAgent, KGDBRetrievalAgent, WebSearchAgent, AnswerGenerationAgent, AnswerGradingAgent, AnswerRefineAgent, ContextAssemblyAgent, QueryExpansionAgent, GenerateAndGradeAgent, PreGradingAgent, decide_fast_path_agent, decide_metrics_agent, decide_pre_grade_agent, finalize_answer_agent
+from src.chatbot.pregrader import PRE_GRADER
+from src.chatbot.speculation import SPECULATIVE_WEBSEARCH
 from src.chatbot.state import GraphState
+from src.chatbot.tools import QUERY_EXPANSION_COUNT
     
 # retrieval agents
 retrieve_db_agent = VectorDBRetrievalAgent().retrieve
 retrieve_kg_agent = KGDBRetrievalAgent().retrieve
-websearch_agent = WebSearchAgent().retrieve
+websearch = WebSearchAgent()
+websearch_agent = websearch.retrieve
+
+# context assembly
+assemble_context_agent = ContextAssemblyAgent().assemble
 
 # generation agents
+expand_query_agent = QueryExpansionAgent().generate
 generate_answer_agent = AnswerGenerationAgent().generate
+fast_path_agent = GenerateAndGradeAgent()
+generate_and_grade_agent = fast_path_agent.generate
+pre_grade_agent = PreGradingAgent().grade
 grader_agent = AnswerGradingAgent().generate
 refine_answer_agent = AnswerRefineAgent().generate
+
+async def generate_answer_speculatively(state: GraphState) -> GraphState:
+    """
+    Starts the web search in the background before generating, so a failed grade finds it finished or under way
+    """
+    websearch.speculate(state)
+    return await generate_answer_agent(state)
+
+async def generate_and_grade_speculatively(state: GraphState) -> GraphState:
+    """
+    Same as `generate_answer_speculatively`, for the fast path
+    """
+    websearch.speculate(state)
+    return await generate_and_grade_agent(state)
+
+generate_answer_node = generate_answer_speculatively if SPECULATIVE_WEBSEARCH else generate_answer_agent
+generate_and_grade_node = generate_and_grade_speculatively if SPECULATIVE_WEBSEARCH else generate_and_grade_agent
+
+# answers go through the local pre-grader first, when enabled
+GRADING_ENTRY = "pre_grader" if PRE_GRADER else "grader"
+
+def add_pre_grader(builder: StateGraph) -> None:
+    """
+    Adds the local pre-grader in front of the LLM grader: answers it settles are routed straight away,
+    uncertain ones go on to the LLM grader
+    """
+    if not PRE_GRADER:
+        return
+    builder.add_node("pre_grader", pre_grade_agent)
+    builder.add_conditional_edges(
+        "pre_grader",
+        decide_pre_grade_agent,
+        {
+            "good": "finalize",
+            "not good enough": "websearch",
+            "exhausted": "finalize",
+            "uncertain": "grader"
+        }
+    )
     
 def get_full_graph():
     """
@@ -26,29 +76,42 @@ def get_full_graph():
 
     builder.add_node("search_kg_db", retrieve_kg_agent)
     builder.add_node("search_vector_db", retrieve_db_agent)
-    builder.add_node("generate_answer", generate_answer_agent)
+    builder.add_node("assemble_context", assemble_context_agent)
+    builder.add_node("generate_answer", generate_answer_node)
     builder.add_node("grader", grader_agent)
     builder.add_node("websearch", websearch_agent)
     builder.add_node("refine_answer", refine_answer_agent)
+    builder.add_node("finalize", finalize_answer_agent)
+    add_pre_grader(builder)
     
-    builder.add_edge(START, "search_vector_db")
+    # query expansion only feeds the Vector DB, so the KG search starts straight away
+    if QUERY_EXPANSION_COUNT > 0:
+        builder.add_node("expand_query", expand_query_agent)
+        builder.add_edge(START, "expand_query")
+        builder.add_edge("expand_query", "search_vector_db")
+    else:
+        builder.add_edge(START, "search_vector_db")
     builder.add_edge(START, "search_kg_db")
 
-    builder.add_edge(["search_kg_db", "search_vector_db"], "generate_answer")
-    builder.add_edge("generate_answer", "grader")
+    builder.add_edge(["search_kg_db", "search_vector_db"], "assemble_context")
+    builder.add_edge("assemble_context", "generate_answer")
+    builder.add_edge("generate_answer", GRADING_ENTRY)
 
     builder.add_conditional_edges(
         "grader",
         decide_metrics_agent,
         {
-            "good": END,
-            "not good enough": "websearch"
+            "good": "finalize",
+            "not good enough": "websearch",
+            "exhausted": "finalize"
         }
     )
     
     builder.add_edge("websearch", "refine_answer")
 
-    builder.add_edge("refine_answer", "grader")
+    builder.add_edge("refine_answer", GRADING_ENTRY)
+
+    builder.add_edge("finalize", END)
 
     graph = builder.compile()
     
@@ -66,29 +129,41 @@ def get_vector_graph():
     builder = StateGraph(GraphState)
     
     builder.add_node("search_vector_db", retrieve_db_agent)
-    builder.add_node("generate_answer", generate_answer_agent)
+    builder.add_node("assemble_context", assemble_context_agent)
+    builder.add_node("generate_answer", generate_answer_node)
     builder.add_node("grader", grader_agent)
     builder.add_node("websearch", websearch_agent)
     builder.add_node("refine_answer", refine_answer_agent)
+    builder.add_node("finalize", finalize_answer_agent)
+    add_pre_grader(builder)
     
-    builder.set_entry_point("search_vector_db")
+    if QUERY_EXPANSION_COUNT > 0:
+        builder.add_node("expand_query", expand_query_agent)
+        builder.set_entry_point("expand_query")
+        builder.add_edge("expand_query", "search_vector_db")
+    else:
+        builder.set_entry_point("search_vector_db")
     
-    builder.add_edge("search_vector_db", "generate_answer")
+    builder.add_edge("search_vector_db", "assemble_context")
+    builder.add_edge("assemble_context", "generate_answer")
     
-    builder.add_edge("generate_answer", "grader")
+    builder.add_edge("generate_answer", GRADING_ENTRY)
     
     builder.add_conditional_edges(
         "grader",
         decide_metrics_agent,
         {
-            "good": END,
-            "not good enough": "websearch"
+            "good": "finalize",
+            "not good enough": "websearch",
+            "exhausted": "finalize"
         }
     )
     
     builder.add_edge("websearch", "refine_answer")
     
-    builder.add_edge("refine_answer", "grader")
+    builder.add_edge("refine_answer", GRADING_ENTRY)
+
+    builder.add_edge("finalize", END)
     
     graph = builder.compile()
     
@@ -106,34 +181,106 @@ def get_kg_graph():
     builder = StateGraph(GraphState)
     
     builder.add_node("search_kg_db", retrieve_kg_agent)
-    builder.add_node("generate_answer", generate_answer_agent)
+    builder.add_node("assemble_context", assemble_context_agent)
+    builder.add_node("generate_answer", generate_answer_node)
     builder.add_node("grader", grader_agent)
     builder.add_node("websearch", websearch_agent)
     builder.add_node("refine_answer", refine_answer_agent)
+    builder.add_node("finalize", finalize_answer_agent)
+    add_pre_grader(builder)
     
     builder.set_entry_point("search_kg_db")
     
-    builder.add_edge("search_kg_db", "generate_answer")
+    builder.add_edge("search_kg_db", "assemble_context")
+    builder.add_edge("assemble_context", "generate_answer")
     
-    builder.add_edge("generate_answer", "grader")
+    builder.add_edge("generate_answer", GRADING_ENTRY)
     
     builder.add_conditional_edges(
         "grader",
         decide_metrics_agent,
         {
-            "good": END,
-            "not good enough": "websearch"
+            "good": "finalize",
+            "not good enough": "websearch",
+            "exhausted": "finalize"
         }
     )
     
     builder.add_edge("websearch", "refine_answer")
     
-    builder.add_edge("refine_answer", "grader")
+    builder.add_edge("refine_answer", GRADING_ENTRY)
+
+    builder.add_edge("finalize", END)
     
     graph = builder.compile()
     
     return graph
 
+def get_fast_graph():
+    """
+    Generates the full workflow with a single-call fast path: one LLM call generates the answer and grades it,
+    and the standalone grader only runs when that self-grade is borderline, or on refined answers the pre-grader cannot settle
+
+    Returns:
+       `CompiledGraph` : Compiles the state graph into a `CompiledGraph` object.
+        The compiled graph implements the `Runnable` interface and can be invoked,
+        streamed, batched, and run asynchronously.
+    """
+    builder = StateGraph(GraphState)
+
+    builder.add_node("search_kg_db", retrieve_kg_agent)
+    builder.add_node("search_vector_db", retrieve_db_agent)
+    builder.add_node("assemble_context", assemble_context_agent)
+    builder.add_node("generate_and_grade", generate_and_grade_node)
+    builder.add_node("grader", grader_agent)
+    builder.add_node("websearch", websearch_agent)
+    builder.add_node("refine_answer", refine_answer_agent)
+    builder.add_node("finalize", finalize_answer_agent)
+    add_pre_grader(builder)
+    
+    if QUERY_EXPANSION_COUNT > 0:
+        builder.add_node("expand_query", expand_query_agent)
+        builder.add_edge(START, "expand_query")
+        builder.add_edge("expand_query", "search_vector_db")
+    else:
+        builder.add_edge(START, "search_vector_db")
+    builder.add_edge(START, "search_kg_db")
+
+    builder.add_edge(["search_kg_db", "search_vector_db"], "assemble_context")
+    builder.add_edge("assemble_context", "generate_and_grade")
+
+    builder.add_conditional_edges(
+        "generate_and_grade",
+        decide_fast_path_agent,
+        {
+            "good": "finalize",
+            "not good enough": "websearch",
+            "exhausted": "finalize",
+            "borderline": "grader"
+        }
+    )
+
+    builder.add_conditional_edges(
+        "grader",
+        decide_metrics_agent,
+        {
+            "good": "finalize",
+            "not good enough": "websearch",
+            "exhausted": "finalize"
+        }
+    )
+    
+    builder.add_edge("websearch", "refine_answer")
+
+    builder.add_edge("refine_answer", GRADING_ENTRY)
+
+    builder.add_edge("finalize", END)
+
+    graph = builder.compile()
+    
+    return graph
+
 full_graph = get_full_graph()
 vector_graph = get_vector_graph()
-kg_graph = get_kg_graph()
\ No newline at end of file
+kg_graph = get_kg_graph()
+fast_graph = get_fast_graph()
\ No newline at end of file
@@ -0,0 +1,208 @@
+import os
+
+import numpy as np
+
+from collections import defaultdict
+from llama_index.core.graph_stores import SimplePropertyGraphStore
+from llama_index.core.graph_stores.types import ChunkNode, EntityNode, LabelledNode, LabelledPropertyGraph, Relation, Triplet
+from llama_index.core.vector_stores.types import VectorStoreQuery
+from typing import Any, Dict, List, Optional, Tuple
+
+# Relationships between chunks and the entities extracted from them. Neo4jPropertyGraphStore never traverses them
+SOURCE_RELATIONS = {"MENTIONS"}
+
+SNAPSHOT_NODES_QUERY = """
+MATCH (n:`__Node__`)
+RETURN n.id AS id,
+       [l IN labels(n) WHERE NOT l IN ['__Entity__', '__Node__'] | l][0] AS label,
+       '__Entity__' IN labels(n) AS is_entity,
+       n.text AS text,
+       n.embedding AS embedding,
+       n{.*, id: null, text: null, embedding: null} AS properties
+"""
+
+SNAPSHOT_RELATIONS_QUERY = """
+MATCH (s:`__Node__`)-[r]->(t:`__Node__`)
+RETURN s.id AS source_id, type(r) AS label, t.id AS target_id, properties(r) AS properties
+"""
+
+def clean_properties(properties: Optional[dict]) -> dict:
+    return {key: value for key, value in (properties or {}).items() if value is not None}
+
+class InMemoryPropertyGraphStore(SimplePropertyGraphStore):
+    """
+    In-process property graph store: a drop-in for Neo4jPropertyGraphStore for local runs, deterministic benchmarks
+    and as a low-latency read replica of small graphs.
+
+    On top of llama-index's SimplePropertyGraphStore it keeps:
+    - adjacency lists (node id -> relations), so `get_rel_map` expands a hop in O(degree) instead of scanning every triplet
+    - a NumPy vector index over the entity embeddings, so `PropertyGraphIndex` and `VectorContextRetriever`
+      can run vector queries without a separate vector store
+
+    Both are rebuilt lazily after any write. Snapshots are the SimplePropertyGraphStore JSON (`save_snapshot`/`load_snapshot`),
+    and can be taken from (`from_neo4j`) or written back to (`export_to`) a Neo4j graph.
+    """
+    supports_vector_queries: bool = True
+
+    def __init__(self, graph: Optional[LabelledPropertyGraph] = None):
+        super().__init__(graph)
+        self._adjacency: Optional[Dict[str, List[Relation]]] = None
+        self._vector_ids: Optional[List[str]] = None
+        self._vectors: Optional[np.ndarray] = None
+
+    def _invalidate_indexes(self) -> None:
+        self._adjacency = None
+        self._vector_ids, self._vectors = None, None
+
+    def _get_adjacency(self) -> Dict[str, List[Relation]]:
+        if self._adjacency is None:
+            adjacency = defaultdict(list)
+            for relation in self.graph.relations.values():
+                if relation.source_id in self.graph.nodes and relation.target_id in self.graph.nodes:
+                    adjacency[relation.source_id].append(relation)
+                    if relation.target_id != relation.source_id:
+                        adjacency[relation.target_id].append(relation)
+            self._adjacency = dict(adjacency)
+        return self._adjacency
+
+    def _get_vector_index(self) -> Tuple[List[str], np.ndarray]:
+        if self._vectors is None:
+            ids, embeddings = [], []
+            for node_id, node in self.graph.nodes.items():
+                if isinstance(node, EntityNode) and node.embedding:
+                    ids.append(node_id)
+                    embeddings.append(node.embedding)
+            matrix = np.asarray(embeddings, dtype=np.float32).reshape(len(embeddings), -1)
+            norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+            self._vector_ids, self._vectors = ids, matrix / np.where(norms == 0, 1, norms)
+        return self._vector_ids, self._vectors
+
+    def upsert_nodes(self, nodes: List[LabelledNode]) -> None:
+        super().upsert_nodes(nodes)
+        self._invalidate_indexes()
+
+    def upsert_relations(self, relations: List[Relation]) -> None:
+        super().upsert_relations(relations)
+        self._invalidate_indexes()
+
+    def delete(self, *args, **kwargs) -> None:
+        super().delete(*args, **kwargs)
+        self._invalidate_indexes()
+
+    def get_rel_map(self,
+                    graph_nodes: List[LabelledNode],
+                    depth: int = 2,
+                    limit: int = 30,
+                    ignore_rels: Optional[List[str]] = None) -> List[Triplet]:
+        """
+        Breadth-first expansion over the adjacency lists: every relation on a path of at most `depth` hops
+        from a seed node, ordered by seed, up to `limit` triplets (same semantics as the Neo4j store)
+        """
+        adjacency = self._get_adjacency()
+        ignored = SOURCE_RELATIONS | set(ignore_rels or [])
+        triplets, seen = [], set()
+
+        for seed in graph_nodes:
+            visited, frontier = {seed.id}, [seed.id]
+            for _ in range(depth):
+                next_frontier = []
+                for node_id in frontier:
+                    for relation in adjacency.get(node_id, []):
+                        if relation.label in ignored:
+                            continue
+                        key = (relation.source_id, relation.label, relation.target_id)
+                        if key not in seen:
+                            seen.add(key)
+                            triplets.append([self.graph.nodes[relation.source_id], relation, self.graph.nodes[relation.target_id]])
+                            if len(triplets) >= limit:
+                                return triplets
+                        neighbor = relation.target_id if relation.source_id == node_id else relation.source_id
+                        if neighbor not in visited:
+                            visited.add(neighbor)
+                            next_frontier.append(neighbor)
+                frontier = next_frontier
+        return triplets
+
+    def vector_query(self, query: VectorStoreQuery, **kwargs: Any) -> Tuple[List[LabelledNode], List[float]]:
+        """
+        Exact cosine top-k over the entity embeddings
+        """
+        ids, vectors = self._get_vector_index()
+        if query.query_embedding is None or not ids:
+            return [], []
+
+        embedding = np.asarray(query.query_embedding, dtype=np.float32)
+        scores = vectors @ (embedding / (np.linalg.norm(embedding) or 1))
+        top_k = min(query.similarity_top_k, len(ids))
+        top = np.argpartition(-scores, top_k - 1)[:top_k]
+        top = top[np.argsort(-scores[top])]
+        return [self.graph.nodes[ids[i]] for i in top], [float(scores[i]) for i in top]
+
+    def save_snapshot(self, path: str) -> None:
+        """
+        Writes the graph, including the entity embeddings, to a JSON snapshot
+        """
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.persist(path)
+
+    @classmethod
+    def load_snapshot(cls, path: str) -> "InMemoryPropertyGraphStore":
+        """
+        Loads a snapshot written by `save_snapshot`
+        """
+        return cls.from_persist_path(path)
+
+    @classmethod
+    def from_neo4j(cls, graph_store) -> "InMemoryPropertyGraphStore":
+        """
+        Copies a Neo4jPropertyGraphStore into memory, embeddings included
+
+        Args:
+            graph_store (Neo4jPropertyGraphStore): The source graph store
+
+        Returns:
+            InMemoryPropertyGraphStore: The in-memory copy
+        """
+        nodes = []
+        for row in graph_store.structured_query(SNAPSHOT_NODES_QUERY):
+            properties = clean_properties(row["properties"])
+            if row["is_entity"]:
+                name = properties.pop("name", row["id"])
+                nodes.append(EntityNode(name=name, label=row["label"] or "entity", properties=properties, embedding=row["embedding"]))
+            elif row["text"] is not None:
+                nodes.append(ChunkNode(text=row["text"], id_=row["id"], label=row["label"] or "text_chunk", properties=properties))
+
+        relations = [
+            Relation(label=row["label"], source_id=row["source_id"], target_id=row["target_id"], properties=clean_properties(row["properties"]))
+            for row in graph_store.structured_query(SNAPSHOT_RELATIONS_QUERY)
+            # Neo4jPropertyGraphStore recreates these from `triplet_source_id` when upserting entities
+            if row["label"] not in SOURCE_RELATIONS
+        ]
+
+        store = cls()
+        store.upsert_nodes(nodes)
+        store.upsert_relations(relations)
+        return store
+
+    def export_to(self, graph_store) -> None:
+        """
+        Writes every node and relation into another property graph store, e.g. to restore a snapshot into Neo4j
+        """
+        graph_store.upsert_nodes(list(self.graph.nodes.values()))
+        graph_store.upsert_relations(list(self.graph.relations.values()))
+
+if __name__ == "__main__":
+    import argparse
+
+    from llama_index.graph_stores.neo4j import Neo4jPropertyGraphStore
+
+    parser = argparse.ArgumentParser(description="Snapshot the Neo4j knowledge graph for GRAPH_BACKEND=memory")
+    parser.add_argument("--output", default=os.getenv("GRAPH_SNAPSHOT_PATH", "src/data/graph_snapshot.json"))
+    parser.add_argument("--url", default="bolt://localhost:7687")
+    parser.add_argument("--username", default="neo4j")
+    args = parser.parse_args()
+
+    neo4j_store = Neo4jPropertyGraphStore(username=args.username, password=os.getenv("NEO4J_PASSWORD"), url=args.url, refresh_schema=False)
+    memory_store = InMemoryPropertyGraphStore.from_neo4j(neo4j_store)
+    memory_store.save_snapshot(args.output)
+    print(f"Saved {len(memory_store.graph.nodes)} nodes and {len(memory_store.graph.relations)} relations to {args.output}")
@@ -0,0 +1,165 @@
+import json
+import os
+import threading
+
+import numpy as np
+
+from llama_index.core.base.embeddings.base import BaseEmbedding
+from llama_index.core.schema import TextNode
+from typing import Dict, List, Optional
+
+from src.graph.query_graph import CHUNK_QUERY, format_kg_nodes
+
+NEIGHBORHOOD_STORE_PATH = os.getenv("KG_NEIGHBORHOOD_PATH", os.path.join(os.path.dirname(__file__), "..", "data", "kg_neighborhoods.npz"))
+
+# Every entity with an embedding, with its 1-hop triplets (MENTIONS edges to chunks excluded)
+NEIGHBORHOOD_QUERY = """
+MATCH (e:`__Entity__`)
+WHERE e.embedding IS NOT NULL
+OPTIONAL MATCH (e)-[r]-(:`__Entity__`)
+WHERE type(r) <> 'MENTIONS'
+WITH e, collect(DISTINCT CASE WHEN r IS NULL THEN null
+                              ELSE [startNode(r).id, type(r), endNode(r).id, startNode(r).triplet_source_id] END) AS triplets
+RETURN e.id AS id, e.embedding AS embedding, triplets
+"""
+
+EMPTY_STORE = (np.zeros((0, 0), dtype=np.float32), [], [], [], {})
+
+class NeighborhoodStore:
+    """
+    Materialised 1-hop neighbourhoods of every KG entity, precomputed after graph ingestion.
+
+    A single `.npz` file holds the normalised entity embeddings plus a JSON blob with
+    the deduplicated triplets, each entity's triplet ids and the source chunk texts.
+    A query is one matmul over the entity embeddings followed by dict lookups, with no graph traversal.
+
+    The file is replaced atomically on rebuild and deleted on invalidation. Readers in other processes
+    notice either through the file's mtime, so the Chainlit app picks up a rebuild done by the ingestion API.
+    """
+    def __init__(self, path: str = NEIGHBORHOOD_STORE_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._mtime: Optional[float] = None
+        # (embeddings, entities, triplets, neighborhoods, chunks), swapped as one tuple so readers never mix two builds
+        self._data = EMPTY_STORE
+
+    @property
+    def available(self) -> bool:
+        self._refresh_if_changed()
+        return len(self._data[1]) > 0
+
+    def _refresh_if_changed(self) -> None:
+        try:
+            mtime = os.stat(self.path).st_mtime
+        except FileNotFoundError:
+            mtime = None
+        if mtime == self._mtime:
+            return
+
+        with self._lock:
+            if mtime is None:
+                self._data = EMPTY_STORE
+            else:
+                with np.load(self.path, allow_pickle=False) as data:
+                    embeddings = data["embeddings"]
+                    meta = json.loads(str(data["meta"]))
+                self._data = (embeddings, meta["entities"], meta["triplets"], meta["neighborhoods"], meta["chunks"])
+            self._mtime = mtime
+
+    def invalidate(self) -> None:
+        """
+        Deletes the materialised store, e.g. before the graph is re-ingested
+        """
+        if os.path.exists(self.path):
+            os.remove(self.path)
+        self._refresh_if_changed()
+
+    def rebuild(self, graph_store) -> int:
+        """
+        Materialises every entity's 1-hop neighbourhood from the graph store
+
+        Args:
+            graph_store: A property graph store supporting `structured_query` (e.g. Neo4jPropertyGraphStore)
+
+        Returns:
+            int: The number of entities materialised
+        """
+        rows = graph_store.structured_query(NEIGHBORHOOD_QUERY)
+
+        triplet_ids: Dict[tuple, int] = {}
+        entities, embeddings, neighborhoods = [], [], []
+        for row in rows:
+            neighborhood = []
+            for triplet in row["triplets"]:
+                key = tuple(triplet)
+                if key not in triplet_ids:
+                    triplet_ids[key] = len(triplet_ids)
+                neighborhood.append(triplet_ids[key])
+            entities.append(row["id"])
+            embeddings.append(row["embedding"])
+            neighborhoods.append(neighborhood)
+
+        triplets = [list(key) for key in triplet_ids]
+        source_ids = sorted({triplet[3] for triplet in triplets if triplet[3]})
+        chunks = {row["id"]: row["text"] for row in graph_store.structured_query(CHUNK_QUERY, param_map={"ids": source_ids})} if source_ids else {}
+
+        matrix = np.asarray(embeddings, dtype=np.float32).reshape(len(embeddings), -1)
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        matrix = matrix / np.where(norms == 0, 1, norms)
+        meta = json.dumps({"entities": entities, "triplets": triplets, "neighborhoods": neighborhoods, "chunks": chunks})
+
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        tmp_path = f"{self.path}.tmp.npz"
+        np.savez(tmp_path, embeddings=matrix, meta=np.array(meta))
+        os.replace(tmp_path, self.path)
+        self._refresh_if_changed()
+        return len(entities)
+
+    def query(self, embedding: List[float], similarity_top_k: int = 4, limit: int = 30) -> List[str]:
+        """
+        Formats the neighbourhoods of the entities closest to the query embedding, like `CypherKGRetriever` does
+
+        Args:
+            embedding (List[float]): The query embedding
+            similarity_top_k (int): Number of seed entities
+            limit (int): Maximum number of triplets
+
+        Returns:
+            List[str]: The text of each retrieved node
+        """
+        self._refresh_if_changed()
+        embeddings, entities, triplets, neighborhoods, chunks = self._data
+        if not entities:
+            return []
+
+        scores = embeddings @ np.asarray(embedding, dtype=np.float32)
+        top_k = min(similarity_top_k, len(entities))
+        seeds = np.argpartition(-scores, top_k - 1)[:top_k]
+        seeds = seeds[np.argsort(-scores[seeds])]
+
+        selected, seen = [], set()
+        for seed in seeds:
+            for triplet_id in neighborhoods[seed]:
+                if triplet_id not in seen:
+                    seen.add(triplet_id)
+                    selected.append(triplet_id)
+        rows = [dict(zip(("source", "relation", "target", "source_id"), triplets[i])) for i in selected[:limit]]
+        return format_kg_nodes(rows, chunks)
+
+class MaterializedKGRetriever:
+    """
+    KG retriever answering from the `NeighborhoodStore`, falling back to another retriever while the store is not built
+    """
+    def __init__(self, store: NeighborhoodStore, embed_model: BaseEmbedding, fallback,
+                 similarity_top_k: int = 4, limit: int = 30):
+        self.store = store
+        self.embed_model = embed_model
+        self.fallback = fallback
+        self.similarity_top_k = similarity_top_k
+        self.limit = limit
+
+    def retrieve(self, query: str) -> List[TextNode]:
+        if not self.store.available:
+            return self.fallback.retrieve(query)
+        embedding = self.embed_model.get_query_embedding(query)
+        return [TextNode(text=text) for text in self.store.query(embedding, self.similarity_top_k, self.limit)]
@@ -0,0 +1,163 @@
+import os
+
+from collections import OrderedDict
+from llama_index.core.base.embeddings.base import BaseEmbedding
+from llama_index.core.schema import TextNode
+from neo4j import Driver, GraphDatabase, RoutingControl
+from typing import Dict, List, Optional
+
+NEO4J_MAX_POOL_SIZE = int(os.getenv("NEO4J_MAX_POOL_SIZE", "50"))
+NEO4J_ACQUISITION_TIMEOUT = float(os.getenv("NEO4J_ACQUISITION_TIMEOUT", "5"))
+NEO4J_CONNECTION_TIMEOUT = float(os.getenv("NEO4J_CONNECTION_TIMEOUT", "5"))
+NEO4J_MAX_CONNECTION_LIFETIME = float(os.getenv("NEO4J_MAX_CONNECTION_LIFETIME", "3600"))
+
+# Same preamble llama-index's property graph retrievers put in front of the triplets of a source chunk
+KG_PREAMBLE = "Here are some facts extracted from the provided text:\n\n"
+
+EXACT_SEED_QUERY = """
+MATCH (e:`__Entity__`)
+WHERE e.embedding IS NOT NULL AND size(e.embedding) = $dimension
+WITH e, vector.similarity.cosine(e.embedding, $embedding) AS score
+ORDER BY score DESC LIMIT toInteger($top_k)
+"""
+
+INDEX_SEED_QUERY = """
+CALL db.index.vector.queryNodes($vector_index, toInteger($top_k), $embedding) YIELD node AS e, score
+"""
+
+# {seed} selects the seed entities; {depth} is validated to be 1 or 2 before formatting
+EXPANSION_QUERY = """
+{seed}
+WITH collect(e) AS seeds
+UNWIND range(0, size(seeds) - 1) AS idx
+WITH seeds[idx] AS e, idx
+MATCH p = (e)-[*1..{depth}]-(:`__Entity__`)
+WHERE ALL(rel IN relationships(p) WHERE type(rel) <> 'MENTIONS')
+UNWIND relationships(p) AS rel
+WITH rel, min(idx) AS idx
+ORDER BY idx
+LIMIT toInteger($limit)
+RETURN startNode(rel).id AS source, type(rel) AS relation, endNode(rel).id AS target,
+       startNode(rel).triplet_source_id AS source_id
+"""
+
+CHUNK_QUERY = """
+MATCH (c:`__Node__`)
+WHERE c.id IN $ids AND c.text IS NOT NULL
+RETURN c.id AS id, c.text AS text
+"""
+
+def create_neo4j_driver(url: str, username: str, password: str) -> Driver:
+    """
+    Creates a pooled Neo4j driver shared by all KG queries in the process
+
+    Args:
+        url (str): The bolt url
+        username (str): The Neo4j username
+        password (str): The Neo4j password
+
+    Returns:
+        Driver: The Neo4j driver
+    """
+    return GraphDatabase.driver(
+        url,
+        auth=(username, password),
+        max_connection_pool_size=NEO4J_MAX_POOL_SIZE,
+        connection_acquisition_timeout=NEO4J_ACQUISITION_TIMEOUT,
+        connection_timeout=NEO4J_CONNECTION_TIMEOUT,
+        max_connection_lifetime=NEO4J_MAX_CONNECTION_LIFETIME,
+        keep_alive=True,
+    )
+
+def format_triplet(source: str, relation: str, target: str) -> str:
+    # llama-index uses EntityNode.id (the name with double quotes replaced) and the relation label
+    return f"{source.replace(chr(34), ' ')} -> {relation} -> {target.replace(chr(34), ' ')}"
+
+def format_kg_nodes(triplets: List[Dict], chunk_texts: Dict[str, str]) -> List[str]:
+    """
+    Formats triplets the way llama-index's property graph retriever does: triplets sharing a source chunk are grouped
+    under the preamble and followed by the chunk text; triplets without a known chunk become nodes of their own.
+
+    Args:
+        triplets (List[Dict]): Rows with source, relation, target and source_id
+        chunk_texts (Dict[str, str]): Chunk id -> chunk text
+
+    Returns:
+        List[str]: The text of each retrieved node, deduplicated
+    """
+    grouped: "OrderedDict[Optional[str], List[str]]" = OrderedDict()
+    standalone = []
+    for row in triplets:
+        text = format_triplet(row["source"], row["relation"], row["target"])
+        source_id = row.get("source_id")
+        if source_id in chunk_texts:
+            grouped.setdefault(source_id, [])
+            if text not in grouped[source_id]:
+                grouped[source_id].append(text)
+        else:
+            standalone.append(text)
+
+    texts = [KG_PREAMBLE + "\n".join(lines) + "\n\n" + chunk_texts[source_id] for source_id, lines in grouped.items()]
+    return list(dict.fromkeys(texts + standalone))
+
+class CypherKGRetriever:
+    """
+    KG retriever that issues parameterised Cypher directly over a pooled driver:
+    vector lookup of the seed entities, then a bounded 1-2 hop expansion with a hard row limit, in one round trip
+    (plus one for the source chunk texts).
+    """
+    def __init__(self,
+                 driver: Driver,
+                 embed_model: BaseEmbedding,
+                 database: str = "neo4j",
+                 similarity_top_k: int = 4,
+                 path_depth: int = 1,
+                 limit: int = 30,
+                 vector_index: Optional[str] = None):
+        if path_depth not in (1, 2):
+            raise ValueError("path_depth must be 1 or 2")
+        self.driver = driver
+        self.embed_model = embed_model
+        self.database = database
+        self.similarity_top_k = similarity_top_k
+        self.limit = limit
+        self.vector_index = vector_index
+        seed = INDEX_SEED_QUERY if vector_index else EXACT_SEED_QUERY
+        self.expansion_query = EXPANSION_QUERY.format(seed=seed, depth=path_depth)
+
+    def _read(self, query: str, parameters: dict) -> List[Dict]:
+        records, _, _ = self.driver.execute_query(query, parameters, database_=self.database, routing_=RoutingControl.READ)
+        return [record.data() for record in records]
+
+    def retrieve_with_embedding(self, embedding: List[float]) -> List[TextNode]:
+        """
+        Retrieves KG context for an already embedded query
+
+        Args:
+            embedding (List[float]): The query embedding
+
+        Returns:
+            List[TextNode]: The retrieved nodes
+        """
+        triplets = self._read(self.expansion_query, {
+            "embedding": embedding,
+            "dimension": len(embedding),
+            "top_k": self.similarity_top_k,
+            "limit": self.limit,
+            "vector_index": self.vector_index,
+        })
+        source_ids = list({row["source_id"] for row in triplets if row.get("source_id")})
+        chunk_texts = {row["id"]: row["text"] for row in self._read(CHUNK_QUERY, {"ids": source_ids})} if source_ids else {}
+        return [TextNode(text=text) for text in format_kg_nodes(triplets, chunk_texts)]
+
+    def retrieve(self, query: str) -> List[TextNode]:
+        """
+        Retrieves KG context for a query, with the same output as `kg_retriever.retrieve`
+
+        Args:
+            query (str): The user query
+
+        Returns:
+            List[TextNode]: The retrieved nodes
+        """
+        return self.retrieve_with_embedding(self.embed_model.get_query_embedding(query))
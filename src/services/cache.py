@@ -0,0 +1,173 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+
+from array import array
+from collections import OrderedDict
+from typing import Any, Hashable, List, Optional
+
+# Stay below SQLite's default limit on bound parameters per statement
+SQLITE_BATCH_SIZE = 500
+
+class LRUCache:
+    """
+    Thread-safe, size-bounded LRU cache with hit/miss counters.
+    Shared across sessions, so access is guarded by a lock (executor threads read and write it too).
+    """
+    def __init__(self, max_size: int = 1024, name: str = "LRU Cache"):
+        if max_size <= 0:
+            raise ValueError("max_size must be a positive integer")
+        self.name = name
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable, default: Optional[Any] = None) -> Any:
+        """
+        Returns the cached value and marks it as most recently used
+
+        Args:
+            key (Hashable): The cache key
+            default (Any, optional): Returned on a miss. Defaults to None.
+
+        Returns:
+            Any: The cached value, or default on a miss
+        """
+        with self._lock:
+            if key in self._data:
+                self._data.move_to_end(key)
+                self.hits += 1
+                return self._data[key]
+            self.misses += 1
+            return default
+
+    def put(self, key: Hashable, value: Any) -> None:
+        """
+        Inserts a value, evicting the least recently used entry when full
+
+        Args:
+            key (Hashable): The cache key
+            value (Any): The value to cache
+        """
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "size": len(self._data),
+                "max_size": self.max_size,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / total if total else 0.0,
+            }
+
+    def __contains__(self, key: Hashable) -> bool:
+        with self._lock:
+            return key in self._data
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._data)
+
+class PersistentEmbeddingCache:
+    """
+    Disk-backed (SQLite) embedding cache keyed by model name + text hash, with a size cap and LRU eviction.
+    Survives restarts, so repeated queries and re-ingesting the same documents skip the embedding API.
+    """
+    def __init__(self, path: str, max_entries: int = 100_000):
+        if max_entries <= 0:
+            raise ValueError("max_entries must be a positive integer")
+        self.path = path
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS embeddings (
+                key TEXT PRIMARY KEY,
+                model TEXT NOT NULL,
+                embedding BLOB NOT NULL,
+                last_access REAL NOT NULL
+            )
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_embeddings_last_access ON embeddings (last_access)")
+        self._conn.commit()
+
+    @staticmethod
+    def make_key(model: str, text: str) -> str:
+        return hashlib.sha256(f"{model}\0{text}".encode("utf-8")).hexdigest()
+
+    def get_many(self, model: str, texts: List[str]) -> List[Optional[List[float]]]:
+        """
+        Looks up a batch of embeddings
+
+        Args:
+            model (str): The embedding model name (and mode)
+            texts (List[str]): The embedded texts
+
+        Returns:
+            List[Optional[List[float]]]: The embedding for each text, or None on a miss
+        """
+        keys = [self.make_key(model, text) for text in texts]
+        found = {}
+        with self._lock:
+            for start in range(0, len(keys), SQLITE_BATCH_SIZE):
+                batch = keys[start:start + SQLITE_BATCH_SIZE]
+                placeholders = ",".join("?" * len(batch))
+                rows = self._conn.execute(f"SELECT key, embedding FROM embeddings WHERE key IN ({placeholders})", batch).fetchall()
+                found.update({key: array("f", blob).tolist() for key, blob in rows})
+            if found:
+                now = time.time()
+                self._conn.executemany("UPDATE embeddings SET last_access = ? WHERE key = ?", [(now, key) for key in found])
+                self._conn.commit()
+            self.hits += sum(1 for key in keys if key in found)
+            self.misses += sum(1 for key in keys if key not in found)
+        return [found.get(key) for key in keys]
+
+    def put_many(self, model: str, texts: List[str], embeddings: List[List[float]]) -> None:
+        """
+        Stores a batch of embeddings, evicting the least recently used entries beyond the size cap
+        """
+        now = time.time()
+        rows = [(self.make_key(model, text), model, array("f", embedding).tobytes(), now) for text, embedding in zip(texts, embeddings)]
+        with self._lock:
+            self._conn.executemany("INSERT OR REPLACE INTO embeddings (key, model, embedding, last_access) VALUES (?, ?, ?, ?)", rows)
+            (count,) = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()
+            if count > self.max_entries:
+                self._conn.execute("""
+                    DELETE FROM embeddings WHERE key IN (
+                        SELECT key FROM embeddings ORDER BY last_access ASC LIMIT ?
+                    )
+                """, (count - self.max_entries,))
+            self._conn.commit()
+
+    def stats(self) -> dict:
+        with self._lock:
+            (size,) = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()
+            total = self.hits + self.misses
+            return {
+                "size": size,
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / total if total else 0.0,
+            }
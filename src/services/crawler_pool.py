@@ -0,0 +1,164 @@
+import asyncio
+import os
+import time
+
+from crawl4ai import AsyncWebCrawler
+from typing import List, Optional
+
+# Browsers kept alive per process, and the number of pages each may have in flight
+CRAWLER_POOL_SIZE = int(os.getenv("CRAWLER_POOL_SIZE", "2"))
+CRAWLER_PAGES_PER_BROWSER = int(os.getenv("CRAWLER_PAGES_PER_BROWSER", "4"))
+# Browsers are restarted after this many pages (bounds memory growth) or this many consecutive failures
+CRAWLER_RECYCLE_AFTER = int(os.getenv("CRAWLER_RECYCLE_AFTER", "200"))
+CRAWLER_MAX_FAILURES = int(os.getenv("CRAWLER_MAX_FAILURES", "3"))
+CRAWLER_VERBOSE = os.getenv("CRAWLER_VERBOSE", "false").lower() == "true"
+
+class CrawlerSlot:
+    """
+    One pooled browser and its bookkeeping
+    """
+    def __init__(self, slot_id: int):
+        self.slot_id = slot_id
+        self.crawler: Optional[AsyncWebCrawler] = None
+        self.lock = asyncio.Lock()
+        self.active = 0
+        self.pages = 0
+        self.failures = 0
+        self.retiring = False
+
+def is_healthy(crawler: AsyncWebCrawler) -> bool:
+    """
+    A crawler is healthy while its browser is still connected. Strategies that don't expose a browser are assumed healthy.
+    """
+    browser = getattr(getattr(crawler, "crawler_strategy", None), "browser", None)
+    if browser is None or not hasattr(browser, "is_connected"):
+        return True
+    return browser.is_connected()
+
+class CrawlerPool:
+    """
+    Long-lived, bounded pool of AsyncWebCrawlers shared by every session in the process, so a crawl only pays page-fetch time.
+
+    - Browsers are started lazily, on the first page that needs them
+    - At most `size` browsers, each with at most `pages_per_browser` pages in flight; further pages wait for a free slot
+    - Before a browser is handed out it is health-checked and restarted if its browser has disconnected
+    - A browser is recycled (closed once idle, restarted on next use) after `recycle_after` pages or `max_failures` consecutive errors
+    """
+    def __init__(self,
+                 size: int = CRAWLER_POOL_SIZE,
+                 pages_per_browser: int = CRAWLER_PAGES_PER_BROWSER,
+                 recycle_after: int = CRAWLER_RECYCLE_AFTER,
+                 max_failures: int = CRAWLER_MAX_FAILURES):
+        self.pages_per_browser = pages_per_browser
+        self.recycle_after = recycle_after
+        self.max_failures = max_failures
+        self.slots: List[CrawlerSlot] = [CrawlerSlot(slot_id) for slot_id in range(size)]
+        self._condition = asyncio.Condition()
+        self.started = 0
+        self.recycled = 0
+        self.pages = 0
+
+    def _pick_slot(self) -> Optional[CrawlerSlot]:
+        # prefer browsers that are already running, then the least loaded one
+        candidates = [slot for slot in self.slots if not slot.retiring and slot.active < self.pages_per_browser]
+        if not candidates:
+            return None
+        return min(candidates, key=lambda slot: (slot.crawler is None, slot.active))
+
+    async def _start(self, slot: CrawlerSlot) -> None:
+        async with slot.lock:
+            if slot.crawler is not None and not is_healthy(slot.crawler):
+                print(f"Crawler {slot.slot_id} failed its health check, restarting...")
+                await self._close(slot)
+            if slot.crawler is None:
+                start = time.perf_counter()
+                crawler = AsyncWebCrawler(verbose=CRAWLER_VERBOSE)
+                await crawler.__aenter__()
+                slot.crawler, slot.pages, slot.failures = crawler, 0, 0
+                self.started += 1
+                print(f"Crawler {slot.slot_id} started in {time.perf_counter() - start:.2f}s")
+
+    async def _close(self, slot: CrawlerSlot) -> None:
+        crawler, slot.crawler = slot.crawler, None
+        if crawler is not None:
+            try:
+                await crawler.__aexit__(None, None, None)
+            except Exception as e:
+                print(f"Error closing crawler {slot.slot_id}: {e}")
+
+    async def _acquire(self) -> CrawlerSlot:
+        async with self._condition:
+            slot = self._pick_slot()
+            while slot is None:
+                await self._condition.wait()
+                slot = self._pick_slot()
+            slot.active += 1
+
+        try:
+            await self._start(slot)
+        except BaseException as e:
+            await self._release(slot, failed=not isinstance(e, asyncio.CancelledError))
+            raise
+        return slot
+
+    async def _release(self, slot: CrawlerSlot, failed: bool) -> None:
+        async with self._condition:
+            slot.active -= 1
+            slot.pages += 1
+            slot.failures = slot.failures + 1 if failed else 0
+            if slot.pages >= self.recycle_after or slot.failures >= self.max_failures:
+                slot.retiring = True
+            recycle = slot.retiring and slot.active == 0
+            if not recycle:
+                self._condition.notify_all()
+
+        if recycle:
+            async with slot.lock:
+                await self._close(slot)
+            self.recycled += 1
+            async with self._condition:
+                slot.retiring = False
+                self._condition.notify_all()
+
+    async def arun(self, url: str, **kwargs):
+        """
+        Crawls a page on a pooled browser
+
+        Args:
+            url (str): The page to crawl
+            **kwargs: Forwarded to `AsyncWebCrawler.arun`
+
+        Returns:
+            CrawlResult: The crawl4ai result
+        """
+        slot = await self._acquire()
+        failed = False
+        try:
+            result = await slot.crawler.arun(url=url, **kwargs)
+            self.pages += 1
+            return result
+        except Exception:
+            # cancellation (e.g. a hedged crawl that lost) says nothing about the browser's health
+            failed = True
+            raise
+        finally:
+            await self._release(slot, failed)
+
+    async def close(self) -> None:
+        """
+        Closes every browser, e.g. on shutdown. The pool restarts browsers lazily if it is used again.
+        """
+        for slot in self.slots:
+            async with slot.lock:
+                await self._close(slot)
+
+    def stats(self) -> dict:
+        return {
+            "browsers": sum(slot.crawler is not None for slot in self.slots),
+            "active_pages": sum(slot.active for slot in self.slots),
+            "pages": self.pages,
+            "started": self.started,
+            "recycled": self.recycled,
+        }
+
+crawler_pool = CrawlerPool()
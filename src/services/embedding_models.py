@@ -1,13 +1,256 @@
+import asyncio
+import os
+
+from concurrent.futures import Executor
 from fastembed import TextEmbedding
+from llama_index.core.base.embeddings.base import BaseEmbedding
+from llama_index.core.bridge.pydantic import PrivateAttr
 from llama_index.embeddings.openai import OpenAIEmbedding
 from pymilvus import model
+from typing import Callable, List, Optional, Tuple
+
+from src.services.cache import LRUCache, PersistentEmbeddingCache
+from src.services.executors import embedding_executor, run_in_executor
 
 print("Loading in Embedding Models...")
 bge_embed_model = TextEmbedding(model_name="BAAI/bge-large-en-v1.5")
 print("Finished loading BGE Embedding Model")
 
-llama_openai_embed_model = OpenAIEmbedding(model_name="text-embedding-3-small")
+EMBEDDING_CACHE_PATH = os.getenv("EMBEDDING_CACHE_PATH", os.path.join(os.path.dirname(__file__), "..", "data", "embedding_cache.sqlite"))
+EMBEDDING_CACHE_MAX_ENTRIES = int(os.getenv("EMBEDDING_CACHE_MAX_ENTRIES", "100000"))
+
+class CachedEmbedding(BaseEmbedding):
+    """
+    llama-index embedding model that serves embeddings from a PersistentEmbeddingCache and only sends misses
+    (as one batch) to the wrapped model. Query and text embeddings are cached separately.
+    """
+    _embed_model: BaseEmbedding = PrivateAttr()
+    _cache: PersistentEmbeddingCache = PrivateAttr()
+
+    def __init__(self, embed_model: BaseEmbedding, cache: PersistentEmbeddingCache, **kwargs):
+        super().__init__(model_name=embed_model.model_name, embed_batch_size=embed_model.embed_batch_size, **kwargs)
+        self._embed_model = embed_model
+        self._cache = cache
+
+    @classmethod
+    def class_name(cls) -> str:
+        return "CachedEmbedding"
+
+    @property
+    def cache(self) -> PersistentEmbeddingCache:
+        return self._cache
+
+    def _cache_model(self, mode: str) -> str:
+        return f"{self._embed_model.model_name}:{mode}"
+
+    def _split_misses(self, mode: str, texts: List[str]) -> Tuple[List[Optional[List[float]]], List[int]]:
+        embeddings = self._cache.get_many(self._cache_model(mode), texts)
+        return embeddings, [i for i, embedding in enumerate(embeddings) if embedding is None]
+
+    def _fill_misses(self, mode: str, texts: List[str], embeddings: List[Optional[List[float]]],
+                     missing: List[int], new_embeddings: List[List[float]]) -> List[List[float]]:
+        self._cache.put_many(self._cache_model(mode), [texts[i] for i in missing], new_embeddings)
+        for i, embedding in zip(missing, new_embeddings):
+            embeddings[i] = embedding
+        return embeddings
+
+    def _get_query_embedding(self, query: str) -> List[float]:
+        embeddings, missing = self._split_misses("query", [query])
+        if missing:
+            embeddings = self._fill_misses("query", [query], embeddings, missing, [self._embed_model.get_query_embedding(query)])
+        return embeddings[0]
+
+    async def _aget_query_embedding(self, query: str) -> List[float]:
+        embeddings, missing = self._split_misses("query", [query])
+        if missing:
+            embeddings = self._fill_misses("query", [query], embeddings, missing, [await self._embed_model.aget_query_embedding(query)])
+        return embeddings[0]
+
+    def _get_text_embedding(self, text: str) -> List[float]:
+        return self._get_text_embeddings([text])[0]
+
+    async def _aget_text_embedding(self, text: str) -> List[float]:
+        return (await self._aget_text_embeddings([text]))[0]
+
+    def _get_text_embeddings(self, texts: List[str]) -> List[List[float]]:
+        embeddings, missing = self._split_misses("text", texts)
+        if missing:
+            new_embeddings = self._embed_model.get_text_embedding_batch([texts[i] for i in missing])
+            embeddings = self._fill_misses("text", texts, embeddings, missing, new_embeddings)
+        return embeddings
+
+    async def _aget_text_embeddings(self, texts: List[str]) -> List[List[float]]:
+        embeddings, missing = self._split_misses("text", texts)
+        if missing:
+            new_embeddings = await self._embed_model.aget_text_embedding_batch([texts[i] for i in missing])
+            embeddings = self._fill_misses("text", texts, embeddings, missing, new_embeddings)
+        return embeddings
+
+# OpenAI embeddings for the KG (query + node embeddings), behind a persistent cache
+llama_openai_embed_model = CachedEmbedding(
+    embed_model=OpenAIEmbedding(model_name="text-embedding-3-small"),
+    cache=PersistentEmbeddingCache(EMBEDDING_CACHE_PATH, max_entries=EMBEDDING_CACHE_MAX_ENTRIES),
+)
 splade_embed_model = model.sparse.SpladeEmbeddingFunction(
     model_name="naver/splade-cocondenser-ensembledistil",
     device="cpu",
-)
\ No newline at end of file
+)
+
+QUERY_EMBEDDING_CACHE_SIZE = int(os.getenv("QUERY_EMBEDDING_CACHE_SIZE", "2048"))
+QUERY_BATCH_MAX_SIZE = int(os.getenv("QUERY_BATCH_MAX_SIZE", "16"))
+QUERY_BATCH_WINDOW_MS = float(os.getenv("QUERY_BATCH_WINDOW_MS", "5"))
+
+# Process-wide cache of (dense, sparse) query embeddings, keyed by the normalised query text
+query_embedding_cache = LRUCache(max_size=QUERY_EMBEDDING_CACHE_SIZE, name="Query Embedding Cache")
+
+def normalize_query(query: str) -> str:
+    """
+    Normalises a query for embedding and cache lookups.
+    Both bge-large-en and SPLADE are uncased, so lowercasing does not change the embeddings.
+    """
+    return " ".join(query.lower().split())
+
+def encode_queries(queries: List[str]) -> List[Tuple[list, object]]:
+    """
+    Encodes a batch of queries with bge (dense) and SPLADE (sparse) in one call each, bypassing the cache
+
+    Args:
+        queries (List[str]): The normalised queries
+
+    Returns:
+        List[Tuple[list, object]]: One (dense embedding, sparse embedding row) pair per query
+    """
+    dense_embeddings = list(bge_embed_model.query_embed(queries))
+    sparse_embeddings = list(splade_embed_model.encode_queries(queries))
+    return list(zip(dense_embeddings, sparse_embeddings))
+
+def embed_queries(queries: List[str]) -> List[Tuple[list, object]]:
+    """
+    Returns the dense and sparse embeddings for each query, encoding only the cache misses (as one batch)
+
+    Args:
+        queries (List[str]): The user queries
+
+    Returns:
+        List[Tuple[list, object]]: One (dense embedding, sparse embedding row) pair per query
+    """
+    keys = [normalize_query(query) for query in queries]
+    embeddings = {key: query_embedding_cache.get(key) for key in dict.fromkeys(keys)}
+
+    missing = [key for key, value in embeddings.items() if value is None]
+    if missing:
+        for key, value in zip(missing, encode_queries(missing)):
+            query_embedding_cache.put(key, value)
+            embeddings[key] = value
+
+    return [embeddings[key] for key in keys]
+
+def embed_query(query: str) -> Tuple[list, object]:
+    """
+    Returns the cached (dense, sparse) embedding pair for a single query
+
+    Args:
+        query (str): The user query
+
+    Returns:
+        Tuple[list, object]: The dense embedding and the sparse embedding row
+    """
+    return embed_queries([query])[0]
+
+class QueryEmbeddingBatcher:
+    """
+    Micro-batches concurrent query-embedding requests.
+    Requests are collected for up to `window_ms` (or until `max_batch_size` queries are pending),
+    encoded in a single call on the embedding pool, and the results fanned back out to the awaiting callers.
+    """
+    def __init__(self,
+                 encode_fn: Callable[[List[str]], List[Tuple[list, object]]] = encode_queries,
+                 max_batch_size: int = QUERY_BATCH_MAX_SIZE,
+                 window_ms: float = QUERY_BATCH_WINDOW_MS,
+                 executor: Executor = embedding_executor):
+        if max_batch_size <= 0:
+            raise ValueError("max_batch_size must be a positive integer")
+        self.encode_fn = encode_fn
+        self.max_batch_size = max_batch_size
+        self.window_ms = window_ms
+        self.executor = executor
+        self.batches = 0
+        self.queries = 0
+        self._pending: List[Tuple[str, asyncio.Future]] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._tasks = set()
+
+    async def embed(self, query: str) -> Tuple[list, object]:
+        """
+        Embeds a single query as part of the next micro-batch
+
+        Args:
+            query (str): The (normalised) query
+
+        Returns:
+            Tuple[list, object]: The dense embedding and the sparse embedding row
+        """
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((query, future))
+
+        if len(self._pending) >= self.max_batch_size or self.window_ms <= 0:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.window_ms / 1000, self._flush)
+
+        return await future
+
+    def _flush(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending, []
+        if not batch:
+            return
+        task = asyncio.get_running_loop().create_task(self._encode_batch(batch))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _encode_batch(self, batch: List[Tuple[str, asyncio.Future]]) -> None:
+        queries = list(dict.fromkeys(query for query, _ in batch))
+        self.batches += 1
+        self.queries += len(batch)
+        try:
+            embeddings = await run_in_executor(self.executor, self.encode_fn, queries)
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        results = dict(zip(queries, embeddings))
+        for query, future in batch:
+            if not future.done():
+                future.set_result(results[query])
+
+    def stats(self) -> dict:
+        return {
+            "batches": self.batches,
+            "queries": self.queries,
+            "mean_batch_size": self.queries / self.batches if self.batches else 0.0,
+        }
+
+query_embedding_batcher = QueryEmbeddingBatcher()
+
+async def embed_query_async(query: str) -> Tuple[list, object]:
+    """
+    Async counterpart of `embed_query`: serves from the cache, and batches misses with other concurrent sessions
+
+    Args:
+        query (str): The user query
+
+    Returns:
+        Tuple[list, object]: The dense embedding and the sparse embedding row
+    """
+    key = normalize_query(query)
+    embedding = query_embedding_cache.get(key)
+    if embedding is None:
+        embedding = await query_embedding_batcher.embed(key)
+        query_embedding_cache.put(key, embedding)
+    return embedding
@@ -0,0 +1,45 @@
+import asyncio
+import functools
+import multiprocessing
+import os
+
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable
+
+# Bounded pools shared by every Chainlit session in the process.
+# CPU-bound query encoding (bge + SPLADE) gets a small pool so it cannot starve the machine,
+# while blocking Milvus calls get their own I/O pool so slow searches never queue behind encoding.
+EMBEDDING_WORKERS = int(os.getenv("EMBEDDING_WORKERS", "2"))
+VECTOR_IO_WORKERS = int(os.getenv("VECTOR_IO_WORKERS", "8"))
+MAX_CONCURRENT_RETRIEVALS = int(os.getenv("MAX_CONCURRENT_RETRIEVALS", "8"))
+KG_IO_WORKERS = int(os.getenv("KG_IO_WORKERS", "8"))
+CLEANING_WORKERS = int(os.getenv("CLEANING_WORKERS", "2"))
+WEB_CACHE_WORKERS = int(os.getenv("WEB_CACHE_WORKERS", "2"))
+
+embedding_executor = ThreadPoolExecutor(max_workers=EMBEDDING_WORKERS, thread_name_prefix="embedding")
+vector_io_executor = ThreadPoolExecutor(max_workers=VECTOR_IO_WORKERS, thread_name_prefix="vector-io")
+# llama-index's Neo4j store only offers sync implementations behind its async methods, so KG retrieval gets its own pool
+kg_io_executor = ThreadPoolExecutor(max_workers=KG_IO_WORKERS, thread_name_prefix="kg-io")
+# SQLite reads and writes of the web cache, kept off the event loop and out of the other pools' queues
+web_cache_executor = ThreadPoolExecutor(max_workers=WEB_CACHE_WORKERS, thread_name_prefix="web-cache")
+# HTML cleaning is pure-Python CPU work, so it gets processes rather than threads. Workers are spawned (not forked)
+# because the parent runs browser and executor threads, and they only import the light cleaning module
+cleaning_executor = ProcessPoolExecutor(max_workers=CLEANING_WORKERS, mp_context=multiprocessing.get_context("spawn"))
+
+# Per-process cap on in-flight vector retrievals
+retrieval_semaphore = asyncio.Semaphore(MAX_CONCURRENT_RETRIEVALS)
+
+async def run_in_executor(executor: Executor, func: Callable[..., Any], *args, **kwargs) -> Any:
+    """
+    Runs a blocking function on the given executor without blocking the event loop
+
+    Args:
+        executor (Executor): The executor to run the function on
+        func (Callable): The blocking function
+        *args, **kwargs: Arguments forwarded to the function
+
+    Returns:
+        Any: The return value of the function
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(executor, functools.partial(func, *args, **kwargs))
@@ -0,0 +1,410 @@
+import asyncio
+import os
+import random
+import threading
+import time
+
+from contextlib import asynccontextmanager, contextmanager
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+# Process-wide limits on calls to the LLM provider, shared by every tool and session
+LLM_RATE_PER_SECOND = float(os.getenv("LLM_RATE_PER_SECOND", "2"))
+LLM_BURST = int(os.getenv("LLM_BURST", "4"))
+# Adaptive concurrency: starts at the max, halves on overload, grows back by ~1 per window of successes
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "8"))
+LLM_MIN_CONCURRENCY = int(os.getenv("LLM_MIN_CONCURRENCY", "1"))
+LLM_MAX_ATTEMPTS = int(os.getenv("LLM_MAX_ATTEMPTS", "3"))
+LLM_BACKOFF_BASE = float(os.getenv("LLM_BACKOFF_BASE", "1"))
+LLM_BACKOFF_MAX = float(os.getenv("LLM_BACKOFF_MAX", "20"))
+# The breaker opens after this many consecutive overloads and stays open for the cooldown
+LLM_BREAKER_THRESHOLD = int(os.getenv("LLM_BREAKER_THRESHOLD", "5"))
+LLM_BREAKER_COOLDOWN = float(os.getenv("LLM_BREAKER_COOLDOWN", "30"))
+
+# Transient transport errors of the Anthropic SDK, worth a retry but not a sign of overload
+TRANSIENT_ERRORS = {"APIConnectionError", "APITimeoutError", "InternalServerError"}
+
+class CircuitOpenError(RuntimeError):
+    """
+    Raised instead of calling the provider while the circuit breaker is open
+    """
+
+def is_overloaded(error: BaseException) -> bool:
+    message = str(error)
+    return "overloaded_error" in message or "rate_limit_error" in message
+
+def is_retryable(error: BaseException) -> bool:
+    return is_overloaded(error) or type(error).__name__ in TRANSIENT_ERRORS
+
+def backoff_delay(attempt: int, base: float = LLM_BACKOFF_BASE, cap: float = LLM_BACKOFF_MAX) -> float:
+    """
+    Exponential backoff with full jitter, so retries from concurrent sessions spread out instead of arriving together
+    """
+    return random.uniform(0, min(cap, base * 2 ** attempt))
+
+class TokenBucket:
+    """
+    Token bucket: `rate` calls per second on average, with bursts of up to `capacity`.
+    Shared by async callers on the event loop and sync callers in worker threads.
+    """
+    def __init__(self, rate: float = LLM_RATE_PER_SECOND, capacity: int = LLM_BURST):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = float(capacity)
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def _reserve(self) -> float:
+        # takes the token now and returns how long to wait for it; the balance goes negative while callers
+        # are waiting, so tokens are handed out in arrival order
+        with self._lock:
+            self._refill()
+            self.tokens -= 1
+            return max(0.0, -self.tokens / self.rate)
+
+    def _refund(self) -> None:
+        with self._lock:
+            self.tokens += 1
+
+    async def acquire(self) -> None:
+        delay = self._reserve()
+        if delay:
+            try:
+                await asyncio.sleep(delay)
+            except asyncio.CancelledError:
+                self._refund()
+                raise
+
+    def acquire_sync(self) -> None:
+        delay = self._reserve()
+        if delay:
+            time.sleep(delay)
+
+def _wake(waiter: asyncio.Future) -> None:
+    if not waiter.done():
+        waiter.set_result(None)
+
+class AdaptiveLimiter:
+    """
+    AIMD concurrency limit: each success raises the limit by 1/limit, each overload halves it.
+    Async callers and sync callers in worker threads hold slots of the same limit.
+    """
+    def __init__(self, max_limit: int = LLM_MAX_CONCURRENCY, min_limit: int = LLM_MIN_CONCURRENCY):
+        self.max_limit = max_limit
+        self.min_limit = min_limit
+        self.limit = float(max_limit)
+        self.in_flight = 0
+        self._lock = threading.Lock()
+        self._slot_freed = threading.Condition(self._lock)
+        # futures of async callers waiting for a slot, each with the loop it belongs to
+        self._waiters: List[Tuple[asyncio.AbstractEventLoop, asyncio.Future]] = []
+
+    def _try_acquire(self) -> bool:
+        # the caller holds the lock
+        if self.in_flight >= int(self.limit):
+            return False
+        self.in_flight += 1
+        return True
+
+    async def acquire(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            with self._lock:
+                if self._try_acquire():
+                    return
+                waiter = loop.create_future()
+                self._waiters.append((loop, waiter))
+            try:
+                await waiter
+            finally:
+                with self._lock:
+                    if (loop, waiter) in self._waiters:
+                        self._waiters.remove((loop, waiter))
+
+    def acquire_sync(self) -> None:
+        with self._slot_freed:
+            while not self._try_acquire():
+                self._slot_freed.wait()
+
+    def release(self, overloaded: bool = False, succeeded: bool = False) -> None:
+        with self._lock:
+            self.in_flight -= 1
+            if overloaded:
+                self.limit = max(self.min_limit, self.limit / 2)
+            elif succeeded:
+                self.limit = min(self.max_limit, self.limit + 1 / self.limit)
+            self._slot_freed.notify_all()
+            waiters, self._waiters = self._waiters, []
+        # every waiter retries, like `notify_all`
+        for loop, waiter in waiters:
+            try:
+                loop.call_soon_threadsafe(_wake, waiter)
+            except RuntimeError:
+                pass  # its loop is closed, nobody is waiting any more
+
+class CircuitBreaker:
+    """
+    Sheds load while the provider is overloaded: after `threshold` consecutive overloads, calls fail fast with
+    CircuitOpenError for `cooldown` seconds. Then a single probe call is let through (half-open), and its outcome
+    closes the breaker or opens it again.
+    """
+    def __init__(self, threshold: int = LLM_BREAKER_THRESHOLD, cooldown: float = LLM_BREAKER_COOLDOWN):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.state = "closed"
+        self.failures = 0
+        self.opened_at = 0.0
+        self.opened = 0
+        # the sync path calls in from worker threads
+        self._lock = threading.Lock()
+
+    def check(self) -> None:
+        with self._lock:
+            if self.state == "closed":
+                return
+            if self.state == "open" and time.monotonic() - self.opened_at >= self.cooldown:
+                self.state = "half_open"
+                print("LLM circuit breaker half-open, probing the provider...")
+                return
+            raise CircuitOpenError(f"LLM circuit breaker is {self.state}, shedding the call")
+
+    def record_success(self) -> None:
+        with self._lock:
+            if self.state != "closed":
+                print("LLM circuit breaker closed")
+            self.state, self.failures = "closed", 0
+
+    def record_overload(self) -> None:
+        with self._lock:
+            self.failures += 1
+            if self.state == "half_open" or self.failures >= self.threshold:
+                if self.state != "open":
+                    self.opened += 1
+                    print(f"LLM circuit breaker open for {self.cooldown:.0f}s after {self.failures} overloads")
+                self.state, self.opened_at = "open", time.monotonic()
+
+    def record_neutral(self) -> None:
+        # the probe ended without telling us anything (cancelled, or an error unrelated to load): let another one through
+        with self._lock:
+            if self.state == "half_open":
+                self.state, self.opened_at = "open", time.monotonic() - self.cooldown
+
+class LLMClient:
+    """
+    Shared admission layer for LLM calls: a circuit breaker, then a token bucket, then an adaptive concurrency slot.
+    Retries back off with jittered exponential delays that sleep outside the slot and never block the event loop.
+
+    - `call` runs a runnable's `ainvoke` with retries
+    - `call_streaming` streams a runnable with retries, returning as soon as the partial output decides the result
+    - `admit` holds a slot around a call the caller drives itself
+    - `admit_sync` and `call_sync` are the blocking counterparts for the tools' sync `func`, admitted by the same
+      breaker, bucket and limiter; their waits only block the calling thread
+    """
+    def __init__(self,
+                 max_attempts: int = LLM_MAX_ATTEMPTS,
+                 bucket: TokenBucket = None,
+                 limiter: AdaptiveLimiter = None,
+                 breaker: CircuitBreaker = None):
+        self.max_attempts = max_attempts
+        self.bucket = bucket or TokenBucket()
+        self.limiter = limiter or AdaptiveLimiter()
+        self.breaker = breaker or CircuitBreaker()
+        self.stats_counts = {"calls": 0, "retries": 0, "overloads": 0, "shed": 0, "failures": 0}
+        self.background_tasks = set()
+
+    def _check_breaker(self) -> None:
+        try:
+            self.breaker.check()
+        except CircuitOpenError:
+            self.stats_counts["shed"] += 1
+            raise
+
+    def _record(self, overloaded: bool, succeeded: bool) -> None:
+        self.limiter.release(overloaded=overloaded, succeeded=succeeded)
+        if overloaded:
+            self.stats_counts["overloads"] += 1
+            self.breaker.record_overload()
+        elif succeeded:
+            self.breaker.record_success()
+        else:
+            self.breaker.record_neutral()
+
+    @asynccontextmanager
+    async def admit(self):
+        """
+        Admits one call: raises CircuitOpenError while the breaker is open, otherwise waits for a rate token
+        and a concurrency slot, and records the call's outcome when the block exits
+        """
+        self._check_breaker()
+        try:
+            await self.bucket.acquire()
+            await self.limiter.acquire()
+        except BaseException:
+            self.breaker.record_neutral()
+            raise
+
+        self.stats_counts["calls"] += 1
+        overloaded = succeeded = False
+        try:
+            yield
+            succeeded = True
+        except BaseException as e:
+            overloaded = is_overloaded(e)
+            raise
+        finally:
+            self._record(overloaded, succeeded)
+
+    @contextmanager
+    def admit_sync(self):
+        """
+        Blocking counterpart of `admit`, for sync callers outside the event loop
+        """
+        self._check_breaker()
+        try:
+            self.bucket.acquire_sync()
+            self.limiter.acquire_sync()
+        except BaseException:
+            self.breaker.record_neutral()
+            raise
+
+        self.stats_counts["calls"] += 1
+        overloaded = succeeded = False
+        try:
+            yield
+            succeeded = True
+        except BaseException as e:
+            overloaded = is_overloaded(e)
+            raise
+        finally:
+            self._record(overloaded, succeeded)
+
+    async def call(self, runnable, inputs: Dict[str, Any], **kwargs) -> Any:
+        """
+        Runs `runnable.ainvoke(inputs)` through the admission layer, retrying overloads and transient errors
+
+        Args:
+            runnable (Runnable): The chain to call
+            inputs (Dict[str, Any]): The chain inputs
+            **kwargs: Forwarded to `ainvoke`
+
+        Returns:
+            Any: The chain output
+        """
+        for attempt in range(self.max_attempts):
+            try:
+                async with self.admit():
+                    return await runnable.ainvoke(inputs, **kwargs)
+            except CircuitOpenError:
+                raise
+            except Exception as e:
+                if not is_retryable(e) or attempt == self.max_attempts - 1:
+                    self.stats_counts["failures"] += 1
+                    raise
+                delay = backoff_delay(attempt)
+                self.stats_counts["retries"] += 1
+                print(f"LLM call failed ({type(e).__name__}), retrying in {delay:.1f}s...")
+            await asyncio.sleep(delay)
+
+    async def _stream(self, runnable, inputs: Dict[str, Any], decision: asyncio.Future,
+                      decide: Callable[[str], Optional[Any]], finish: Callable[[str], Any],
+                      on_complete: Optional[Callable[[Any], Awaitable[None]]]) -> None:
+        text = ""
+        try:
+            # the stream holds its slot until the output is complete, as the provider is still generating
+            async with self.admit():
+                async for chunk in runnable.astream(inputs):
+                    text += chunk
+                    if not decision.done():
+                        early = decide(text)
+                        if early is not None:
+                            decision.set_result(early)
+            result = finish(text)
+        except asyncio.CancelledError:
+            if not decision.done():
+                decision.cancel()
+            raise
+        except Exception as e:
+            if not decision.done():
+                decision.set_exception(e)
+            else:
+                print(f"LLM stream failed after its result was decided ({type(e).__name__}): {e}")
+            return
+
+        if not decision.done():
+            decision.set_result(result)
+        elif on_complete is not None:
+            try:
+                await on_complete(result)
+            except Exception as e:
+                print(f"Error in LLM stream completion callback: {e}")
+
+    async def call_streaming(self, runnable, inputs: Dict[str, Any],
+                             decide: Callable[[str], Optional[Any]],
+                             finish: Callable[[str], Any],
+                             on_complete: Optional[Callable[[Any], Awaitable[None]]] = None) -> Any:
+        """
+        Streams `runnable.astream(inputs)` (string chunks) through the admission layer, returning early once the partial
+        output decides the result. The rest of the stream is consumed in the background, still holding its slot.
+        Failures before the decision are retried like `call`; later ones are logged.
+
+        Args:
+            runnable (Runnable): The chain to stream, ending in a string output parser
+            inputs (Dict[str, Any]): The chain inputs
+            decide (Callable): Called with the output so far; a non-None return is the early result
+            finish (Callable): Parses the complete output, which is the result if `decide` never returned one
+            on_complete (Callable, optional): Awaited with the parsed complete output, if the result came early
+
+        Returns:
+            Any: The early result, or the parsed complete output
+        """
+        for attempt in range(self.max_attempts):
+            decision = asyncio.get_running_loop().create_future()
+            task = asyncio.create_task(self._stream(runnable, inputs, decision, decide, finish, on_complete))
+            self.background_tasks.add(task)
+            task.add_done_callback(self.background_tasks.discard)
+            try:
+                return await decision
+            except CircuitOpenError:
+                raise
+            except Exception as e:
+                if not is_retryable(e) or attempt == self.max_attempts - 1:
+                    self.stats_counts["failures"] += 1
+                    raise
+                delay = backoff_delay(attempt)
+                self.stats_counts["retries"] += 1
+                print(f"LLM stream failed ({type(e).__name__}), retrying in {delay:.1f}s...")
+            await asyncio.sleep(delay)
+
+    def call_sync(self, runnable, inputs: Dict[str, Any], **kwargs) -> Any:
+        """
+        Blocking counterpart of `call`, for sync callers outside the event loop
+        """
+        for attempt in range(self.max_attempts):
+            try:
+                with self.admit_sync():
+                    return runnable.invoke(inputs, **kwargs)
+            except CircuitOpenError:
+                raise
+            except Exception as e:
+                if not is_retryable(e) or attempt == self.max_attempts - 1:
+                    self.stats_counts["failures"] += 1
+                    raise
+                delay = backoff_delay(attempt)
+                self.stats_counts["retries"] += 1
+                print(f"LLM call failed ({type(e).__name__}), retrying in {delay:.1f}s...")
+            time.sleep(delay)
+
+    def stats(self) -> dict:
+        return {
+            **self.stats_counts,
+            "concurrency_limit": self.limiter.limit,
+            "in_flight": self.limiter.in_flight,
+            "breaker": self.breaker.state,
+            "breaker_opened": self.breaker.opened,
+        }
+
+llm_client = LLMClient()
@@ -0,0 +1,98 @@
+import asyncio
+import os
+import sys
+import threading
+import time
+import traceback
+
+from collections import deque
+from typing import Deque, Dict, Optional
+
+# Off by default: the watchdog thread samples every interval. Turn it on to check a concurrent load for blocking calls
+LOOP_MONITOR_ENABLED = os.getenv("LOOP_MONITOR_ENABLED", "false").lower() == "true"
+# A callback holding the event loop longer than this is recorded, with the stack it was blocked in
+LOOP_LAG_THRESHOLD = float(os.getenv("LOOP_LAG_THRESHOLD", "0.1"))
+LOOP_MONITOR_INTERVAL = float(os.getenv("LOOP_MONITOR_INTERVAL", "0.05"))
+LOOP_MONITOR_MAX_STALLS = int(os.getenv("LOOP_MONITOR_MAX_STALLS", "50"))
+
+class LoopMonitor:
+    """
+    Measures event-loop lag, so blocking calls that stall every Chainlit session in the process show up in the logs.
+
+    - A heartbeat task sleeps for `interval` and records how late it wakes up (the loop lag)
+    - A watchdog thread notices when the heartbeat is overdue by more than `threshold`, and captures the stack
+      of the event-loop thread while it is still blocked. Each stall is logged with that stack and its final duration
+    """
+    def __init__(self,
+                 threshold: float = LOOP_LAG_THRESHOLD,
+                 interval: float = LOOP_MONITOR_INTERVAL,
+                 max_stalls: int = LOOP_MONITOR_MAX_STALLS):
+        self.threshold = threshold
+        self.interval = interval
+        self.stalls: Deque[Dict] = deque(maxlen=max_stalls)
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self.loop_thread_id: Optional[int] = None
+        self.last_beat = time.monotonic()
+        self.beats = 0
+        self.total_lag = 0.0
+        self.max_lag = 0.0
+        self.stall_count = 0
+        self._pending_stack: Optional[str] = None
+        self._lock = threading.Lock()
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self) -> None:
+        """
+        Starts monitoring the running event loop. Idempotent: calls after the first, on the same loop, do nothing
+        """
+        loop = asyncio.get_running_loop()
+        if self.loop is loop and self._task is not None and not self._task.done():
+            return
+        self.loop, self.loop_thread_id = loop, threading.get_ident()
+        self.last_beat = time.monotonic()
+        self._task = loop.create_task(self._heartbeat())
+        threading.Thread(target=self._watchdog, args=(loop,), name="loop-watchdog", daemon=True).start()
+        print(f"Event loop monitor started (threshold {self.threshold * 1000:.0f}ms)")
+
+    async def _heartbeat(self) -> None:
+        while True:
+            expected = time.monotonic() + self.interval
+            await asyncio.sleep(self.interval)
+            now = time.monotonic()
+            lag = max(0.0, now - expected)
+            with self._lock:
+                self.last_beat = now
+                self.beats += 1
+                self.total_lag += lag
+                self.max_lag = max(self.max_lag, lag)
+                stack, self._pending_stack = self._pending_stack, None
+            if lag > self.threshold:
+                self._record_stall(lag, stack)
+
+    def _watchdog(self, loop: asyncio.AbstractEventLoop) -> None:
+        # one watchdog per monitored loop; it exits with the loop
+        while self.loop is loop and not loop.is_closed():
+            time.sleep(self.interval)
+            with self._lock:
+                overdue = time.monotonic() - self.last_beat - self.interval
+                if overdue <= self.threshold or self._pending_stack is not None:
+                    continue
+                frame = sys._current_frames().get(self.loop_thread_id)
+                self._pending_stack = "".join(traceback.format_stack(frame)) if frame is not None else "<no stack>"
+
+    def _record_stall(self, lag: float, stack: Optional[str]) -> None:
+        self.stall_count += 1
+        stall = {"at": time.time(), "lag_seconds": lag, "stack": stack or "<stall ended before the watchdog sampled it>"}
+        self.stalls.append(stall)
+        print(f"Event loop blocked for {lag * 1000:.0f}ms (threshold {self.threshold * 1000:.0f}ms), blocked in:\n{stall['stack']}")
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "beats": self.beats,
+                "avg_lag_ms": self.total_lag / self.beats * 1000 if self.beats else 0.0,
+                "max_lag_ms": self.max_lag * 1000,
+                "stalls": self.stall_count,
+            }
+
+loop_monitor = LoopMonitor()
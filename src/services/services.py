@@ -9,7 +9,11 @@ from llama_index.graph_stores.neo4j import Neo4jPropertyGraphStore
 from pymilvus import (
     connections, Collection
 )
+from src.graph.memory_graph_store import InMemoryPropertyGraphStore
+from src.graph.neighborhood_store import MaterializedKGRetriever, NeighborhoodStore
+from src.graph.query_graph import CypherKGRetriever, create_neo4j_driver
 from src.services.embedding_models import llama_openai_embed_model
+from src.vector.local_index import LocalHybridIndex
 
 OPENAI_API_KEY = os.getenv('OPENAI_API_KEY')
 CLAUDE_API_KEY = os.getenv('CLAUDE_API_KEY')
@@ -22,13 +26,29 @@ os.environ["LLAMA_CLOUD_API_KEY"] = LLAMA_API_KEY
 ENDPOINT = os.getenv('ZILLIS_ENDPOINT')
 TOKEN = os.getenv('ZILLIS_TOKEN')
 
-connections.connect(uri=ENDPOINT, token=TOKEN)
+# "milvus" (default) or "local" for the in-process hybrid index over the ingestion pickles
+VECTOR_BACKEND = os.getenv('VECTOR_BACKEND', 'milvus')
+LOCAL_INDEX_DATA_FOLDER = os.getenv('LOCAL_INDEX_DATA_FOLDER', 'notebooks/data')
+
+# "neo4j" (default) or "memory" for the in-process graph store loaded from GRAPH_SNAPSHOT_PATH
+GRAPH_BACKEND = os.getenv('GRAPH_BACKEND', 'neo4j')
+GRAPH_SNAPSHOT_PATH = os.getenv('GRAPH_SNAPSHOT_PATH', os.path.join(os.path.dirname(__file__), '..', 'data', 'graph_snapshot.json'))
 
 NEO4J_URL = "bolt://localhost:7687"
 NEO4J_USER = "neo4j"
 NEO4J_DATABASE = "neo4j"
 NEO4J_PASSWORD = os.getenv("NEO4J_PASSWORD")
 
+# "llama_index" (default), "cypher" for the direct Cypher retriever in src/graph/query_graph.py
+# or "materialized" for the precomputed entity neighbourhoods in src/graph/neighborhood_store.py
+KG_BACKEND = os.getenv('KG_BACKEND', 'llama_index')
+# Rebuild the materialised neighbourhoods after every graph ingestion (always on for KG_BACKEND=materialized)
+KG_MATERIALIZE_NEIGHBORHOODS = os.getenv('KG_MATERIALIZE_NEIGHBORHOODS', 'false').lower() == 'true' or KG_BACKEND == 'materialized'
+KG_PATH_DEPTH = int(os.getenv('KG_PATH_DEPTH', '1'))
+KG_TRIPLET_LIMIT = int(os.getenv('KG_TRIPLET_LIMIT', '30'))
+# Name of a Neo4j vector index over __Entity__ embeddings; exact cosine scan when unset
+KG_VECTOR_INDEX = os.getenv('KG_VECTOR_INDEX')
+
 llm = ChatAnthropic(
     model="claude-3-5-sonnet-20240620",
     max_tokens=4096,
@@ -42,18 +62,30 @@ llama_llm = Anthropic(
     temperature=0.0
 )
 
-print("Loading in Milvus Collection...")
 # Change name as needed
 COLLECTION_NAME = "vector_index"
-collection = Collection(name=COLLECTION_NAME)
-
-print("Loading in Graph Store...")
-graph_store = Neo4jPropertyGraphStore(
-    username=NEO4J_USER,
-    password=NEO4J_PASSWORD,
-    url=NEO4J_URL,
-    refresh_schema=False,
-)
+if VECTOR_BACKEND == "local":
+    print("Loading in Local Hybrid Index...")
+    collection = LocalHybridIndex.from_data_folder(LOCAL_INDEX_DATA_FOLDER)
+else:
+    print("Loading in Milvus Collection...")
+    connections.connect(uri=ENDPOINT, token=TOKEN)
+    collection = Collection(name=COLLECTION_NAME)
+
+if GRAPH_BACKEND == "memory":
+    print("Loading in In-Memory Graph Store...")
+    if os.path.exists(GRAPH_SNAPSHOT_PATH):
+        graph_store = InMemoryPropertyGraphStore.load_snapshot(GRAPH_SNAPSHOT_PATH)
+    else:
+        graph_store = InMemoryPropertyGraphStore()
+else:
+    print("Loading in Graph Store...")
+    graph_store = Neo4jPropertyGraphStore(
+        username=NEO4J_USER,
+        password=NEO4J_PASSWORD,
+        url=NEO4J_URL,
+        refresh_schema=False,
+    )
 
 print("Loading in Graph Indexes and Retrievers...")
 index = PropertyGraphIndex.from_existing(
@@ -74,4 +106,29 @@ keyword_retriever = LLMSynonymRetriever(
     path_depth=1,
 )
 
-kg_retriever = index.as_retriever(sub_retrievers=[vector_retriever])
\ No newline at end of file
+llama_kg_retriever = index.as_retriever(sub_retrievers=[vector_retriever])
+
+neo4j_driver = create_neo4j_driver(NEO4J_URL, NEO4J_USER, NEO4J_PASSWORD)
+cypher_kg_retriever = CypherKGRetriever(
+    neo4j_driver,
+    embed_model=llama_openai_embed_model,
+    database=NEO4J_DATABASE,
+    path_depth=KG_PATH_DEPTH,
+    limit=KG_TRIPLET_LIMIT,
+    vector_index=KG_VECTOR_INDEX,
+)
+
+neighborhood_store = NeighborhoodStore()
+materialized_kg_retriever = MaterializedKGRetriever(
+    neighborhood_store,
+    embed_model=llama_openai_embed_model,
+    fallback=cypher_kg_retriever,
+    limit=KG_TRIPLET_LIMIT,
+)
+
+kg_retrievers = {
+    "llama_index": llama_kg_retriever,
+    "cypher": cypher_kg_retriever,
+    "materialized": materialized_kg_retriever,
+}
+kg_retriever = kg_retrievers[KG_BACKEND]
@@ -0,0 +1,203 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+import httpx
+
+from concurrent.futures import Executor
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+from src.services.executors import run_in_executor, web_cache_executor
+
+WEB_CACHE_PATH = os.getenv("WEB_CACHE_PATH", os.path.join(os.path.dirname(__file__), "..", "data", "web_cache.sqlite"))
+# Cleaned pages are served without revalidation for WEB_PAGE_TTL seconds, search results for SEARCH_RESULTS_TTL seconds
+WEB_PAGE_TTL = float(os.getenv("WEB_PAGE_TTL", str(24 * 3600)))
+SEARCH_RESULTS_TTL = float(os.getenv("SEARCH_RESULTS_TTL", str(6 * 3600)))
+WEB_CACHE_MAX_ENTRIES = int(os.getenv("WEB_CACHE_MAX_ENTRIES", "10000"))
+REVALIDATION_TIMEOUT = float(os.getenv("REVALIDATION_TIMEOUT", "3"))
+
+@dataclass
+class CachedPage:
+    url: str
+    content: str
+    etag: Optional[str]
+    last_modified: Optional[str]
+    fetched_at: float
+
+    def is_fresh(self, ttl: float) -> bool:
+        return time.time() - self.fetched_at < ttl
+
+    @property
+    def revalidatable(self) -> bool:
+        return bool(self.etag or self.last_modified)
+
+def get_header(headers: Optional[Dict[str, str]], name: str) -> Optional[str]:
+    for key, value in (headers or {}).items():
+        if key.lower() == name:
+            return value
+    return None
+
+class WebCache:
+    """
+    Disk-backed (SQLite) cache for web search, shared by every session and surviving restarts:
+    - `pages`: cleaned, truncated page content keyed by URL, with the ETag / Last-Modified validators of the crawl
+    - `searches`: SerpAPI result URLs keyed by the normalised query and requested result count
+
+    Fresh pages (younger than `page_ttl`) are served directly. Stale pages that have validators are revalidated
+    with a conditional GET, and a 304 renews them without crawling again.
+
+    The SQLite calls block, so async callers use the `*_async` methods and `lookup_page`, which run them on `executor`.
+    """
+    def __init__(self,
+                 path: str = WEB_CACHE_PATH,
+                 page_ttl: float = WEB_PAGE_TTL,
+                 search_ttl: float = SEARCH_RESULTS_TTL,
+                 max_entries: int = WEB_CACHE_MAX_ENTRIES,
+                 executor: Executor = web_cache_executor):
+        self.path = path
+        self.executor = executor
+        self.page_ttl = page_ttl
+        self.search_ttl = search_ttl
+        self.max_entries = max_entries
+        self.stats_counts = {"page_hits": 0, "page_revalidated": 0, "page_misses": 0, "search_hits": 0, "search_misses": 0}
+        self._lock = threading.Lock()
+        self._client: Optional[httpx.AsyncClient] = None
+
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS pages (
+                url TEXT PRIMARY KEY,
+                content TEXT NOT NULL,
+                etag TEXT,
+                last_modified TEXT,
+                fetched_at REAL NOT NULL
+            )
+        """)
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS searches (
+                key TEXT PRIMARY KEY,
+                query TEXT NOT NULL,
+                urls TEXT NOT NULL,
+                fetched_at REAL NOT NULL
+            )
+        """)
+        self._conn.commit()
+
+    @staticmethod
+    def make_search_key(query: str, num_results: int) -> str:
+        normalised = " ".join(query.lower().split())
+        return hashlib.sha256(f"{normalised}\0{num_results}".encode("utf-8")).hexdigest()
+
+    def get_search(self, query: str, num_results: int) -> Optional[List[str]]:
+        """
+        Returns the cached result URLs for a query, or None if missing or expired
+        """
+        with self._lock:
+            row = self._conn.execute("SELECT urls, fetched_at FROM searches WHERE key = ?",
+                                     (self.make_search_key(query, num_results),)).fetchone()
+            if row is None or time.time() - row[1] >= self.search_ttl:
+                self.stats_counts["search_misses"] += 1
+                return None
+            self.stats_counts["search_hits"] += 1
+            return json.loads(row[0])
+
+    async def get_search_async(self, query: str, num_results: int) -> Optional[List[str]]:
+        return await run_in_executor(self.executor, self.get_search, query, num_results)
+
+    def put_search(self, query: str, num_results: int, urls: List[str]) -> None:
+        with self._lock:
+            self._conn.execute("INSERT OR REPLACE INTO searches (key, query, urls, fetched_at) VALUES (?, ?, ?, ?)",
+                               (self.make_search_key(query, num_results), query, json.dumps(urls), time.time()))
+            self._evict("searches", "key")
+            self._conn.commit()
+
+    async def put_search_async(self, query: str, num_results: int, urls: List[str]) -> None:
+        await run_in_executor(self.executor, self.put_search, query, num_results, urls)
+
+    def get_page(self, url: str) -> Optional[CachedPage]:
+        with self._lock:
+            row = self._conn.execute("SELECT content, etag, last_modified, fetched_at FROM pages WHERE url = ?", (url,)).fetchone()
+        return CachedPage(url, *row) if row else None
+
+    def put_page(self, url: str, content: str, headers: Optional[Dict[str, str]] = None) -> None:
+        """
+        Stores the cleaned content of a crawled page, with the validators from its response headers
+        """
+        with self._lock:
+            self._conn.execute("INSERT OR REPLACE INTO pages (url, content, etag, last_modified, fetched_at) VALUES (?, ?, ?, ?, ?)",
+                               (url, content, get_header(headers, "etag"), get_header(headers, "last-modified"), time.time()))
+            self._evict("pages", "url")
+            self._conn.commit()
+
+    async def put_page_async(self, url: str, content: str, headers: Optional[Dict[str, str]] = None) -> None:
+        await run_in_executor(self.executor, self.put_page, url, content, headers)
+
+    def renew_page(self, url: str) -> None:
+        """
+        Marks a page as fetched now, after the origin confirmed it is unchanged
+        """
+        with self._lock:
+            self._conn.execute("UPDATE pages SET fetched_at = ? WHERE url = ?", (time.time(), url))
+            self._conn.commit()
+
+    def _evict(self, table: str, key: str) -> None:
+        (count,) = self._conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()
+        if count > self.max_entries:
+            self._conn.execute(f"DELETE FROM {table} WHERE {key} IN (SELECT {key} FROM {table} ORDER BY fetched_at ASC LIMIT ?)",
+                               (count - self.max_entries,))
+
+    async def _revalidate(self, page: CachedPage) -> bool:
+        if self._client is None:
+            self._client = httpx.AsyncClient(follow_redirects=True, timeout=REVALIDATION_TIMEOUT)
+        headers = {}
+        if page.etag:
+            headers["If-None-Match"] = page.etag
+        if page.last_modified:
+            headers["If-Modified-Since"] = page.last_modified
+        try:
+            # stream so a changed page is not downloaded just to be crawled again
+            async with self._client.stream("GET", page.url, headers=headers) as response:
+                not_modified = response.status_code == 304
+        except httpx.HTTPError:
+            return False
+
+        if not_modified:
+            await run_in_executor(self.executor, self.renew_page, page.url)
+        return not_modified
+
+    async def lookup_page(self, url: str) -> Optional[str]:
+        """
+        Returns the cleaned content of a page if it is fresh, or stale but confirmed unchanged by the origin; otherwise None
+
+        Args:
+            url (str): The page url
+
+        Returns:
+            Optional[str]: The cached content, or None if the page needs to be crawled
+        """
+        page = await run_in_executor(self.executor, self.get_page, url)
+        if page is not None and page.is_fresh(self.page_ttl):
+            self.stats_counts["page_hits"] += 1
+            return page.content
+        if page is not None and page.revalidatable and await self._revalidate(page):
+            self.stats_counts["page_revalidated"] += 1
+            return page.content
+        self.stats_counts["page_misses"] += 1
+        return None
+
+    def stats(self) -> dict:
+        with self._lock:
+            (pages,) = self._conn.execute("SELECT COUNT(*) FROM pages").fetchone()
+            (searches,) = self._conn.execute("SELECT COUNT(*) FROM searches").fetchone()
+        return {"pages": pages, "searches": searches, **self.stats_counts}
+
+    async def stats_async(self) -> dict:
+        return await run_in_executor(self.executor, self.stats)
+
+web_cache = WebCache()
@@ -5,7 +5,8 @@ from alive_progress import alive_bar
 from llama_index.core import Document
 from pymilvus import Collection
 from src.services.embedding_models import bge_embed_model, splade_embed_model
-from typing import List, Tuple
+from src.vector.doc_store import DocStore
+from typing import List, Optional, Tuple
 
 def get_required_data(final_docs: List[Document]) -> Tuple[List[str], List[str], List[str]]:
     all_ids, all_texts, all_sources = [], [], []
@@ -36,9 +37,11 @@ def save_embeddings(data_folder, dense_embeddings_list, sparse_embeddings_list)
     with open(f'{data_folder}/sparse_embeddings.pkl', 'wb') as f:
         pickle.dump(sparse_embeddings_list, f)
 
-def batch_ingestion(collection, final_docs):
+def batch_ingestion(collection, final_docs, doc_store: Optional[DocStore] = None):
     # Get required data
     all_ids, all_texts, all_sources = get_required_data(final_docs)
+    # Keep chunk text locally so searches can skip fetching it from the Vector DB
+    doc_store = doc_store or DocStore()
     # Get dense and sparse embeddings
     dense_embeddings_list, sparse_embeddings_list = get_dense_and_sparse_embeddings(all_texts)
     
@@ -63,6 +66,8 @@ def batch_ingestion(collection, final_docs):
             end = min(start + batch_size, total_elements)
             batch = [sublist[start:end] for sublist in data]
             collection.insert(batch)
+            # only store what the Vector DB accepted, so a failed insert leaves no orphan entries
+            doc_store.add(all_ids[start:end], all_texts[start:end], all_sources[start:end])
             bar()
             
 def drop_indexes(collection: Collection, index_names: List[str]) -> None:
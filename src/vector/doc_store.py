@@ -0,0 +1,148 @@
+import json
+import mmap
+import os
+import threading
+
+from typing import Dict, List, Optional, Tuple
+
+from src.services.cache import LRUCache
+
+DOC_STORE_PATH = os.getenv("DOC_STORE_PATH", os.path.join(os.path.dirname(__file__), "..", "data", "doc_store"))
+DOC_STORE_CACHE_SIZE = int(os.getenv("DOC_STORE_CACHE_SIZE", "1024"))
+
+class DocStore:
+    """
+    Local, memory-mapped store of chunk text keyed by doc_id, written at ingestion time.
+
+    Two files share the `path` prefix:
+    - `<path>.bin`: the UTF-8 chunk texts, concatenated
+    - `<path>.json`: doc_id -> [byte offset, byte length, doc_source]
+
+    Reads go through an in-memory LRU first, then the mmap, so hot chunks never touch the disk.
+    The index file is replaced atomically on every ingestion, and readers reload when its mtime or size changes,
+    so the Chainlit app picks up documents ingested by another process.
+    """
+    def __init__(self, path: str = DOC_STORE_PATH, cache_size: int = DOC_STORE_CACHE_SIZE):
+        self.path = path
+        self.cache = LRUCache(max_size=cache_size, name="Doc Store Cache")
+        self._index: Dict[str, list] = {}
+        self._file = None
+        self._mmap = None
+        self._version: Optional[Tuple[int, int]] = None
+        self._lock = threading.Lock()
+        self.reload()
+
+    @property
+    def data_path(self) -> str:
+        return f"{self.path}.bin"
+
+    @property
+    def index_path(self) -> str:
+        return f"{self.path}.json"
+
+    def _index_version(self) -> Optional[Tuple[int, int]]:
+        try:
+            stat = os.stat(self.index_path)
+        except FileNotFoundError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    def _refresh_if_changed(self) -> None:
+        if self._index_version() != self._version:
+            self.reload()
+
+    def reload(self) -> None:
+        """
+        (Re)opens the store, e.g. after another process ingested new documents
+        """
+        with self._lock:
+            self._close()
+            self.cache.clear()
+            self._index = {}
+            self._version = self._index_version()
+            if self._version is None:
+                return
+            with open(self.index_path) as f:
+                self._index = json.load(f)
+            if os.path.getsize(self.data_path) > 0:
+                self._file = open(self.data_path, "rb")
+                self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def _close(self) -> None:
+        if self._mmap is not None:
+            self._mmap.close()
+            self._mmap = None
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def add(self, doc_ids: List[str], texts: List[str], sources: List[str]) -> None:
+        """
+        Appends documents to the store (ingestion appends to the collection, so the store is appended to as well)
+
+        Args:
+            doc_ids (List[str]): The doc_ids, as inserted into the Vector DB
+            texts (List[str]): The chunk texts
+            sources (List[str]): The chunk sources
+        """
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        # append to the latest index, not a stale copy, in case another process ingested since
+        self._refresh_if_changed()
+        with self._lock:
+            index = dict(self._index)
+            with open(self.data_path, "ab") as f:
+                offset = f.tell()
+                for doc_id, text, source in zip(doc_ids, texts, sources):
+                    data = text.encode("utf-8")
+                    f.write(data)
+                    index[doc_id] = [offset, len(data), source]
+                    offset += len(data)
+
+            # write the index atomically so readers never see a partial file
+            tmp_path = f"{self.index_path}.tmp"
+            with open(tmp_path, "w") as f:
+                json.dump(index, f)
+            os.replace(tmp_path, self.index_path)
+        self.reload()
+
+    def get(self, doc_id: str) -> Optional[Tuple[str, str]]:
+        """
+        Returns (text, doc_source) for a doc_id, or None if it is not in the store
+        """
+        self._refresh_if_changed()
+        return self._get(doc_id)
+
+    def _get(self, doc_id: str) -> Optional[Tuple[str, str]]:
+        cached = self.cache.get(doc_id)
+        if cached is not None:
+            return cached
+
+        with self._lock:
+            entry = self._index.get(doc_id)
+            if entry is None or self._mmap is None:
+                return None
+            offset, length, source = entry
+            text = self._mmap[offset:offset + length].decode("utf-8")
+
+        self.cache.put(doc_id, (text, source))
+        return text, source
+
+    def get_many(self, doc_ids: List[str]) -> Dict[str, Tuple[str, str]]:
+        """
+        Returns {doc_id: (text, doc_source)} for the doc_ids found in the store
+        """
+        self._refresh_if_changed()
+        results = {}
+        for doc_id in doc_ids:
+            document = self._get(doc_id)
+            if document is not None:
+                results[doc_id] = document
+        return results
+
+    def __contains__(self, doc_id: str) -> bool:
+        self._refresh_if_changed()
+        return doc_id in self._index
+
+    def __len__(self) -> int:
+        self._refresh_if_changed()
+        return len(self._index)
@@ -0,0 +1,223 @@
+import os
+import pickle
+
+import numpy as np
+import scipy.sparse as sp
+
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+DENSE_FIELD = "dense_embeddings"
+SPARSE_FIELD = "sparse_embeddings"
+DEFAULT_RRF_K = 60
+
+class LocalHit:
+    """
+    Mirrors the parts of a pymilvus `Hit` used by the retrieval tools: `id`, `distance` and attribute access to output fields.
+    """
+    def __init__(self, id: int, distance: float, fields: Dict[str, Any]):
+        self.id = id
+        self.distance = distance
+        self.fields = fields
+
+    def get(self, field_name: str, default: Optional[Any] = None) -> Any:
+        return self.fields.get(field_name, default)
+
+    def __getattr__(self, field_name: str) -> Any:
+        fields = self.__dict__.get("fields", {})
+        if field_name in fields:
+            return fields[field_name]
+        raise AttributeError(f"Field '{field_name}' was not requested in output_fields")
+
+    def __repr__(self) -> str:
+        return f"LocalHit(id={self.id}, distance={self.distance:.4f})"
+
+class LocalHybridIndex:
+    """
+    In-process, exact hybrid index over the ingested corpus, usable as a drop-in for the Milvus `collection`.
+
+    - Dense: cosine top-k as a single matmul over L2-normalised embeddings
+    - Sparse: inner product over a CSR inverted index (one posting row per vocabulary term)
+    - Fusion: reciprocal rank fusion, matching Milvus' `RRFRanker` (score = sum of 1 / (k + rank), rank starting at 1)
+
+    Note: doc_ids are the llama-index Document ids from `final_docs.pkl`, not the uuids generated at Milvus ingestion.
+    """
+    def __init__(self,
+                 dense_embeddings: Sequence[Sequence[float]],
+                 sparse_embeddings: Any,
+                 doc_ids: List[str],
+                 texts: List[str],
+                 sources: List[str]):
+        dense = np.asarray(np.vstack(dense_embeddings), dtype=np.float32)
+        doc_term = sp.csr_matrix(sparse_embeddings, dtype=np.float32)
+        if not (len(dense) == doc_term.shape[0] == len(doc_ids) == len(texts) == len(sources)):
+            raise ValueError("Dense embeddings, sparse embeddings and documents must have the same length")
+
+        self.dense_embeddings = dense
+        self._normalised_dense = dense / np.clip(np.linalg.norm(dense, axis=1, keepdims=True), 1e-12, None)
+        self._inverted_index = doc_term.T.tocsr()  # (vocab_size, num_docs)
+        self.vocab_size = doc_term.shape[1]
+        self.fields = {
+            "doc_id": doc_ids,
+            "text": texts,
+            "doc_source": sources,
+        }
+
+    @classmethod
+    def from_data_folder(cls, data_folder: str = "notebooks/data") -> "LocalHybridIndex":
+        """
+        Loads the index from the pickles written during ingestion
+
+        Args:
+            data_folder (str): Folder containing `dense_embeddings.pkl`, `sparse_embeddings.pkl` and `final_docs.pkl`
+
+        Returns:
+            LocalHybridIndex: The loaded index
+        """
+        with open(os.path.join(data_folder, "dense_embeddings.pkl"), "rb") as f:
+            dense_embeddings = pickle.load(f)
+        with open(os.path.join(data_folder, "sparse_embeddings.pkl"), "rb") as f:
+            sparse_embeddings = pickle.load(f)
+        with open(os.path.join(data_folder, "final_docs.pkl"), "rb") as f:
+            final_docs = pickle.load(f)
+
+        return cls(
+            dense_embeddings=dense_embeddings,
+            sparse_embeddings=sparse_embeddings,
+            doc_ids=[doc.doc_id for doc in final_docs],
+            texts=[doc.text for doc in final_docs],
+            sources=[doc.metadata.get("source", "NA") for doc in final_docs],
+        )
+
+    @property
+    def num_entities(self) -> int:
+        return len(self.dense_embeddings)
+
+    @staticmethod
+    def _sparse_row(row: Any) -> Tuple[np.ndarray, np.ndarray]:
+        if isinstance(row, dict):
+            return np.fromiter(row.keys(), dtype=np.int64), np.fromiter(row.values(), dtype=np.float32)
+        if not hasattr(row, "indptr"):
+            row = row.tocsr()
+        return row.indices, row.data.astype(np.float32, copy=False)
+
+    def _to_sparse_queries(self, data: Any) -> List[Tuple[np.ndarray, np.ndarray]]:
+        if sp.issparse(data) and data.ndim == 2:
+            data = sp.csr_matrix(data)
+            return [(data.indices[start:end], data.data[start:end]) for start, end in zip(data.indptr[:-1], data.indptr[1:])]
+        return [self._sparse_row(row) for row in data]
+
+    @staticmethod
+    def _drop_small_values(indices: np.ndarray, values: np.ndarray, drop_ratio: float) -> Tuple[np.ndarray, np.ndarray]:
+        # Mirrors Milvus' `drop_ratio_search`: ignore the smallest fraction of the query's non-zero weights
+        num_dropped = int(len(values) * drop_ratio)
+        if num_dropped <= 0:
+            return indices, values
+        keep = np.sort(np.argsort(values, kind="stable")[num_dropped:])
+        return indices[keep], values[keep]
+
+    def _sparse_scores(self, indices: np.ndarray, values: np.ndarray) -> np.ndarray:
+        # Walk the posting lists of the query terms and accumulate term weight * document weight per document
+        starts = self._inverted_index.indptr[indices]
+        lengths = self._inverted_index.indptr[indices + 1] - starts
+        total = int(lengths.sum())
+        if total == 0:
+            return np.zeros(self.num_entities, dtype=np.float32)
+        offsets = np.repeat(starts - np.cumsum(lengths) + lengths, lengths) + np.arange(total)
+        weights = self._inverted_index.data[offsets] * np.repeat(values, lengths)
+        return np.bincount(self._inverted_index.indices[offsets], weights=weights, minlength=self.num_entities)
+
+    @staticmethod
+    def _top_k(scores: np.ndarray, limit: int) -> List[Tuple[np.ndarray, np.ndarray]]:
+        limit = min(limit, scores.shape[1])
+        results = []
+        for row in scores:
+            candidates = np.argpartition(-row, limit - 1)[:limit]
+            ordered = candidates[np.argsort(-row[candidates], kind="stable")]
+            results.append((ordered, row[ordered]))
+        return results
+
+    def dense_search(self, data: Any, limit: int) -> List[Tuple[np.ndarray, np.ndarray]]:
+        """
+        Exact cosine top-k for a batch of dense queries
+
+        Returns:
+            List[Tuple[np.ndarray, np.ndarray]]: (row ids, scores) per query
+        """
+        queries = np.asarray(np.vstack(data), dtype=np.float32)
+        queries = queries / np.clip(np.linalg.norm(queries, axis=1, keepdims=True), 1e-12, None)
+        return self._top_k(queries @ self._normalised_dense.T, limit)
+
+    def sparse_search(self, data: Any, limit: int, drop_ratio_search: float = 0.0) -> List[Tuple[np.ndarray, np.ndarray]]:
+        """
+        Exact inner-product top-k for a batch of sparse queries, via the inverted index
+
+        Returns:
+            List[Tuple[np.ndarray, np.ndarray]]: (row ids, scores) per query. Documents sharing no term with the query are excluded.
+        """
+        queries = [self._drop_small_values(indices, values, drop_ratio_search) for indices, values in self._to_sparse_queries(data)]
+        scores = np.vstack([self._sparse_scores(indices, values) for indices, values in queries])
+        results = []
+        for ids, row_scores in self._top_k(scores, limit):
+            keep = row_scores > 0
+            results.append((ids[keep], row_scores[keep]))
+        return results
+
+    def _field_search(self, data: Any, anns_field: str, param: Optional[dict], limit: int) -> List[Tuple[np.ndarray, np.ndarray]]:
+        params = (param or {}).get("params", {})
+        if anns_field == DENSE_FIELD:
+            return self.dense_search(data, limit)
+        if anns_field == SPARSE_FIELD:
+            return self.sparse_search(data, limit, drop_ratio_search=params.get("drop_ratio_search", 0.0))
+        raise ValueError(f"Unknown anns_field '{anns_field}'")
+
+    def _make_hits(self, ids: Sequence[int], scores: Sequence[float], output_fields: Optional[List[str]]) -> List[LocalHit]:
+        hits = []
+        for row_id, score in zip(ids, scores):
+            fields = {}
+            for field_name in output_fields or []:
+                if field_name == DENSE_FIELD:
+                    fields[field_name] = self.dense_embeddings[row_id]
+                elif field_name in self.fields:
+                    fields[field_name] = self.fields[field_name][row_id]
+            hits.append(LocalHit(id=int(row_id), distance=float(score), fields=fields))
+        return hits
+
+    def search(self, data: Any, anns_field: str, param: Optional[dict], limit: int,
+               output_fields: Optional[List[str]] = None, **kwargs) -> List[List[LocalHit]]:
+        """
+        Single-field search with the same signature as `pymilvus.Collection.search`
+        """
+        return [self._make_hits(ids, scores, output_fields) for ids, scores in self._field_search(data, anns_field, param, limit)]
+
+    def hybrid_search(self, reqs: List[Any], rerank: Any, limit: int,
+                      output_fields: Optional[List[str]] = None, **kwargs) -> List[List[LocalHit]]:
+        """
+        Multi-field search fused with RRF, with the same signature as `pymilvus.Collection.hybrid_search`
+
+        Args:
+            reqs (List[AnnSearchRequest]): One request per vector field; each may hold several queries (nq > 1)
+            rerank (RRFRanker): The ranker; only reciprocal rank fusion is supported
+            limit (int): Number of fused hits per query
+            output_fields (List[str], optional): Fields to attach to each hit
+
+        Returns:
+            List[List[LocalHit]]: The fused hits per query
+        """
+        ranker = rerank.dict() if hasattr(rerank, "dict") else {"strategy": "rrf", "params": {}}
+        if ranker.get("strategy") != "rrf":
+            raise ValueError("LocalHybridIndex only supports RRFRanker")
+        k = ranker.get("params", {}).get("k", DEFAULT_RRF_K)
+
+        per_request = [self._field_search(req.data, req.anns_field, req.param, req.limit) for req in reqs]
+        num_queries = len(per_request[0])
+
+        results = []
+        for query_idx in range(num_queries):
+            fused: Dict[int, float] = {}
+            for request_results in per_request:
+                ids, _ = request_results[query_idx]
+                for rank, row_id in enumerate(ids, start=1):
+                    fused[int(row_id)] = fused.get(int(row_id), 0.0) + 1.0 / (k + rank)
+            ranked = sorted(fused.items(), key=lambda item: item[1], reverse=True)[:limit]
+            results.append(self._make_hits([row_id for row_id, _ in ranked], [score for _, score in ranked], output_fields))
+        return results
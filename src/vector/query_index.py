@@ -1,31 +1,19 @@
-from pymilvus import AnnSearchRequest, RRFRanker
 from services.services import collection
-from services.embedding_models import bge_embed_model, splade_embed_model
+from services.embedding_models import embed_query
+from vector.search_profile import load_search_profile
+
+search_profile = load_search_profile()
 
 def hybrid_search(query: str) -> str:
-    dense_embedding = list(bge_embed_model.query_embed(query))[0]
-    sparse_embedding = list(splade_embed_model.encode_queries([query]))
+    dense_embedding, sparse_embedding = embed_query(query)
     
     search_results = collection.hybrid_search(
-            reqs=[
-                AnnSearchRequest(
-                    data=[dense_embedding],  # content vector embedding
-                    anns_field='dense_embeddings',  # content vector field
-                    param={"metric_type": "COSINE", "params": {"M": 64, "efConstruction": 512}}, # Search parameters
-                    limit=3
-                ),
-                AnnSearchRequest(
-                    data=list(sparse_embedding),  # keyword vector embedding
-                    anns_field='sparse_embeddings',  # keyword vector field
-                    param={"metric_type": "IP", "params": {"drop_ratio_build": 0.2}}, # Search parameters
-                    limit=3
-                )
-            ],
+            reqs=search_profile.requests([dense_embedding], [sparse_embedding]),
             output_fields=['doc_id', 'text', 'doc_source'],
             # Use WeightedRanker to combine results with specified weights
             # Alternatively, use RRFRanker for reciprocal rank fusion reranking
-            rerank=RRFRanker(),
-            limit=3
+            rerank=search_profile.ranker(),
+            limit=search_profile.limit
             )
     
     hits = search_results[0]
@@ -0,0 +1,92 @@
+import json
+import os
+
+from dataclasses import asdict, dataclass, fields
+from pymilvus import AnnSearchRequest, RRFRanker
+from typing import List, Optional
+
+SEARCH_PROFILES_PATH = os.getenv("SEARCH_PROFILES_PATH", os.path.join(os.path.dirname(__file__), "search_profiles.json"))
+SEARCH_PROFILE = os.getenv("SEARCH_PROFILE", "default")
+
+@dataclass
+class SearchProfile:
+    """
+    Search-time parameters for the hybrid search, as tuned by `src/benchmarks/bench_hybrid_search.py`.
+
+    Attributes:
+        name (str): The profile name
+        dense_ef (int): HNSW `ef` for the dense request (must be >= dense_limit)
+        dense_limit (int): Candidates returned by the dense request
+        sparse_drop_ratio (float): `drop_ratio_search` for the sparse request
+        sparse_limit (int): Candidates returned by the sparse request
+        rrf_k (int): The RRF smoothing constant
+        limit (int): Fused hits returned per query
+    """
+    name: str = "default"
+    dense_ef: int = 64
+    dense_limit: int = 3
+    sparse_drop_ratio: float = 0.2
+    sparse_limit: int = 3
+    rrf_k: int = 60
+    limit: int = 3
+
+    def dense_request(self, data: list) -> AnnSearchRequest:
+        return AnnSearchRequest(
+            data=data,  # content vector embedding
+            anns_field='dense_embeddings',  # content vector field
+            param={"metric_type": "COSINE", "params": {"ef": max(self.dense_ef, self.dense_limit)}}, # Search parameters
+            limit=self.dense_limit
+        )
+
+    def sparse_request(self, data: list) -> AnnSearchRequest:
+        return AnnSearchRequest(
+            data=data,  # keyword vector embedding
+            anns_field='sparse_embeddings',  # keyword vector field
+            param={"metric_type": "IP", "params": {"drop_ratio_search": self.sparse_drop_ratio}}, # Search parameters
+            limit=self.sparse_limit
+        )
+
+    def requests(self, dense_data: list, sparse_data: list) -> List[AnnSearchRequest]:
+        return [self.dense_request(dense_data), self.sparse_request(sparse_data)]
+
+    def ranker(self) -> RRFRanker:
+        return RRFRanker(k=self.rrf_k)
+
+def load_search_profiles(path: str = SEARCH_PROFILES_PATH) -> dict:
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return json.load(f)
+
+def load_search_profile(name: Optional[str] = None, path: str = SEARCH_PROFILES_PATH) -> SearchProfile:
+    """
+    Loads a named search profile, falling back to the built-in defaults
+
+    Args:
+        name (str, optional): The profile name. Defaults to the SEARCH_PROFILE env variable.
+        path (str): The JSON file holding the profiles
+
+    Returns:
+        SearchProfile: The search profile
+    """
+    name = name or SEARCH_PROFILE
+    profiles = load_search_profiles(path)
+    if name not in profiles:
+        print(f"Search profile '{name}' not found in {path}, using defaults")
+        return SearchProfile(name=name)
+
+    known = {field.name for field in fields(SearchProfile)}
+    values = {key: value for key, value in profiles[name].items() if key in known}
+    values["name"] = name
+    return SearchProfile(**values)
+
+def save_search_profile(profile: SearchProfile, path: str = SEARCH_PROFILES_PATH) -> None:
+    """
+    Adds or replaces a profile in the profiles file
+    """
+    profiles = load_search_profiles(path)
+    values = asdict(profile)
+    values.pop("name")
+    profiles[profile.name] = values
+    with open(path, "w") as f:
+        json.dump(profiles, f, indent=4)
@@ -0,0 +1,46 @@
+import time
+
+from src.chatbot import budget
+from src.chatbot.budget import (BUDGET_LLM_CALLS, BUDGET_TOKENS, MAX_REFINE_ITERATIONS, REFINE_LLM_CALLS,
+                                charge_llm_call, exhausted_reason, format_budget, merge_budget, new_budget)
+
+def test_merge_budget_adds_up_counters_and_keeps_the_first_start():
+    start = new_budget()
+    merged = merge_budget(start, {"llm_calls": 1, "tokens": 200})
+    merged = merge_budget(merged, {"llm_calls": 1, "tokens": 50, "iterations": 1, "started_at": start["started_at"] + 30})
+    assert merged == {"started_at": start["started_at"], "llm_calls": 2, "tokens": 250, "iterations": 1}
+
+def test_merge_budget_from_an_empty_state():
+    merged = merge_budget(None, {"llm_calls": 1})
+    assert (merged["llm_calls"], merged["tokens"], merged["iterations"]) == (1, 0, 0)
+    assert merged["started_at"] <= time.time()
+
+def test_charge_llm_call_estimates_tokens_from_inputs_and_output():
+    assert charge_llm_call("a" * 400, "b" * 40) == {"llm_calls": 1, "tokens": 110}
+    assert charge_llm_call("", {"query": "q"})["tokens"] == 1 + 3
+
+def test_fresh_budget_allows_a_refinement():
+    assert exhausted_reason(new_budget()) is None
+
+def test_exhausted_on_iterations():
+    assert exhausted_reason({**new_budget(), "iterations": MAX_REFINE_ITERATIONS}) == f"{MAX_REFINE_ITERATIONS} refine iterations"
+
+def test_exhausted_on_time(monkeypatch):
+    monkeypatch.setattr(budget, "BUDGET_SECONDS", 10.0)
+    assert exhausted_reason({**new_budget(), "started_at": time.time() - 11}) == "10s time budget"
+
+def test_exhausted_when_the_next_refinement_needs_more_llm_calls_than_are_left():
+    fits = {**new_budget(), "llm_calls": BUDGET_LLM_CALLS - REFINE_LLM_CALLS}
+    assert exhausted_reason(fits) is None
+    assert exhausted_reason({**fits, "llm_calls": fits["llm_calls"] + 1}) == f"{BUDGET_LLM_CALLS} LLM calls"
+
+def test_exhausted_on_tokens():
+    assert exhausted_reason({**new_budget(), "tokens": BUDGET_TOKENS}) == f"{BUDGET_TOKENS} tokens"
+
+def test_format_budget(monkeypatch):
+    monkeypatch.setattr(budget, "BUDGET_SECONDS", 90.0)
+    monkeypatch.setattr(budget, "BUDGET_LLM_CALLS", 8)
+    monkeypatch.setattr(budget, "BUDGET_TOKENS", 40000)
+    monkeypatch.setattr(budget, "MAX_REFINE_ITERATIONS", 2)
+    consumed = {"started_at": time.time(), "llm_calls": 3, "tokens": 1200, "iterations": 1}
+    assert format_budget(consumed) == "0.0s / 90s, 3 / 8 LLM calls, ~1200 / 40000 tokens, 1 / 2 refine iterations"
@@ -0,0 +1,71 @@
+import pytest
+
+import time
+
+from src.services.cache import LRUCache, PersistentEmbeddingCache
+
+def test_lru_cache_evicts_least_recently_used():
+    cache = LRUCache(max_size=2)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    assert cache.get("a") == 1  # "b" is now the least recently used
+    cache.put("c", 3)
+    assert "b" not in cache
+    assert cache.get("a") == 1 and cache.get("c") == 3
+    assert len(cache) == 2
+
+def test_lru_cache_put_refreshes_existing_key():
+    cache = LRUCache(max_size=2)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    cache.put("a", 10)
+    cache.put("c", 3)
+    assert cache.get("a") == 10
+    assert "b" not in cache
+
+def test_lru_cache_counts_hits_and_misses():
+    cache = LRUCache(max_size=4)
+    cache.put("a", 1)
+    cache.get("a")
+    assert cache.get("missing", default="fallback") == "fallback"
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["hit_rate"]) == (1, 1, 0.5)
+
+    cache.clear()
+    assert len(cache) == 0
+    assert cache.stats()["hits"] == 0
+
+def test_lru_cache_rejects_non_positive_size():
+    with pytest.raises(ValueError):
+        LRUCache(max_size=0)
+
+def test_persistent_cache_round_trip_and_persistence(tmp_path):
+    path = str(tmp_path / "embeddings.sqlite")
+    cache = PersistentEmbeddingCache(path)
+    cache.put_many("model:text", ["a", "b"], [[0.5, 1.0], [2.0, -1.5]])
+
+    assert cache.get_many("model:text", ["a", "missing", "b"]) == [[0.5, 1.0], None, [2.0, -1.5]]
+    # entries are keyed by model as well as text
+    assert cache.get_many("model:query", ["a"]) == [None]
+    assert (cache.stats()["hits"], cache.stats()["misses"]) == (2, 2)
+
+    assert PersistentEmbeddingCache(path).get_many("model:text", ["b"]) == [[2.0, -1.5]]
+
+def test_persistent_cache_evicts_least_recently_accessed(tmp_path):
+    cache = PersistentEmbeddingCache(str(tmp_path / "embeddings.sqlite"), max_entries=2)
+    cache.put_many("model", ["a"], [[1.0]])
+    time.sleep(0.01)
+    cache.put_many("model", ["b"], [[2.0]])
+    time.sleep(0.01)
+    cache.get_many("model", ["a"])  # "b" is now the least recently accessed
+    time.sleep(0.01)
+    cache.put_many("model", ["c"], [[3.0]])
+
+    assert cache.get_many("model", ["a", "b", "c"]) == [[1.0], None, [3.0]]
+    assert cache.stats()["size"] == 2
+
+def test_persistent_cache_batches_large_lookups(tmp_path):
+    cache = PersistentEmbeddingCache(str(tmp_path / "embeddings.sqlite"))
+    texts = [f"text {i}" for i in range(1200)]
+    cache.put_many("model", texts, [[float(i)] for i in range(1200)])
+    assert cache.get_many("model", texts) == [[float(i)] for i in range(1200)]
@@ -0,0 +1,32 @@
+import pytest
+
+import src.chatbot.cleaning as cleaning
+from src.benchmarks.bench_html_cleaning import DEFAULT_CORPUS, legacy_clean_content, load_corpus
+
+PAGES = load_corpus(DEFAULT_CORPUS)
+
+@pytest.fixture(params=["lxml", "html.parser"])
+def parser(request, monkeypatch):
+    monkeypatch.setattr(cleaning, "CLEANING_PARSER", request.param)
+    return request.param
+
+@pytest.mark.parametrize("page", PAGES, ids=[f"page-{i}" for i in range(len(PAGES))])
+def test_clean_content_matches_the_original_implementation(parser, page):
+    assert cleaning.clean_content(page) == legacy_clean_content(page)
+
+def test_corpus_exercises_both_markup_and_plain_markdown():
+    assert any("<" not in page and "&" not in page for page in PAGES)
+    assert any("<html" in page for page in PAGES)
+
+def test_clean_content_removes_boilerplate_urls_and_emails(parser):
+    page = ("<nav>Home</nav><p>Store insulin in the fridge, see https://example.org/insulin or "
+            "email help@example.org. Privacy Policy</p><footer>All rights reserved</footer>")
+    assert cleaning.clean_content(page) == "Store insulin in the fridge, see or email"
+
+def test_clean_content_drops_pages_of_three_words_or_fewer(parser):
+    assert cleaning.clean_content("<p>Loading&hellip;</p><p>Log in</p>") == ""
+
+def test_clean_page_truncates_to_max_words():
+    page = " ".join(f"word{i}" for i in range(20))
+    assert cleaning.clean_page(page, max_words=5) == "word0 word1 word2 word3 word4..."
+    assert cleaning.clean_page(page, max_words=50) == page
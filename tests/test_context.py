@@ -0,0 +1,87 @@
+from src.chatbot.context import (
+    KG_PREAMBLE, assemble_context, bm25_scores, deduplicate, estimate_tokens, format_passage,
+    make_passage, mmr_select, normalised_relevance, passages_from_kg_context, select_web_passages, split_passages
+)
+
+def test_deduplicate_drops_contained_passages_and_keeps_the_first():
+    full = make_passage("Metformin lowers the amount of glucose released by the liver into the blood.", origin="vector")
+    contained = make_passage("Metformin lowers the amount of glucose released by the liver.", origin="kg")
+    other = make_passage("Insulin should be stored in the fridge before it is opened.", origin="kg")
+    assert deduplicate([full, contained, other]) == [full, other]
+
+def test_passages_from_kg_context_drops_the_preamble_and_repeated_triplets():
+    kg_context = (f"{KG_PREAMBLE}\nmetformin -> treats -> diabetes\ninsulin -> lowers -> glucose\n\n"
+                  f"{KG_PREAMBLE}\nmetformin -> treats -> diabetes\nmetformin -> causes -> nausea")
+    passages = passages_from_kg_context(kg_context)
+    assert [passage["text"] for passage in passages] == [
+        "metformin -> treats -> diabetes\ninsulin -> lowers -> glucose",
+        "metformin -> causes -> nausea",
+    ]
+    assert all(passage["origin"] == "kg" for passage in passages)
+
+def test_normalised_relevance_is_per_origin_with_rank_fallback():
+    passages = [
+        make_passage("a", origin="vector", relevance=0.9),
+        make_passage("b", origin="vector", relevance=0.5),
+        make_passage("c", origin="kg"),
+        make_passage("d", origin="kg"),
+    ]
+    assert normalised_relevance(passages) == [1.0, 0.0, 1.0, 0.0]
+
+def test_mmr_prefers_a_diverse_passage_over_a_redundant_one():
+    passages = [
+        make_passage("first", origin="vector", relevance=1.0, embedding=[1.0, 0.0]),
+        make_passage("near copy", origin="vector", relevance=0.9, embedding=[0.99, 0.1]),
+        make_passage("different", origin="vector", relevance=0.8, embedding=[0.0, 1.0]),
+    ]
+    selected = mmr_select(passages, token_budget=1000, mmr_lambda=0.5)
+    assert [passage["text"] for passage in selected] == ["first", "different", "near copy"]
+
+def test_mmr_respects_the_token_budget():
+    passages = [make_passage(f"passage {i} " + "word " * 40, origin="vector", relevance=1.0 - i / 10) for i in range(5)]
+    budget = 2 * estimate_tokens(format_passage(passages[0]))
+    selected = mmr_select(passages, token_budget=budget)
+    assert len(selected) == 2
+    assert sum(estimate_tokens(format_passage(passage)) for passage in selected) <= budget
+
+def test_assemble_context_formats_sources_and_dedups_across_origins():
+    db_passages = [make_passage("Metformin lowers the amount of glucose released by the liver into the blood.",
+                                origin="vector", source="medicines.pdf", relevance=0.9)]
+    kg_context = "Metformin lowers the amount of glucose released by the liver."
+    assert assemble_context(db_passages, kg_context) == \
+        "Source: medicines.pdf\nContext: Metformin lowers the amount of glucose released by the liver into the blood."
+
+def test_split_passages_keeps_whole_sentences_under_the_word_limit():
+    text = "One two three. Four five six. Seven eight nine ten eleven twelve."
+    assert split_passages(text, max_words=6) == ["One two three. Four five six.", "Seven eight nine ten eleven twelve."]
+    assert split_passages("a b c d e f g", max_words=3) == ["a b c", "d e f", "g"]
+
+def test_bm25_ranks_term_matches_and_rare_terms_higher():
+    passages = [
+        "insulin storage in the fridge keeps insulin effective",
+        "exercise helps blood glucose control",
+        "store insulin pens at room temperature once opened",
+    ]
+    scores = bm25_scores("how to store insulin in the fridge", passages)
+    assert scores[1] == 0.0
+    assert scores[0] > scores[2] > 0.0
+    assert bm25_scores("anything", []) == []
+
+def sentence(words: str, length: int = 50) -> str:
+    # sentences of 50 words, so each one becomes its own passage under the default WEB_PASSAGE_WORDS
+    words = words.split()
+    return " ".join(words[i % len(words)] for i in range(length)) + "."
+
+def test_select_web_passages_keeps_the_relevant_passages_in_page_order():
+    insulin_a, cats = sentence("insulin should be kept in the fridge"), sentence("cats like to sleep in the sun")
+    dogs, insulin_b = sentence("dogs enjoy long walks in the park"), sentence("opened insulin pens can stay at room temperature")
+    pages = {"https://a.example": f"{insulin_a} {cats}", "https://b.example": f"{dogs} {insulin_b}"}
+
+    selection = select_web_passages("where should insulin be kept", pages,
+                                    token_budget=estimate_tokens(insulin_a) + estimate_tokens(insulin_b))
+    assert selection == [("https://a.example", [insulin_a]), ("https://b.example", [insulin_b])]
+
+def test_select_web_passages_falls_back_to_leading_passages_without_overlap():
+    first, second = sentence("first passage of the page"), sentence("second passage of the page")
+    selection = select_web_passages("zzz", {"https://a.example": f"{first} {second}"}, token_budget=estimate_tokens(first))
+    assert selection == [("https://a.example", [first])]
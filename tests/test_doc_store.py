@@ -0,0 +1,37 @@
+from src.vector.doc_store import DocStore
+
+def test_doc_store_round_trip(tmp_path):
+    store = DocStore(str(tmp_path / "doc_store"))
+    store.add(["a", "b"], ["alpha", "bêta ünïcode"], ["one.pdf", "two.pdf"])
+
+    assert store.get("b") == ("bêta ünïcode", "two.pdf")
+    assert store.get_many(["a", "missing"]) == {"a": ("alpha", "one.pdf")}
+    assert "a" in store and "missing" not in store
+    assert len(store) == 2
+
+def test_doc_store_appends_across_ingestions(tmp_path):
+    store = DocStore(str(tmp_path / "doc_store"))
+    store.add(["a"], ["alpha"], ["one.pdf"])
+    store.add(["b"], ["beta"], ["two.pdf"])
+    assert store.get_many(["a", "b"]) == {"a": ("alpha", "one.pdf"), "b": ("beta", "two.pdf")}
+
+def test_doc_store_reopens_from_disk(tmp_path):
+    DocStore(str(tmp_path / "doc_store")).add(["a"], ["alpha"], ["one.pdf"])
+    assert DocStore(str(tmp_path / "doc_store")).get("a") == ("alpha", "one.pdf")
+
+def test_reader_sees_documents_ingested_by_another_writer(tmp_path):
+    path = str(tmp_path / "doc_store")
+    reader, writer = DocStore(path), DocStore(path)
+    assert reader.get_many(["a"]) == {}
+
+    writer.add(["a"], ["alpha"], ["one.pdf"])
+    assert reader.get_many(["a"]) == {"a": ("alpha", "one.pdf")}
+
+    # the other writer appends to the latest index rather than its stale copy
+    reader.add(["b"], ["beta"], ["two.pdf"])
+    assert writer.get_many(["a", "b"]) == {"a": ("alpha", "one.pdf"), "b": ("beta", "two.pdf")}
+
+def test_missing_store_is_empty(tmp_path):
+    store = DocStore(str(tmp_path / "doc_store"))
+    assert len(store) == 0
+    assert store.get("a") is None
@@ -0,0 +1,28 @@
+import copy
+
+import pytest
+
+try:
+    from src.chatbot.agents import decide_fast_path_agent
+    from src.chatbot.input import BASE_INPUTS
+except Exception as e:  # the agents module connects to the LLM, vector DB and graph services on import
+    pytest.skip(f"agents unavailable: {e}", allow_module_level=True)
+
+GOOD_METRICS = {"relevance": 10, "completeness": 10, "coherence": 10, "correctness": 10}
+
+def fast_path_state(fast_path: str, metrics: dict) -> dict:
+    return {**copy.deepcopy(BASE_INPUTS), "metrics": metrics, "grade_source": "self", "fast_path": fast_path}
+
+def test_escalated_self_grade_goes_to_the_grader():
+    assert decide_fast_path_agent(fast_path_state("escalated", GOOD_METRICS)) == "borderline"
+
+def test_settled_self_grade_routes_on_its_scores():
+    assert decide_fast_path_agent(fast_path_state("settled", GOOD_METRICS)) == "good"
+    assert decide_fast_path_agent(fast_path_state("settled", {**GOOD_METRICS, "correctness": 2})) == "not good enough"
+
+def test_router_does_not_change_the_state():
+    state = fast_path_state("escalated", GOOD_METRICS)
+    before = copy.deepcopy(state)
+    decide_fast_path_agent(state)
+    decide_fast_path_agent(state)
+    assert state == before
@@ -0,0 +1,81 @@
+import asyncio
+
+import pytest
+
+from src.chatbot.grading import GRADE_THRESHOLD, is_decided, parse_scores
+
+FULL_GRADE = ('{"evaluation": {"relevance": 9, "completeness": 8, "coherence": 9, "correctness": 10}, '
+              '"reasoning": {"relevance": "On topic.", "completeness": "Covers the main medicines.", '
+              '"coherence": "Well structured.", "correctness": "Matches the context."}}')
+
+@pytest.mark.parametrize("cut, expected", [
+    ('{"evaluation": {"relev', {}),
+    ('{"evaluation": {"relevance": 9', {}),  # the number may still be growing
+    ('{"evaluation": {"relevance": 9,', {"relevance": 9}),
+    ('{"evaluation": {"relevance": 9, "completeness": 8, "coherence": 9, "correctness": 10}',
+     {"relevance": 9, "completeness": 8, "coherence": 9, "correctness": 10}),
+])
+def test_parse_scores_reads_complete_scores_from_partial_json(cut, expected):
+    assert parse_scores(cut) == expected
+
+def test_parse_scores_ignores_reasoning_and_keeps_the_first_score():
+    assert parse_scores(FULL_GRADE) == {"relevance": 9, "completeness": 8, "coherence": 9, "correctness": 10}
+    assert parse_scores('{"evaluation": {"relevance": 3}, "reasoning": {"relevance": "Relevance: 9, mostly"}}') == {"relevance": 3}
+
+def test_is_decided_on_a_failing_score_or_all_scores():
+    assert not is_decided({})
+    assert not is_decided({"relevance": 9, "completeness": 8})
+    assert is_decided({"relevance": 9, "completeness": GRADE_THRESHOLD})
+    assert is_decided(parse_scores(FULL_GRADE))
+
+def test_grader_decides_as_soon_as_a_prefix_fails():
+    prefixes = [FULL_GRADE.replace('"completeness": 8', '"completeness": 4')[:end] for end in range(len(FULL_GRADE))]
+    decided_at = next(end for end, prefix in enumerate(prefixes) if is_decided(parse_scores(prefix)))
+    assert prefixes[decided_at].endswith('"completeness": 4,')
+
+def test_tool_config_injection_keeps_config_out_of_the_schema():
+    # the contract GradeAnswerTool relies on: `func` without config, `coroutine` with an injected `config: RunnableConfig`
+    pytest.importorskip("langchain_core")
+    from langchain_core.runnables import RunnableConfig
+    from langchain_core.tools import StructuredTool
+
+    def func(query: str, answer: str) -> dict:
+        return {}
+
+    async def coroutine(query: str, answer: str, config: RunnableConfig) -> dict:
+        return config["configurable"]
+
+    tool = StructuredTool.from_function(func=func, coroutine=coroutine, name="Answer Grader", description="Grades")
+    assert set(tool.args) == {"query", "answer"}
+    result = asyncio.run(tool.ainvoke({"query": "q", "answer": "a"}, config={"configurable": {"on_grader_reasons": "cb"}}))
+    assert result["on_grader_reasons"] == "cb"
+
+def test_grade_answer_tool_hands_the_reasoning_to_the_configured_callback():
+    try:
+        from langchain_core.runnables import RunnableGenerator
+        from src.chatbot.tools import GradeAnswerTool
+    except Exception as e:  # the tools module connects to the LLM, vector DB and graph services on import
+        pytest.skip(f"tools unavailable: {e}")
+
+    async def stream(_):
+        for start in range(0, len(FULL_GRADE), 16):
+            yield FULL_GRADE[start:start + 16]
+
+    async def run():
+        grader = GradeAnswerTool()
+        grader.stream_chain = RunnableGenerator(stream)
+        received = asyncio.Event()
+        reasons = {}
+
+        async def on_grader_reasons(result):
+            reasons.update(result)
+            received.set()
+
+        grade = await grader.get_tool().ainvoke({"query": "q", "answer": "a"},
+                                                config={"configurable": {"on_grader_reasons": on_grader_reasons}})
+        await asyncio.wait_for(received.wait(), timeout=5)
+        return grade, reasons
+
+    grade, reasons = asyncio.run(run())
+    assert grade["evaluation"] == {"relevance": 9, "completeness": 8, "coherence": 9, "correctness": 10}
+    assert reasons["reasoning"]["completeness"] == "Covers the main medicines."
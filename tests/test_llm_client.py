@@ -0,0 +1,219 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from src.services import llm_client as llm_client_module
+from src.services.llm_client import AdaptiveLimiter, CircuitBreaker, CircuitOpenError, LLMClient, TokenBucket
+
+class OverloadedError(Exception):
+    def __str__(self):
+        return "Error code: 529 - {'type': 'error', 'error': {'type': 'overloaded_error'}}"
+
+class FakeChain:
+    """
+    Answers `invoke`/`ainvoke` with the queued outcomes, raising the exceptions among them
+    """
+    def __init__(self, *outcomes):
+        self.outcomes = list(outcomes)
+        self.calls = 0
+
+    def _next(self):
+        self.calls += 1
+        outcome = self.outcomes.pop(0)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+    def invoke(self, inputs, **kwargs):
+        return self._next()
+
+    async def ainvoke(self, inputs, **kwargs):
+        return self._next()
+
+@pytest.fixture(autouse=True)
+def no_backoff(monkeypatch):
+    monkeypatch.setattr(llm_client_module, "backoff_delay", lambda attempt: 0.0)
+
+# TokenBucket
+
+def test_token_bucket_allows_a_burst_then_paces_at_the_rate():
+    bucket = TokenBucket(rate=20, capacity=3)
+    start = time.monotonic()
+    for _ in range(3):
+        bucket.acquire_sync()
+    assert time.monotonic() - start < 0.03
+    bucket.acquire_sync()
+    bucket.acquire_sync()
+    assert time.monotonic() - start == pytest.approx(2 / 20, abs=0.04)
+
+def test_token_bucket_is_shared_by_sync_and_async_callers():
+    bucket = TokenBucket(rate=20, capacity=2)
+
+    async def run():
+        await bucket.acquire()
+        await asyncio.to_thread(bucket.acquire_sync)
+        start = time.monotonic()
+        await bucket.acquire()
+        return time.monotonic() - start
+
+    assert asyncio.run(run()) == pytest.approx(1 / 20, abs=0.03)
+
+def test_cancelled_waiter_returns_its_token():
+    bucket = TokenBucket(rate=1, capacity=1)
+
+    async def run():
+        await bucket.acquire()
+        waiter = asyncio.create_task(bucket.acquire())
+        await asyncio.sleep(0.01)
+        waiter.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+
+    asyncio.run(run())
+    assert bucket.tokens > -0.5
+
+# CircuitBreaker
+
+def test_breaker_opens_after_consecutive_overloads():
+    breaker = CircuitBreaker(threshold=2, cooldown=60)
+    breaker.record_overload()
+    breaker.check()
+    breaker.record_overload()
+    assert breaker.state == "open" and breaker.opened == 1
+    with pytest.raises(CircuitOpenError):
+        breaker.check()
+
+def test_success_resets_the_overload_count():
+    breaker = CircuitBreaker(threshold=2, cooldown=60)
+    breaker.record_overload()
+    breaker.record_success()
+    breaker.record_overload()
+    assert breaker.state == "closed"
+
+def test_half_open_probe_closes_or_reopens():
+    breaker = CircuitBreaker(threshold=1, cooldown=0)
+    breaker.record_overload()
+    breaker.check()
+    assert breaker.state == "half_open"
+    breaker.record_success()
+    assert breaker.state == "closed"
+
+    breaker.record_overload()
+    breaker.check()
+    breaker.record_overload()
+    assert breaker.state == "open" and breaker.opened == 3
+
+def test_neutral_probe_lets_another_probe_through():
+    breaker = CircuitBreaker(threshold=1, cooldown=60)
+    breaker.record_overload()
+    breaker.state, breaker.opened_at = "half_open", time.monotonic()
+    breaker.record_neutral()
+    assert breaker.state == "open"
+    breaker.check()
+    assert breaker.state == "half_open"
+
+# AdaptiveLimiter
+
+def test_limiter_halves_on_overload_and_grows_back_on_success():
+    limiter = AdaptiveLimiter(max_limit=8, min_limit=1)
+    for _ in range(4):
+        limiter.acquire_sync()
+        limiter.release(overloaded=True)
+    assert limiter.limit == 1
+    limiter.acquire_sync()
+    limiter.release(succeeded=True)
+    assert limiter.limit == 2
+    limiter.acquire_sync()
+    limiter.release(succeeded=True)
+    assert limiter.limit == 2.5
+    assert limiter.in_flight == 0
+
+def test_sync_caller_waits_for_a_slot_held_by_an_async_caller():
+    limiter = AdaptiveLimiter(max_limit=1)
+    acquired = threading.Event()
+
+    async def run():
+        await limiter.acquire()
+        thread = threading.Thread(target=lambda: (limiter.acquire_sync(), acquired.set()))
+        thread.start()
+        await asyncio.sleep(0.05)
+        assert not acquired.is_set()
+        limiter.release(succeeded=True)
+        await asyncio.to_thread(thread.join, 1)
+
+    asyncio.run(run())
+    assert acquired.is_set() and limiter.in_flight == 1
+
+def test_async_caller_waits_for_a_slot_held_by_a_sync_caller():
+    limiter = AdaptiveLimiter(max_limit=1)
+
+    async def run():
+        limiter.acquire_sync()
+        waiter = asyncio.create_task(limiter.acquire())
+        await asyncio.sleep(0.05)
+        assert not waiter.done()
+        threading.Thread(target=limiter.release).start()
+        await asyncio.wait_for(waiter, timeout=1)
+
+    asyncio.run(run())
+    assert limiter.in_flight == 1
+
+# LLMClient
+
+def test_call_sync_is_admitted_by_the_bucket_and_limiter():
+    client = LLMClient(bucket=TokenBucket(rate=20, capacity=1), limiter=AdaptiveLimiter(max_limit=4))
+    chain = FakeChain("a", "b")
+    start = time.monotonic()
+    assert [client.call_sync(chain, {}), client.call_sync(chain, {})] == ["a", "b"]
+    # the second call waited for a token
+    assert time.monotonic() - start == pytest.approx(1 / 20, abs=0.03)
+    assert client.stats()["calls"] == 2 and client.limiter.in_flight == 0
+    assert client.limiter.limit == 4
+
+def test_call_sync_retries_overloads_and_shrinks_the_limit():
+    client = LLMClient(max_attempts=3, limiter=AdaptiveLimiter(max_limit=8))
+    assert client.call_sync(FakeChain(OverloadedError(), "ok"), {}) == "ok"
+    stats = client.stats()
+    assert (stats["calls"], stats["retries"], stats["overloads"]) == (2, 1, 1)
+    assert 4 <= stats["concurrency_limit"] < 8
+
+def test_call_sync_sheds_while_the_breaker_is_open():
+    client = LLMClient(breaker=CircuitBreaker(threshold=1, cooldown=60))
+    client.breaker.record_overload()
+    chain = FakeChain("unused")
+    with pytest.raises(CircuitOpenError):
+        client.call_sync(chain, {})
+    assert chain.calls == 0 and client.stats()["shed"] == 1
+
+def test_call_sync_does_not_retry_other_errors():
+    client = LLMClient()
+    with pytest.raises(ValueError):
+        client.call_sync(FakeChain(ValueError("bad prompt"), "unused"), {})
+    assert client.stats()["failures"] == 1 and client.limiter.in_flight == 0
+
+def test_async_and_sync_calls_share_the_concurrency_limit():
+    client = LLMClient(bucket=TokenBucket(rate=1000, capacity=100), limiter=AdaptiveLimiter(max_limit=2))
+    peak = 0
+
+    class SlowChain:
+        def invoke(self, inputs, **kwargs):
+            nonlocal peak
+            peak = max(peak, client.limiter.in_flight)
+            time.sleep(0.02)
+            return "sync"
+
+        async def ainvoke(self, inputs, **kwargs):
+            nonlocal peak
+            peak = max(peak, client.limiter.in_flight)
+            await asyncio.sleep(0.02)
+            return "async"
+
+    async def run():
+        calls = [client.call(SlowChain(), {}) for _ in range(3)]
+        calls += [asyncio.to_thread(client.call_sync, SlowChain(), {}) for _ in range(3)]
+        return await asyncio.gather(*calls)
+
+    assert sorted(asyncio.run(run())) == ["async"] * 3 + ["sync"] * 3
+    assert peak <= 2 and client.limiter.in_flight == 0
@@ -0,0 +1,81 @@
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+import scipy.sparse as sp
+
+from src.vector.local_index import DEFAULT_RRF_K, LocalHybridIndex
+
+def make_index(num_docs: int = 20, dim: int = 8, vocab_size: int = 30, seed: int = 0):
+    rng = np.random.default_rng(seed)
+    dense = rng.normal(size=(num_docs, dim)).astype(np.float32)
+    sparse = sp.random(num_docs, vocab_size, density=0.2, random_state=seed, format="csr", dtype=np.float32)
+    index = LocalHybridIndex(
+        dense_embeddings=dense,
+        sparse_embeddings=sparse,
+        doc_ids=[f"doc-{i}" for i in range(num_docs)],
+        texts=[f"text {i}" for i in range(num_docs)],
+        sources=[f"source {i}" for i in range(num_docs)],
+    )
+    return index, dense, sparse.toarray(), rng
+
+def test_dense_search_matches_brute_force_cosine():
+    index, dense, _, rng = make_index()
+    queries = rng.normal(size=(3, dense.shape[1])).astype(np.float32)
+    expected = (queries / np.linalg.norm(queries, axis=1, keepdims=True)) @ (dense / np.linalg.norm(dense, axis=1, keepdims=True)).T
+
+    for (ids, scores), row in zip(index.dense_search(queries, limit=5), expected):
+        assert list(ids) == list(np.argsort(-row, kind="stable")[:5])
+        np.testing.assert_allclose(scores, row[ids], rtol=1e-5)
+
+def test_sparse_search_matches_inner_product_and_skips_unrelated_docs():
+    index, _, doc_term, _ = make_index()
+    query = {0: 0.5, 3: 1.0, 7: 2.0}
+    row = np.zeros(doc_term.shape[1], dtype=np.float32)
+    for term, weight in query.items():
+        row[term] = weight
+    expected = doc_term @ row
+
+    ids, scores = index.sparse_search([query], limit=10)[0]
+    assert set(ids) == set(np.flatnonzero(expected)[np.argsort(-expected[np.flatnonzero(expected)])][:10])
+    np.testing.assert_allclose(scores, expected[ids], rtol=1e-5)
+    assert (scores > 0).all()
+
+def test_sparse_search_accepts_csr_queries():
+    index, _, _, _ = make_index()
+    query = sp.csr_matrix(([1.0, 2.0], ([0, 0], [3, 7])), shape=(1, index.vocab_size), dtype=np.float32)
+    ids, scores = index.sparse_search(query, limit=10)[0]
+    ids_dict, scores_dict = index.sparse_search([{3: 1.0, 7: 2.0}], limit=10)[0]
+    assert list(ids) == list(ids_dict)
+    np.testing.assert_allclose(scores, scores_dict)
+
+def test_drop_small_values_ignores_the_smallest_weights():
+    indices, values = np.array([1, 2, 3, 4]), np.array([0.4, 0.1, 0.3, 0.2], dtype=np.float32)
+    kept_indices, kept_values = LocalHybridIndex._drop_small_values(indices, values, drop_ratio=0.5)
+    assert list(kept_indices) == [1, 3]
+    np.testing.assert_allclose(kept_values, [0.4, 0.3])
+
+def test_hybrid_search_fuses_with_reciprocal_rank_fusion():
+    index, dense, _, rng = make_index()
+    dense_query = rng.normal(size=(1, dense.shape[1])).astype(np.float32)
+    sparse_query = [{0: 0.5, 3: 1.0, 7: 2.0}]
+    reqs = [
+        SimpleNamespace(data=dense_query, anns_field="dense_embeddings", param={}, limit=5),
+        SimpleNamespace(data=sparse_query, anns_field="sparse_embeddings", param={}, limit=5),
+    ]
+
+    expected = {}
+    for ids, _ in [index.dense_search(dense_query, 5)[0], index.sparse_search(sparse_query, 5)[0]]:
+        for rank, row_id in enumerate(ids, start=1):
+            expected[int(row_id)] = expected.get(int(row_id), 0.0) + 1.0 / (DEFAULT_RRF_K + rank)
+
+    hits = index.hybrid_search(reqs, rerank=None, limit=3, output_fields=["doc_id", "text"])[0]
+    assert [hit.distance for hit in hits] == pytest.approx(sorted(expected.values(), reverse=True)[:3])
+    assert all(hit.doc_id == f"doc-{hit.id}" and hit.get("text") == f"text {hit.id}" for hit in hits)
+    with pytest.raises(AttributeError):
+        hits[0].doc_source  # not requested in output_fields
+
+def test_mismatched_lengths_are_rejected():
+    with pytest.raises(ValueError):
+        LocalHybridIndex(dense_embeddings=np.ones((2, 4)), sparse_embeddings=sp.csr_matrix((3, 5)),
+                         doc_ids=["a", "b"], texts=["a", "b"], sources=["a", "b"])
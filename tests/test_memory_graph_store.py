@@ -0,0 +1,65 @@
+import pytest
+
+pytest.importorskip("llama_index.core")
+
+from llama_index.core.graph_stores.types import ChunkNode, EntityNode, Relation
+from llama_index.core.vector_stores.types import VectorStoreQuery
+
+from src.graph.memory_graph_store import InMemoryPropertyGraphStore
+
+def build_store() -> InMemoryPropertyGraphStore:
+    metformin = EntityNode(name="metformin", label="DRUG", embedding=[1.0, 0.0, 0.0])
+    diabetes = EntityNode(name="type 2 diabetes", label="CONDITION", embedding=[0.6, 0.8, 0.0])
+    nausea = EntityNode(name="nausea", label="SIDE_EFFECT", embedding=[0.0, 0.0, 1.0])
+    liver = EntityNode(name="liver", label="ORGAN", embedding=[0.0, 1.0, 0.0])
+    chunk = ChunkNode(text="Metformin treats type 2 diabetes and may cause nausea.", id_="chunk-1")
+
+    store = InMemoryPropertyGraphStore()
+    store.upsert_nodes([metformin, diabetes, nausea, liver, chunk])
+    store.upsert_relations([
+        Relation(label="TREATS", source_id=metformin.id, target_id=diabetes.id),
+        Relation(label="CAUSES", source_id=metformin.id, target_id=nausea.id),
+        Relation(label="AFFECTS", source_id=diabetes.id, target_id=liver.id),
+        Relation(label="MENTIONS", source_id=chunk.id, target_id=metformin.id),
+    ])
+    return store
+
+def labels(triplets):
+    return [(source.id, relation.label, target.id) for source, relation, target in triplets]
+
+def test_get_rel_map_expands_by_depth_and_skips_source_relations():
+    store = build_store()
+    seed = store.get(ids=["metformin"])
+
+    assert labels(store.get_rel_map(seed, depth=1)) == [
+        ("metformin", "TREATS", "type 2 diabetes"),
+        ("metformin", "CAUSES", "nausea"),
+    ]
+    assert ("type 2 diabetes", "AFFECTS", "liver") in labels(store.get_rel_map(seed, depth=2))
+    assert len(store.get_rel_map(seed, depth=2, limit=2)) == 2
+
+def test_vector_query_is_exact_cosine_top_k():
+    store = build_store()
+    nodes, scores = store.vector_query(VectorStoreQuery(query_embedding=[0.9, 0.1, 0.0], similarity_top_k=2))
+    assert [node.id for node in nodes] == ["metformin", "type 2 diabetes"]
+    assert scores[0] >= scores[1]
+
+def test_writes_invalidate_the_indexes():
+    store = build_store()
+    store.vector_query(VectorStoreQuery(query_embedding=[0.0, 0.0, 1.0], similarity_top_k=1))
+    store.upsert_nodes([EntityNode(name="dizziness", label="SIDE_EFFECT", embedding=[0.0, 0.1, 1.0])])
+    nodes, _ = store.vector_query(VectorStoreQuery(query_embedding=[0.0, 0.1, 1.0], similarity_top_k=1))
+    assert nodes[0].id == "dizziness"
+
+def test_snapshot_round_trip(tmp_path):
+    store = build_store()
+    path = str(tmp_path / "snapshot" / "graph.json")
+    store.save_snapshot(path)
+    loaded = InMemoryPropertyGraphStore.load_snapshot(path)
+
+    assert isinstance(loaded, InMemoryPropertyGraphStore)
+    assert set(loaded.graph.nodes) == set(store.graph.nodes)
+    assert set(loaded.graph.relations) == set(store.graph.relations)
+    assert loaded.graph.nodes["metformin"].embedding == [1.0, 0.0, 0.0]
+    seed = loaded.get(ids=["metformin"])
+    assert labels(loaded.get_rel_map(seed, depth=2)) == labels(store.get_rel_map(store.get(ids=["metformin"]), depth=2))
@@ -0,0 +1,66 @@
+import asyncio
+
+import pytest
+
+from src.chatbot.pregrader import REFUSAL_PATTERN, LocalPreGrader, content_terms, term_coverage
+
+LEGITIMATE_ANSWERS = [
+    "If you are unable to provide a urine sample, your doctor may order a blood test instead.",
+    "I cannot stress enough how important it is to check your feet daily for cuts or blisters.",
+    "This information does not specify a dose for children, so ask a paediatrician before giving metformin.",
+    "Visitors to Hawaii cannot bring insulin pens in checked luggage without a cooler.",
+    "In the context of heart disease, low-impact exercises such as walking and swimming are recommended.",
+    "Metformin is unable to find its way into the brain in large amounts, so neurological side effects are rare.",
+]
+
+REFUSAL_ANSWERS = [
+    "The provided context does not mention any exercises for diabetics with heart conditions.",
+    "The context doesn't specify how insulin should be stored.",
+    "I cannot answer this question based on the information given.",
+    "I am unable to determine the side effects of metformin from the retrieved documents.",
+    "Unfortunately the retrieved context did not address sleep deprivation in shift workers.",
+]
+
+GOOD_FEATURES = {"query_similarity": 0.85, "context_similarity": 0.9, "coverage": 1.0, "words": 120, "refusal": False}
+
+@pytest.mark.parametrize("answer", LEGITIMATE_ANSWERS)
+def test_legitimate_answers_are_not_refusals(answer):
+    assert REFUSAL_PATTERN.search(answer) is None
+
+@pytest.mark.parametrize("answer", REFUSAL_ANSWERS)
+def test_context_refusals_are_detected(answer):
+    assert REFUSAL_PATTERN.search(answer) is not None
+
+def test_clear_answer_is_good():
+    assert LocalPreGrader().decide(GOOD_FEATURES) == "good"
+
+def test_refusal_escalates_to_llm_grader():
+    assert LocalPreGrader().decide({**GOOD_FEATURES, "refusal": True}) == "uncertain"
+
+def test_unrelated_answer_is_insufficient():
+    features = {**GOOD_FEATURES, "query_similarity": 0.3, "coverage": 0.1}
+    assert LocalPreGrader().decide(features) == "insufficient"
+
+def test_short_answer_is_uncertain():
+    assert LocalPreGrader().decide({**GOOD_FEATURES, "words": 10}) == "uncertain"
+
+def test_term_coverage_matches_query_terms_by_prefix():
+    query = "what are the side effects of metformin"
+    assert content_terms(query) == ["side", "effects", "metformin"]
+    assert term_coverage(query, "Metformin can cause stomach upset; this effect usually fades.") == pytest.approx(2 / 3)
+    assert term_coverage("what is it", "Anything.") == 1.0
+
+def test_grade_with_the_embedding_models():
+    # only this test needs the bge models
+    try:
+        import src.services.embedding_models  # noqa: F401
+    except Exception as e:
+        pytest.skip(f"embedding models unavailable: {e}")
+    pre_grader = LocalPreGrader(shadow_rate=0)
+    query = "how is insulin stored"
+    answer = "Unopened insulin is stored in the fridge, and the pen in use can be kept at room temperature for a month."
+    result = asyncio.run(pre_grader.grade(query, answer, context=answer))
+    assert result["coverage"] == 1.0 and not result["refusal"]
+    assert result["context_similarity"] == pytest.approx(1.0, abs=1e-3)
+    assert result["verdict"] in {"good", "uncertain"}
+    assert pre_grader.stats()[result["verdict"]] == 1
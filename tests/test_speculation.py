@@ -0,0 +1,76 @@
+import asyncio
+
+import pytest
+
+from src.chatbot.speculation import SpeculationRegistry
+
+async def search(result, delay=0.0):
+    await asyncio.sleep(delay)
+    return result
+
+async def broken_search():
+    raise RuntimeError("search backend down")
+
+def test_take_returns_the_result_and_counts_the_saving():
+    async def run():
+        registry = SpeculationRegistry("websearch")
+        assert registry.launch("run-1", search(["doc"], delay=0.05))
+        await asyncio.sleep(0.1)  # the node that needs it comes after the work finished
+        return registry, await registry.take("run-1")
+
+    registry, result = asyncio.run(run())
+    stats = registry.stats()
+    assert result == ["doc"]
+    assert (stats["launched"], stats["used"], stats["in_flight"]) == (1, 1, 0)
+    assert stats["hit_rate"] == 1.0
+    assert stats["saved_seconds"] == pytest.approx(0.05, abs=0.03)
+
+def test_take_waits_for_work_still_running():
+    async def run():
+        registry = SpeculationRegistry("websearch")
+        registry.launch("run-1", search("late", delay=0.05))
+        return await registry.take("run-1")
+
+    assert asyncio.run(run()) == "late"
+
+def test_launch_at_most_once_per_request_and_needs_an_id():
+    async def run():
+        registry = SpeculationRegistry("websearch")
+        duplicate, anonymous = search("second"), search("anonymous")
+        launched = [registry.launch("run-1", search("first")), registry.launch("run-1", duplicate), registry.launch("", anonymous)]
+        # rejected work is closed rather than left un-awaited
+        assert duplicate.cr_frame is None and anonymous.cr_frame is None
+        return launched, await registry.take("run-1"), registry.stats()["launched"]
+
+    assert asyncio.run(run()) == ([True, False, False], "first", 1)
+
+def test_take_without_speculation_returns_none():
+    async def run():
+        return await SpeculationRegistry("websearch").take("unknown")
+
+    assert asyncio.run(run()) is None
+
+def test_failed_work_is_counted_and_returns_none():
+    async def run():
+        registry = SpeculationRegistry("websearch")
+        registry.launch("run-1", broken_search())
+        return registry, await registry.take("run-1")
+
+    registry, result = asyncio.run(run())
+    assert result is None
+    assert (registry.stats()["failed"], registry.stats()["used"]) == (1, 0)
+
+def test_discard_cancels_the_work():
+    async def run():
+        registry = SpeculationRegistry("websearch")
+        registry.launch("run-1", search("unused", delay=1))
+        task = registry.speculations["run-1"].task
+        registry.discard("run-1")
+        registry.discard("run-1")  # nothing left, a no-op
+        await asyncio.sleep(0)
+        return registry, task, await registry.take("run-1")
+
+    registry, task, result = asyncio.run(run())
+    assert task.cancelled() and result is None
+    stats = registry.stats()
+    assert (stats["discarded"], stats["in_flight"], stats["hit_rate"]) == (1, 0, 0.0)
@@ -0,0 +1,49 @@
+import asyncio
+import threading
+
+import pytest
+
+try:
+    from langchain_core.tools import ToolException
+    from src.chatbot.tools import WebSearchTool
+except Exception as e:  # the tools module connects to the LLM, vector DB and graph services on import
+    pytest.skip(f"tools unavailable: {e}", allow_module_level=True)
+
+@pytest.fixture
+def search_tool():
+    tool = WebSearchTool()
+
+    async def websearch(query, num_results=3):
+        return f"URL: https://example.org\nContent:\n{query}\n\n"
+
+    tool.websearch = websearch
+    return tool
+
+@pytest.fixture
+def app_loop():
+    loop = asyncio.new_event_loop()
+    thread = threading.Thread(target=loop.run_forever, daemon=True)
+    thread.start()
+    yield loop
+    loop.call_soon_threadsafe(loop.stop)
+    thread.join()
+    loop.close()
+
+def test_invoke_before_the_app_loop_has_searched_fails_clearly(search_tool):
+    with pytest.raises(ToolException, match="ainvoke"):
+        search_tool.get_tool().invoke({"query": "metformin"})
+
+def test_invoke_runs_the_search_on_the_app_loop(search_tool, app_loop):
+    tool = search_tool.get_tool()
+    asyncio.run_coroutine_threadsafe(tool.ainvoke({"query": "insulin"}), app_loop).result(timeout=5)
+    assert tool.invoke({"query": "metformin"}) == "URL: https://example.org\nContent:\nmetformin\n\n"
+
+def test_invoke_from_the_app_loop_itself_fails_instead_of_deadlocking(search_tool, app_loop):
+    tool = search_tool.get_tool()
+
+    async def search_then_block():
+        await tool.ainvoke({"query": "insulin"})
+        return tool.invoke({"query": "metformin"})
+
+    with pytest.raises(ToolException, match="deadlock"):
+        asyncio.run_coroutine_threadsafe(search_then_block(), app_loop).result(timeout=5)
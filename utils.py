@@ -65,7 +65,20 @@ async def handle_updates(update, final_answer):
     print(f"Update: {update}")
     print("=====================================" * 4)
     agent_type = get_agent_type(update)
-    if agent_type == "Grader Agent":
+    if agent_type == "Generate and Grade Agent":
+        # the fast path returns its answer as JSON with the scores, so it is posted whole rather than streamed
+        final_answer[0] = update['generate_and_grade'].get('answer', '')
+        await send_self_graded_answer(update['generate_and_grade'])
+    elif agent_type == "Finalize":
+        # the answer the run settled on, which may be an earlier one if the budget ran out
+        final_answer[0] = update['finalize'].get('answer', final_answer[0])
+        await send_budget_message(update['finalize'].get('budget_report', ''))
+    elif agent_type == "Pre-Grading Agent":
+        pre_grade = update['pre_grader'].get('pre_grade', {})
+        if pre_grade.get('verdict') == "insufficient":
+            final_answer[0] = ""
+        await send_pre_grade_message(pre_grade)
+    elif agent_type == "Grader Agent":
         metrics = get_metrics(update)
         await send_agent_message(agent_type=agent_type, 
                                  retrieved_context=None, 
@@ -78,14 +91,17 @@ async def handle_updates(update, final_answer):
                                  metrics=None)
 
 def get_retrieved_context(update):
+    if update.get('expand_query'):
+        return "\n".join(f"- {query}" for query in update['expand_query'].get('query_list', []))
     return (update.get('search_vector_db', {}).get('db_context') or
             update.get('search_kg_db', {}).get('kg_context') or
             update.get('websearch', {}).get('websearch_context'))
     
 def get_metrics(update):
+    return format_evaluation(update.get('grader').get('metrics'), update.get('grader').get('reasons'))
+
+def format_evaluation(metrics, reasons):
     string = ""
-    metrics = update.get('grader').get('metrics')
-    reasons = update.get('grader').get('reasons')
     scores = []
     for metric, num in metrics.items():
         reason = reasons.get(metric, '').capitalize()
@@ -94,10 +110,14 @@ def get_metrics(update):
     return (string, scores)
 
 def get_agent_type(update):
+    if update.get('expand_query'): return "Query Expansion Agent"
     if update.get('search_vector_db'): return "Vector DB Retriever Agent"
     if update.get('search_kg_db'): return "KG DB Retriever Agent"
     if update.get('websearch'): return "Websearch Agent"
+    if update.get('generate_and_grade'): return "Generate and Grade Agent"
+    if update.get('pre_grader'): return "Pre-Grading Agent"
     if update.get('grader'): return "Grader Agent"
+    if update.get('finalize'): return "Finalize"
     return None
 
 async def send_agent_message(agent_type: str, retrieved_context: Optional[str], metrics: Optional[Tuple[str, List[int]]], final_answer: List[str] = [""]):
@@ -116,17 +136,51 @@ async def send_agent_message(agent_type: str, retrieved_context: Optional[str],
         grading_decision = cl.Text(name="Decision", display="inline", content=decision)
         await cl.Message(content="", elements=[grading_decision]).send()
         
-    else:  # Vector DB Retriever Agent or KG DB Retriever Agent or Websearch Agent
+    else:  # Query Expansion Agent, Vector DB Retriever Agent, KG DB Retriever Agent or Websearch Agent
         if retrieved_context:
             context_element = get_context_element(name=agent_type, display="side", content=retrieved_context)
             await cl.Message(content=agent_type, elements=context_element).send()
             
-            source_elements = get_source_elements(retrieved_context) if agent_type != "Websearch Agent" else []
+            source_elements = get_source_elements(retrieved_context) if agent_type not in ("Websearch Agent", "Query Expansion Agent") else []
             if source_elements:
                 await cl.Message(content="Source Materials", elements=source_elements).send()
         else:
             await cl.Message(content=f"No context available for {agent_type}").send()
 
+async def send_grader_reasons(result):
+    """
+    Posts the grader's full evaluation once its reasoning has streamed, after the routing decision was already taken
+    """
+    string, _ = format_evaluation(result.get('evaluation', {}), result.get('reasoning', {}))
+    grading_element = cl.Text(name="Evaluation Reasons", display="inline", content=string)
+    await cl.Message(content="", elements=[grading_element]).send()
+
+async def send_self_graded_answer(result):
+    await send_answer_header()
+    await cl.Message(content=result.get('answer', '')).send()
+    string, _ = format_evaluation(result.get('metrics', {}), {})
+    grading_element = cl.Text(name="Self-Evaluation", display="inline", content=f"{string}**Confidence**: **{result.get('confidence', 0)}/10**")
+    await cl.Message(content="", elements=[grading_element]).send()
+
+async def send_pre_grade_message(pre_grade):
+    decisions = {
+        "good": "The answer is good enough.",
+        "insufficient": "The answer is not good enough. Extra context from a Websearch is required.",
+        "uncertain": "The pre-grader is uncertain. The Grader Agent will evaluate the answer.",
+    }
+    features = (f"**Query similarity**: {pre_grade.get('query_similarity', 0):.2f}\n"
+                f"**Context similarity**: {pre_grade.get('context_similarity', 0):.2f}\n"
+                f"**Query term coverage**: {pre_grade.get('coverage', 0):.0%}\n"
+                f"**Words**: {pre_grade.get('words', 0)}\n"
+                f"**Deflects**: {'yes' if pre_grade.get('refusal') else 'no'}\n\n"
+                f"{decisions.get(pre_grade.get('verdict'), '')}")
+    pre_grade_element = cl.Text(name="Pre-Grading Agent's Evaluation", display="inline", content=features)
+    await cl.Message(content="", elements=[pre_grade_element]).send()
+
+async def send_budget_message(budget_report: str):
+    budget_element = cl.Text(name="Budget Consumed", display="inline", content=budget_report)
+    await cl.Message(content="", elements=[budget_element]).send()
+
 async def send_answer_header():
     answer_elements = [cl.Text(name="Answer Generation Agent's Answer", display="inline", content=" ")]
     await cl.Message(content="", elements=answer_elements).send()